@@ -1,16 +1,72 @@
-from .models import OperationLog
+import logging
+import re
+
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 
+from .models import OperationLog
+
+logger = logging.getLogger(__name__)
+
+# AUDIT_LOG_SINK 可选值
+SINK_AUDIT = 'audit'                        # 写入 audit_operationlog（批量缓冲）
+SINK_USER_OPERATION_LOG = 'user_operation_log'  # 并入用户操作日志，视图已记录的请求不重复写
+SINK_OFF = 'off'
+
+
 class AuditMiddleware(MiddlewareMixin):
+    """
+    审计中间件：记录已登录用户的写操作
+    路径规则和写入目标由 AUDIT_* 配置决定，日志经缓冲队列批量写库，不在请求中同步插入
+    """
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self.sink = settings.AUDIT_LOG_SINK
+        self.methods = {method.upper() for method in settings.AUDIT_METHODS}
+        self.include_patterns = [re.compile(pattern) for pattern in settings.AUDIT_INCLUDE_PATHS]
+        self.exclude_patterns = [re.compile(pattern) for pattern in settings.AUDIT_EXCLUDE_PATHS]
+
     def process_response(self, request, response):
-        if hasattr(request, 'user') and request.user.is_authenticated and request.method in ['POST','DELETE']:
-            OperationLog.objects.create(
-                user=request.user,
-                action=self._get_action(request),
-                details={'method':request.method,'path':request.path}
-            )
+        if self._should_audit(request):
+            try:
+                self._write(request, response)
+            except Exception as e:
+                logger.error(f"记录审计日志失败: {request.method} {request.path}: {str(e)}", exc_info=True)
         return response
 
+    def _should_audit(self, request):
+        if self.sink == SINK_OFF or request.method not in self.methods:
+            return False
+        if not (hasattr(request, 'user') and request.user.is_authenticated):
+            return False
+        path = request.path
+        if self.include_patterns and not any(pattern.search(path) for pattern in self.include_patterns):
+            return False
+        return not any(pattern.search(path) for pattern in self.exclude_patterns)
+
+    def _write(self, request, response):
+        from home.utils.operation_log import enqueue_operation_log
+
+        action = self._get_action(request)
+        if self.sink == SINK_USER_OPERATION_LOG:
+            # 视图已通过 UserOperationLog.log_operation 记录过的请求不再重复写
+            if getattr(request, '_operation_logged', False):
+                return
+            from home.models import UserOperationLog
+            UserOperationLog.log_operation(
+                request=request,
+                operation_type=action,
+                operation_detail=f'{request.method} {request.path} -> {response.status_code}',
+            )
+            return
+
+        enqueue_operation_log(OperationLog(
+            user=request.user,
+            action=action,
+            details={'method': request.method, 'path': request.path, 'status': response.status_code},
+        ))
+
     def _get_action(self, request):
         if 'sync' in request.path: return 'SYNC'
         if 'auth' in request.path: return 'LOGIN'
@@ -1,10 +1,100 @@
+import time
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
 from user_agents import parse
 
+# 客户端类型：wxwork（企业微信）/ wechat（微信）/ mobile（其他移动端浏览器）/ desktop
+ClientProfile = namedtuple('ClientProfile', ['kind', 'is_mobile', 'is_wechat', 'is_wxwork'])
+
+# 实际访问的 User-Agent 种类很少（企业微信、桌面浏览器），缓存解析结果避免每个请求都跑一遍正则
+USER_AGENT_CACHE_SIZE = 512
+USER_AGENT_MAX_LENGTH = 512
+
+
+@lru_cache(maxsize=USER_AGENT_CACHE_SIZE)
+def classify_user_agent(user_agent):
+    """按 User-Agent 判断客户端类型（结果按 UA 字符串缓存）"""
+    lowered = user_agent.lower()
+    is_wxwork = 'wxwork' in lowered
+    is_wechat = is_wxwork or 'micromessenger' in lowered
+    parsed = parse(user_agent)
+    # 平板（iPad、安卓平板）与原来的关键字判断一致，按移动端处理
+    is_mobile = parsed.is_mobile or parsed.is_tablet
+    if is_wxwork:
+        kind = 'wxwork'
+    elif is_wechat:
+        kind = 'wechat'
+    elif is_mobile:
+        kind = 'mobile'
+    else:
+        kind = 'desktop'
+    return ClientProfile(kind, is_mobile, is_wechat, is_wxwork)
+
+
+def get_client_profile(request):
+    """返回请求的客户端类型；中间件跳过的路径上按需解析"""
+    profile = getattr(request, 'client_profile', None)
+    if profile is None:
+        profile = classify_user_agent(request.META.get('HTTP_USER_AGENT', '')[:USER_AGENT_MAX_LENGTH])
+    return profile
+
+
 class MobileDetectionMiddleware:
+    """
+    设置 request.client_profile（及兼容旧代码的 request.is_mobile），视图统一使用，不再各自解析 User-Agent。
+    静态文件、企业微信回调和消息接收路径不需要客户端类型，直接跳过
+    """
+    SKIP_PATH_PREFIXES = (
+        settings.STATIC_URL,
+        '/wechat/callback/',
+        '/wechat/message/receive/',
+        '/WW_verify_',
+    )
+
     def __init__(self, get_response):
         self.get_response = get_response
 
     def __call__(self, request):
-        user_agent = parse(request.META.get('HTTP_USER_AGENT', ''))
-        request.is_mobile = user_agent.is_mobile
+        if not request.path.startswith(self.SKIP_PATH_PREFIXES):
+            request.client_profile = get_client_profile(request)
+            request.is_mobile = request.client_profile.is_mobile
         return self.get_response(request)
+
+
+class SessionRefreshThrottleMiddleware:
+    """
+    会话滑动过期节流：替代 SESSION_SAVE_EVERY_REQUEST，
+    距上次续期超过 SESSION_REFRESH_INTERVAL 秒时才标记会话已修改，由 SessionMiddleware 保存并重新下发 cookie。
+    需放在 SessionMiddleware 之后。
+    """
+    REFRESH_KEY = '_session_refreshed_at'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        session = getattr(request, 'session', None)
+        # 只处理已带会话 cookie 的请求，不为匿名访问创建会话
+        if session is None or settings.SESSION_COOKIE_NAME not in request.COOKIES or session.is_empty():
+            return response
+        now = int(time.time())
+        if now - session.get(self.REFRESH_KEY, 0) >= settings.SESSION_REFRESH_INTERVAL:
+            session[self.REFRESH_KEY] = now
+        return response
+
+
+class DBConnectionMetricsMiddleware:
+    """统计每个 worker 的请求数和新建数据库连接数（连接复用率），定期写入日志"""
+
+    def __init__(self, get_response):
+        from home.utils.db_metrics import connection_stats
+        self.stats = connection_stats
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        self.stats.record_unit()
+        return response
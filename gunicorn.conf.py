@@ -1,10 +1,15 @@
 # Gunicorn配置文件
 import multiprocessing
+import os
 
 # 服务器配置
 bind = "127.0.0.1:8000"  # 保持与runserver相同的地址
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
+workers = int(os.environ.get('GUNICORN_WORKERS') or multiprocessing.cpu_count() * 2 + 1)
+# gthread：每个进程多个线程，EAS、企业微信等外部接口变慢时只占住一个线程而不是整个进程；
+# Django 数据库连接按线程隔离，配合 CONN_MAX_AGE 每个线程复用自己的持久连接（连接数 = workers × threads）
+# 设置 GUNICORN_WORKER_CLASS=sync 可回退到同步模式
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
 worker_connections = 1000
 max_requests = 1000
 max_requests_jitter = 100
@@ -21,3 +26,11 @@ access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"
 # 进程管理
 pidfile = "/var/www/yuantong/gunicorn.pid"
 daemon = False
+
+
+def worker_exit(server, worker):
+    """worker 退出（max_requests 重启、reload、停止服务）前写出缓冲中的操作日志，并输出连接复用统计"""
+    from home.utils.db_metrics import connection_stats
+    from home.utils.operation_log import flush_operation_logs
+    flush_operation_logs()
+    connection_stats.log()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import MaterialMapping, CostObjectMapping
+from .models import MaterialMapping, CostObjectMapping, QCSpecLimit, QCRollingStat
 
 @admin.register(MaterialMapping)
 class MaterialMappingAdmin(admin.ModelAdmin):
@@ -11,4 +11,19 @@ class MaterialMappingAdmin(admin.ModelAdmin):
 @admin.register(CostObjectMapping)
 class CostObjectMappingAdmin(admin.ModelAdmin):
     list_display = ('id', 'cost_object_code', 'cost_object_name', 'created_at')
-    search_fields = ('cost_object_code', 'cost_object_name') 
\ No newline at end of file
+    search_fields = ('cost_object_code', 'cost_object_name') 
+
+
+@admin.register(QCSpecLimit)
+class QCSpecLimitAdmin(admin.ModelAdmin):
+    list_display = ('report_type', 'product_name', 'field_name', 'lsl', 'usl', 'updated_at')
+    list_filter = ('report_type', 'field_name')
+    search_fields = ('product_name', 'field_name')
+
+
+@admin.register(QCRollingStat)
+class QCRollingStatAdmin(admin.ModelAdmin):
+    list_display = ('report_type', 'product_name', 'field_name', 'count', 'mean', 'updated_at')
+    list_filter = ('report_type', 'field_name')
+    search_fields = ('product_name', 'field_name')
+    readonly_fields = ('count', 'mean', 'm2', 'updated_at')
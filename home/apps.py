@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class HomeConfig(AppConfig):
+    name = 'home'
+
+    def ready(self):
+        """应用启动时调用，用于注册信号处理器"""
+        import home.signals  # noqa: F401
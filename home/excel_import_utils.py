@@ -828,9 +828,10 @@ def import_xinghui_report_data(request, model_class, module_name, log_module_cod
         error_count = 0
         error_messages = []
         skipped_count = 0
+        # 转换成功的行 {Excel行号: 数据}
+        parsed_rows = {}
         
-        # 导入validate_field_by_model函数
-        from home.utils.validators import validate_field_by_model
+        from home.utils.validators import get_validation_schema
         
         # 处理每一行数据
         for index, row_obj in df_mapped.iterrows():
@@ -968,32 +969,35 @@ def import_xinghui_report_data(request, model_class, module_name, log_module_cod
                     else:
                         data[field] = ''
                 
-                # 数据校验
-                validation_errors = []
-                field_display_names = XINGHUI_FIELD_DISPLAY_NAMES.copy()
-                
-                for field_name, field_value in data.items():
-                    if field_name in ['user', 'username']:
-                        continue
-                    
-                    field_display_name = field_display_names.get(field_name, field_name)
-                    is_valid, error_msg = validate_field_by_model(
-                        model_class, 
-                        field_name, 
-                        field_value, 
-                        field_display_name
-                    )
-                    
-                    if not is_valid:
-                        validation_errors.append(f'{field_display_name}: {error_msg}')
-                
-                if validation_errors:
-                    error_count += 1
-                    error_msg = f'第 {index + 2} 行数据校验失败: {"; ".join(validation_errors)}'
-                    error_messages.append(error_msg)
-                    logger.error(f'导入{module_name}数据校验失败: {error_msg}')
-                    continue
+                # 整批转换完成后再统一校验（按Excel行号）
+                parsed_rows[index + 2] = data
                 
+            except Exception as e:
+                error_count += 1
+                error_msg = f'第 {index + 2} 行导入失败: {str(e)}'
+                error_messages.append(error_msg)
+                logger.error(f'导入{module_name}失败: {error_msg}', exc_info=True)
+        
+        # 整批校验，错误矩阵 {行号: {字段名: 错误信息}} 只包含有错误的行
+        field_display_names = XINGHUI_FIELD_DISPLAY_NAMES.copy()
+        error_matrix = get_validation_schema(model_class).validate_rows(
+            parsed_rows, field_display_names, skip=('user', 'username')
+        )
+        
+        for line, data in parsed_rows.items():
+            row_errors = error_matrix.get(line)
+            if row_errors:
+                error_count += 1
+                validation_errors = '; '.join(
+                    f'{field_display_names.get(field_name, field_name)}: {error_msg}'
+                    for field_name, error_msg in row_errors.items()
+                )
+                error_msg = f'第 {line} 行数据校验失败: {validation_errors}'
+                error_messages.append(error_msg)
+                logger.error(f'导入{module_name}数据校验失败: {error_msg}')
+                continue
+            
+            try:
                 # 设置用户信息
                 data['user'] = request.user
                 data['username'] = request.user.username
@@ -1001,10 +1005,9 @@ def import_xinghui_report_data(request, model_class, module_name, log_module_cod
                 # 创建记录
                 model_class.objects.create(**data)
                 imported_count += 1
-                
             except Exception as e:
                 error_count += 1
-                error_msg = f'第 {index + 2} 行导入失败: {str(e)}'
+                error_msg = f'第 {line} 行导入失败: {str(e)}'
                 error_messages.append(error_msg)
                 logger.error(f'导入{module_name}失败: {error_msg}', exc_info=True)
         
@@ -1317,9 +1320,10 @@ def import_yuantong_report_data(request, model_class, module_name, log_module_co
         error_count = 0
         error_messages = []
         skipped_count = 0
+        # 转换成功的行 {Excel行号: 数据}
+        parsed_rows = {}
         
-        # 导入validate_field_by_model函数
-        from home.utils.validators import validate_field_by_model
+        from home.utils.validators import get_validation_schema
         
         # 处理每一行数据
         for index, row_obj in df_mapped.iterrows():
@@ -1412,33 +1416,35 @@ def import_yuantong_report_data(request, model_class, module_name, log_module_co
                     else:
                         data[field] = ''
                 
-                # 数据校验：检查必填字段
-                validation_errors = []
-                field_display_names = YUANTONG_FIELD_DISPLAY_NAMES.copy()
-                
-                # 检查所有必填字段（根据model定义）
-                for field_name, field_value in data.items():
-                    if field_name in ['user', 'username']:
-                        continue
-                    
-                    field_display_name = field_display_names.get(field_name, field_name)
-                    is_valid, error_msg = validate_field_by_model(
-                        model_class, 
-                        field_name, 
-                        field_value, 
-                        field_display_name
-                    )
-                    
-                    if not is_valid:
-                        validation_errors.append(f'{field_display_name}: {error_msg}')
-                
-                if validation_errors:
-                    error_count += 1
-                    error_msg = f'第 {index + 2} 行数据校验失败: {"; ".join(validation_errors)}'
-                    error_messages.append(error_msg)
-                    logger.error(f'导入{module_name}数据校验失败: {error_msg}')
-                    continue
+                # 整批转换完成后再统一校验（按Excel行号）
+                parsed_rows[index + 2] = data
                 
+            except Exception as e:
+                error_count += 1
+                error_msg = f'第 {index + 2} 行导入失败: {str(e)}'
+                error_messages.append(error_msg)
+                logger.error(f'导入{module_name}失败: {error_msg}', exc_info=True)
+        
+        # 整批校验，错误矩阵 {行号: {字段名: 错误信息}} 只包含有错误的行
+        field_display_names = YUANTONG_FIELD_DISPLAY_NAMES.copy()
+        error_matrix = get_validation_schema(model_class).validate_rows(
+            parsed_rows, field_display_names, skip=('user', 'username')
+        )
+        
+        for line, data in parsed_rows.items():
+            row_errors = error_matrix.get(line)
+            if row_errors:
+                error_count += 1
+                validation_errors = '; '.join(
+                    f'{field_display_names.get(field_name, field_name)}: {error_msg}'
+                    for field_name, error_msg in row_errors.items()
+                )
+                error_msg = f'第 {line} 行数据校验失败: {validation_errors}'
+                error_messages.append(error_msg)
+                logger.error(f'导入{module_name}数据校验失败: {error_msg}')
+                continue
+            
+            try:
                 # 设置用户信息
                 data['user'] = request.user
                 data['username'] = request.user.username
@@ -1446,10 +1452,9 @@ def import_yuantong_report_data(request, model_class, module_name, log_module_co
                 # 创建记录
                 model_class.objects.create(**data)
                 imported_count += 1
-                
             except Exception as e:
                 error_count += 1
-                error_msg = f'第 {index + 2} 行导入失败: {str(e)}'
+                error_msg = f'第 {line} 行导入失败: {str(e)}'
                 error_messages.append(error_msg)
                 logger.error(f'导入{module_name}失败: {error_msg}', exc_info=True)
         
@@ -0,0 +1,37 @@
+"""
+归档超过保留期的日志（按月滚动，建议每月执行一次，Celery Beat 已配置每月1日自动执行）。
+- user_operation_log: 移入 user_operation_log_archive 归档表，操作日志页面仍可查询
+- audit_operationlog / task_log: 写入 LOG_ARCHIVE_DIR 下按月分文件的 JSONL.gz 后删除
+保留天数由 OPERATION_LOG_RETENTION_DAYS / AUDIT_LOG_RETENTION_DAYS / TASK_LOG_RETENTION_DAYS 配置，0 表示不归档。
+用法:
+  python manage.py archive_logs
+  python manage.py archive_logs --log user_operation_log --dry-run
+"""
+from django.core.management.base import BaseCommand
+
+from home.utils.log_archive import ARCHIVE_BATCH_SIZE, LOG_TYPES, archive_logs
+
+
+class Command(BaseCommand):
+    help = '按保留期归档用户操作日志、审计日志和任务日志'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', action='append', choices=list(LOG_TYPES), dest='log_types',
+                            help='只归档指定日志类型，可重复指定，默认全部')
+        parser.add_argument('--dry-run', action='store_true', help='只统计待归档条数，不移动数据')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help='每批处理条数')
+
+    def handle(self, *args, **options):
+        results = archive_logs(
+            log_types=options['log_types'],
+            dry_run=options['dry_run'],
+            batch_size=options['batch_size'],
+        )
+        for log_type, result in results.items():
+            if result['skipped']:
+                self.stdout.write(f'{log_type}: 保留天数为0，跳过')
+                continue
+            action = '待归档' if options['dry_run'] else '已归档'
+            self.stdout.write(self.style.SUCCESS(
+                f"{log_type}: 早于 {result['cutoff']:%Y-%m-%d} 的日志{action} {result['count']} 条"
+            ))
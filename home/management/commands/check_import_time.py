@@ -0,0 +1,68 @@
+"""
+检查 worker 启动时的导入耗时（python -X importtime）。
+在子进程中执行 django.setup() 并导入 wsgi 应用和 URL 配置（即 worker 处理第一个请求前需要加载的模块），
+汇总总耗时和最慢的模块；总耗时超过预算或启动时加载了只应在导入/导出Excel时使用的重量级依赖（pandas、openpyxl、numpy）时返回非0。
+用法:
+  python manage.py check_import_time
+  python manage.py check_import_time --budget-ms 1500 --top 30
+"""
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_BUDGET_MS = 2000
+# 只允许在 Excel 导入/导出视图内延迟导入的模块
+DEFERRED_MODULES = ('pandas', 'openpyxl', 'numpy')
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+class Command(BaseCommand):
+    help = '检查 worker 启动导入耗时预算和重量级依赖的延迟加载'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--budget-ms', type=int, default=DEFAULT_BUDGET_MS,
+                            help=f'启动导入总耗时预算（毫秒），默认 {DEFAULT_BUDGET_MS}')
+        parser.add_argument('--top', type=int, default=20, help='列出累计耗时最长的前N个模块')
+        parser.add_argument('--allow', action='append', default=[], choices=DEFERRED_MODULES,
+                            help='允许启动时加载的重量级依赖，可重复指定')
+
+    def handle(self, *args, **options):
+        wsgi_module = settings.WSGI_APPLICATION.rsplit('.', 1)[0]
+        code = f'import {wsgi_module}, {settings.ROOT_URLCONF}'
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'yuantong.settings'))
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f'导入失败:\n{result.stderr[-2000:]}')
+
+        modules = []
+        for line in result.stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if match:
+                self_us, cumulative_us, indent, name = match.groups()
+                modules.append((name, len(indent) // 2, int(self_us), int(cumulative_us)))
+
+        # 顶层导入的累计耗时之和即总耗时
+        total_ms = sum(cumulative for _, depth, _, cumulative in modules if depth == 0) / 1000
+        self.stdout.write(f'共导入 {len(modules)} 个模块，总耗时 {total_ms:.0f} ms（预算 {options["budget_ms"]} ms）')
+        self.stdout.write(f'{"累计(ms)":>10}{"自身(ms)":>10}  模块')
+        for name, _, self_us, cumulative_us in sorted(modules, key=lambda m: m[3], reverse=True)[:options['top']]:
+            self.stdout.write(f'{cumulative_us / 1000:>10.1f}{self_us / 1000:>10.1f}  {name}')
+
+        problems = []
+        loaded = {name.split('.')[0] for name, _, _, _ in modules}
+        for module in DEFERRED_MODULES:
+            if module in loaded and module not in options['allow']:
+                problems.append(f'启动时加载了 {module}，应在使用它的视图函数内导入')
+        if total_ms > options['budget_ms']:
+            problems.append(f'启动导入耗时 {total_ms:.0f} ms 超过预算 {options["budget_ms"]} ms')
+        if problems:
+            raise CommandError('；'.join(problems))
+        self.stdout.write(self.style.SUCCESS('导入耗时检查通过'))
@@ -0,0 +1,27 @@
+"""
+按QC报表历史数据重建指标滚动统计（QCRollingStat）。
+上线后先执行一次，否则新建报表要积累 QC_ALERT_MIN_SAMPLES 个检测值后才按标准差告警；修改 QC_ROLLING_WINDOW 后也需重新执行。
+之后新建报表时自动增量更新。
+用法:
+  python manage.py rebuild_qc_rolling_stats
+  python manage.py rebuild_qc_rolling_stats --report-type dayuan --report-type dongtai
+"""
+from django.core.management.base import BaseCommand
+
+from home.utils.qc_profiles import QC_REPORT_MODELS
+from home.utils.qc_rolling_stats import REBUILD_BATCH_SIZE, rebuild_rolling_stats
+
+
+class Command(BaseCommand):
+    help = '重建QC指标滚动统计'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--report-type', action='append', dest='report_types',
+                            choices=[report_type for report_type, _ in QC_REPORT_MODELS],
+                            help='只重建指定报表类型，可重复指定，默认全部')
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE, help='每批读取条数')
+
+    def handle(self, *args, **options):
+        results = rebuild_rolling_stats(options['report_types'], batch_size=options['batch_size'])
+        for report_type, count in results.items():
+            self.stdout.write(self.style.SUCCESS(f"{report_type}: {count} 条统计"))
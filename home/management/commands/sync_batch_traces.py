@@ -0,0 +1,28 @@
+"""
+按QC报表表和原土入库表回填批号追溯索引（BatchTrace）。
+上线后先执行一次回填历史数据；之后记录保存、删除由信号自动同步，需要核对时可再次执行（覆盖写入，删除已不存在的记录）。
+用法:
+  python manage.py sync_batch_traces
+  python manage.py sync_batch_traces --source dayuan --source raw_soil
+"""
+from django.core.management.base import BaseCommand
+
+from home.utils.batch_trace import RAW_SOIL_SOURCE, SYNC_BATCH_SIZE, backfill_batch_traces
+from home.utils.qc_profiles import QC_REPORT_MODELS
+
+
+class Command(BaseCommand):
+    help = '回填批号追溯索引'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', action='append', dest='sources',
+                            choices=[report_type for report_type, _ in QC_REPORT_MODELS] + [RAW_SOIL_SOURCE],
+                            help='只同步指定来源（报表类型或 raw_soil），可重复指定，默认全部')
+        parser.add_argument('--batch-size', type=int, default=SYNC_BATCH_SIZE, help='每批处理条数')
+
+    def handle(self, *args, **options):
+        results = backfill_batch_traces(options['sources'], batch_size=options['batch_size'])
+        for source_type, result in results.items():
+            self.stdout.write(self.style.SUCCESS(
+                f"{source_type}: 写入 {result['synced']} 条，删除 {result['removed']} 条"
+            ))
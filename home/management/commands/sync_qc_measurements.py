@@ -0,0 +1,27 @@
+"""
+按七张厂区QC报表表回填跨厂区统一存储（QCMeasurement）。
+上线后先执行一次回填历史数据；之后报表保存、删除由信号自动同步，需要核对时可再次执行（覆盖写入，删除已不存在的记录）。
+用法:
+  python manage.py sync_qc_measurements
+  python manage.py sync_qc_measurements --report-type dayuan --report-type changfu
+"""
+from django.core.management.base import BaseCommand
+
+from home.utils.qc_profiles import QC_REPORT_MODELS, SYNC_BATCH_SIZE, backfill_measurements
+
+
+class Command(BaseCommand):
+    help = '回填QC报表跨厂区统一存储'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--report-type', action='append', dest='report_types',
+                            choices=[report_type for report_type, _ in QC_REPORT_MODELS],
+                            help='只同步指定报表类型，可重复指定，默认全部')
+        parser.add_argument('--batch-size', type=int, default=SYNC_BATCH_SIZE, help='每批处理条数')
+
+    def handle(self, *args, **options):
+        results = backfill_measurements(options['report_types'], batch_size=options['batch_size'])
+        for report_type, result in results.items():
+            self.stdout.write(self.style.SUCCESS(
+                f"{report_type}: 写入 {result['synced']} 条，删除 {result['removed']} 条"
+            ))
@@ -0,0 +1,94 @@
+# Generated by Django 4.2.10 on 2026-10-19 17:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0049_add_raw_soil_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EASStorageDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fnumber', models.CharField(max_length=100, verbose_name='单据编号')),
+                ('org_code', models.CharField(max_length=50, verbose_name='库存组织编码')),
+                ('warehouse_code', models.CharField(max_length=50, verbose_name='仓库编码')),
+                ('biz_date', models.DateField(blank=True, null=True, verbose_name='业务日期')),
+                ('payload', models.JSONField(default=dict, verbose_name='EAS原始单据')),
+                ('synced_at', models.DateTimeField(auto_now=True, verbose_name='同步时间')),
+            ],
+            options={
+                'verbose_name': 'EAS入库单据缓存',
+                'verbose_name_plural': 'EAS入库单据缓存',
+                'db_table': 'eas_storage_document',
+                'ordering': ['-biz_date', 'fnumber'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EASSyncWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('org_code', models.CharField(max_length=50, verbose_name='库存组织编码')),
+                ('warehouse_code', models.CharField(max_length=50, verbose_name='仓库编码')),
+                ('biz_date', models.DateField(verbose_name='业务日期')),
+                ('synced_at', models.DateTimeField(verbose_name='同步时间')),
+            ],
+            options={
+                'verbose_name': 'EAS缓存同步窗口',
+                'verbose_name_plural': 'EAS缓存同步窗口',
+                'db_table': 'eas_sync_window',
+                'unique_together': {('org_code', 'warehouse_code', 'biz_date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='EASStorageEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entry_seq', models.IntegerField(default=0, verbose_name='分录序号')),
+                ('fnumber', models.CharField(max_length=100, verbose_name='单据编号')),
+                ('org_code', models.CharField(max_length=50, verbose_name='库存组织编码')),
+                ('warehouse_code', models.CharField(max_length=50, verbose_name='仓库编码')),
+                ('biz_date', models.DateField(blank=True, null=True, verbose_name='业务日期')),
+                ('biz_date_text', models.CharField(blank=True, default='', max_length=50, verbose_name='业务日期原文')),
+                ('warehouse_name', models.CharField(blank=True, default='', max_length=100, verbose_name='仓库名称')),
+                ('storage_org_name', models.CharField(blank=True, default='', max_length=100, verbose_name='库存组织名称')),
+                ('cost_center_name', models.CharField(blank=True, default='', max_length=100, verbose_name='成本中心名称')),
+                ('material_number', models.CharField(blank=True, default='', max_length=50, verbose_name='物料编码')),
+                ('material_name', models.CharField(blank=True, default='', max_length=100, verbose_name='物料名称')),
+                ('quantity', models.DecimalField(blank=True, decimal_places=4, max_digits=18, null=True, verbose_name='数量')),
+                ('lot', models.CharField(blank=True, default='', max_length=100, verbose_name='批次号')),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='home.easstoragedocument')),
+            ],
+            options={
+                'verbose_name': 'EAS入库分录缓存',
+                'verbose_name_plural': 'EAS入库分录缓存',
+                'db_table': 'eas_storage_entry',
+                'ordering': ['-biz_date', 'fnumber', 'entry_seq'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='easstoragedocument',
+            index=models.Index(fields=['org_code', 'warehouse_code', 'biz_date'], name='eas_storage_org_cod_81c394_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='easstoragedocument',
+            unique_together={('fnumber', 'org_code', 'warehouse_code')},
+        ),
+        migrations.AddIndex(
+            model_name='easstorageentry',
+            index=models.Index(fields=['org_code', 'warehouse_code', 'biz_date'], name='eas_storage_org_cod_8253c5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='easstorageentry',
+            index=models.Index(fields=['warehouse_code', 'biz_date'], name='eas_storage_warehou_d9901f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='easstorageentry',
+            index=models.Index(fields=['biz_date', 'material_name'], name='eas_storage_biz_dat_121079_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.10 on 2026-10-19 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0050_eas_storage_cache'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rawsoilstorage',
+            index=models.Index(fields=['biz_date', 'created_at'], name='raw_soil_st_biz_dat_538413_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rawsoilstorage',
+            index=models.Index(fields=['storage_org_code', 'biz_date', 'created_at'], name='raw_soil_st_storage_756368_idx'),
+        ),
+    ]
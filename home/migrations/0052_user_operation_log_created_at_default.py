@@ -0,0 +1,19 @@
+# Generated by Django 4.2.10 on 2026-10-19 17:41
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0051_raw_soil_storage_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='useroperationlog',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='操作时间'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-19 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0052_user_operation_log_created_at_default'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='useroperationlog',
+            name='operation_type',
+            field=models.CharField(choices=[('CREATE', '创建'), ('UPDATE', '更新'), ('DELETE', '删除'), ('VIEW', '查看'), ('EXPORT', '导出'), ('LOGIN', '登录'), ('LOGOUT', '登出'), ('SYNC', '同步'), ('ACCESS', '访问')], max_length=20, verbose_name='操作类型'),
+        ),
+    ]
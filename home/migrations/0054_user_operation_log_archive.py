@@ -0,0 +1,65 @@
+# Generated by Django 4.2.10 on 2026-10-19 17:44
+
+from django.db import migrations, models
+
+
+def compress_archive_table(apps, schema_editor):
+    """MySQL 下归档表使用压缩行格式（InnoDB ROW_FORMAT=COMPRESSED）"""
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE user_operation_log_archive ROW_FORMAT=COMPRESSED')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0053_alter_useroperationlog_operation_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserOperationLogArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('user_id', models.IntegerField(blank=True, null=True, verbose_name='操作用户ID')),
+                ('username', models.CharField(max_length=150, verbose_name='用户名')),
+                ('operation_type', models.CharField(choices=[('CREATE', '创建'), ('UPDATE', '更新'), ('DELETE', '删除'), ('VIEW', '查看'), ('EXPORT', '导出'), ('LOGIN', '登录'), ('LOGOUT', '登出'), ('SYNC', '同步'), ('ACCESS', '访问')], max_length=20, verbose_name='操作类型')),
+                ('report_type', models.CharField(blank=True, choices=[('dongtai', '东泰QC报表'), ('yuantong', '远通QC报表'), ('yuantong2', '远通2号QC报表'), ('dayuan', '大塬QC报表'), ('changfu', '长富QC报表'), ('xinghui', '兴辉QC报表'), ('xinghui2', '兴辉2号QC报表')], max_length=20, null=True, verbose_name='报表类型')),
+                ('report_id', models.IntegerField(blank=True, null=True, verbose_name='报表ID')),
+                ('operation_detail', models.TextField(blank=True, verbose_name='操作详情')),
+                ('old_data', models.JSONField(blank=True, null=True, verbose_name='旧数据')),
+                ('new_data', models.JSONField(blank=True, null=True, verbose_name='新数据')),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True, verbose_name='IP地址')),
+                ('user_agent', models.TextField(blank=True, verbose_name='用户代理')),
+                ('request_path', models.CharField(max_length=500, verbose_name='请求路径')),
+                ('request_method', models.CharField(max_length=10, verbose_name='请求方法')),
+                ('created_at', models.DateTimeField(verbose_name='操作时间')),
+            ],
+            options={
+                'verbose_name': '用户操作日志归档',
+                'verbose_name_plural': '用户操作日志归档',
+                'db_table': 'user_operation_log_archive',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='useroperationlog',
+            index=models.Index(fields=['created_at'], name='user_operat_created_1abb61_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='useroperationlogarchive',
+            index=models.Index(fields=['created_at'], name='user_operat_created_bab1a9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='useroperationlogarchive',
+            index=models.Index(fields=['username', 'created_at'], name='user_operat_usernam_9f96b5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='useroperationlogarchive',
+            index=models.Index(fields=['operation_type', 'created_at'], name='user_operat_operati_c61a6f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='useroperationlogarchive',
+            index=models.Index(fields=['report_type', 'created_at'], name='user_operat_report__e78062_idx'),
+        ),
+        migrations.RunPython(compress_archive_table, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.2.10 on 2026-10-19 17:58
+
+from django.db import migrations, models
+import home.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0054_user_operation_log_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QCMeasurement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_type', models.CharField(choices=[('dongtai', '东泰QC报表'), ('yuantong', '远通QC报表'), ('yuantong2', '远通2号QC报表'), ('dayuan', '大塬QC报表'), ('changfu', '长富QC报表'), ('xinghui', '兴辉QC报表'), ('xinghui2', '兴辉2号QC报表')], max_length=20, verbose_name='报表类型')),
+                ('report_id', models.BigIntegerField(verbose_name='报表ID')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('time', models.TimeField(verbose_name='时间')),
+                ('shift', models.CharField(default='', max_length=10, verbose_name='班次')),
+                ('product_name', models.CharField(default='', max_length=100, verbose_name='产品名称')),
+                ('packaging', models.CharField(default='', max_length=50, verbose_name='包装类型')),
+                ('batch_number', models.CharField(default='', max_length=50, verbose_name='批号')),
+                ('material_type', models.CharField(blank=True, default='', max_length=50, verbose_name='物料类型')),
+                ('moisture_after_drying', models.FloatField(blank=True, null=True, verbose_name='干燥后原土水分(%)')),
+                ('alkali_content', models.FloatField(blank=True, null=True, verbose_name='入窑前碱含量(%)')),
+                ('flux', models.CharField(blank=True, max_length=50, null=True, verbose_name='助溶剂添加比例')),
+                ('permeability', models.FloatField(blank=True, null=True, verbose_name='远通渗透率(Darcy)')),
+                ('permeability_long', models.FloatField(blank=True, null=True, verbose_name='长富渗透率(Darcy)')),
+                ('xinghui_permeability', models.FloatField(blank=True, null=True, verbose_name='兴辉渗透率(Darcy)')),
+                ('dongtai_permeability_coefficient', models.FloatField(blank=True, null=True, verbose_name='东泰渗透率系数')),
+                ('dongtai_sample_weight', models.FloatField(blank=True, null=True, verbose_name='东泰样品重量')),
+                ('dongtai_filter_area', models.FloatField(blank=True, null=True, verbose_name='东泰过滤面积')),
+                ('yuantong_permeability_coefficient', models.FloatField(blank=True, null=True, verbose_name='远通渗透率系数')),
+                ('yuantong_sample_weight', models.FloatField(blank=True, null=True, verbose_name='远通样品重量')),
+                ('yuantong_filter_area', models.FloatField(blank=True, null=True, verbose_name='远通过滤面积')),
+                ('wet_cake_density', models.FloatField(blank=True, null=True, verbose_name='饼密度(g/cm3)')),
+                ('yuantong_cake_density', models.FloatField(blank=True, null=True, verbose_name='远通饼密度(g/cm3)')),
+                ('changfu_cake_density', models.FloatField(blank=True, null=True, verbose_name='长富饼密度(g/cm3)')),
+                ('filter_time', models.FloatField(blank=True, null=True, verbose_name='过滤时间(秒)')),
+                ('water_viscosity', models.DecimalField(blank=True, decimal_places=4, max_digits=8, null=True, verbose_name='水黏度(mPa.s)')),
+                ('cake_thickness', models.FloatField(blank=True, null=True, verbose_name='饼厚(mm)')),
+                ('bulk_density', models.FloatField(blank=True, null=True, verbose_name='振实密度(g/cm3)')),
+                ('brightness', models.FloatField(blank=True, null=True, verbose_name='白度')),
+                ('swirl', models.CharField(blank=True, max_length=100, null=True, verbose_name='涡值(cm)')),
+                ('odor', home.models.NullableFloatField(blank=True, null=True, verbose_name='气味')),
+                ('conductance', models.FloatField(blank=True, null=True, verbose_name='电导值(ms/cm)')),
+                ('ph', models.FloatField(blank=True, null=True, verbose_name='pH')),
+                ('moisture', models.FloatField(blank=True, null=True, verbose_name='水分(%)')),
+                ('bags', models.FloatField(blank=True, null=True, verbose_name='袋数')),
+                ('tons', models.DecimalField(blank=True, decimal_places=4, max_digits=10, null=True, verbose_name='吨')),
+                ('sieving_14m', models.FloatField(blank=True, null=True, verbose_name='+14M (%)')),
+                ('sieving_30m', models.FloatField(blank=True, null=True, verbose_name='+30M (%)')),
+                ('sieving_40m', models.FloatField(blank=True, null=True, verbose_name='+40M (%)')),
+                ('sieving_80m', models.FloatField(blank=True, null=True, verbose_name='+80M (%)')),
+                ('sieving_100m', models.CharField(blank=True, max_length=100, null=True, verbose_name='+100M (%)')),
+                ('sieving_150m', models.CharField(blank=True, max_length=100, null=True, verbose_name='+150M (%)')),
+                ('sieving_200m', models.CharField(blank=True, max_length=100, null=True, verbose_name='+200M (%)')),
+                ('sieving_325m', models.CharField(blank=True, max_length=100, null=True, verbose_name='+325M (%)')),
+                ('fe_ion', models.FloatField(blank=True, null=True, verbose_name='Fe离子')),
+                ('ca_ion', models.FloatField(blank=True, null=True, verbose_name='Ca离子')),
+                ('al_ion', models.FloatField(blank=True, null=True, verbose_name='Al离子')),
+                ('oil_absorption', models.FloatField(blank=True, null=True, verbose_name='吸油量')),
+                ('water_absorption', models.FloatField(blank=True, null=True, verbose_name='吸水量')),
+                ('remarks', models.TextField(blank=True, default='', verbose_name='备注')),
+                ('username', models.CharField(blank=True, max_length=150, null=True, verbose_name='用户名')),
+                ('created_at', models.DateTimeField(verbose_name='创建时间')),
+                ('updated_at', models.DateTimeField(verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': 'QC报表统一存储',
+                'verbose_name_plural': 'QC报表统一存储',
+                'db_table': 'qc_measurement',
+                'ordering': ['-date', '-time', '-id'],
+                'indexes': [models.Index(fields=['date', 'report_type'], name='qc_measurem_date_f2c4a3_idx'), models.Index(fields=['product_name', 'date'], name='qc_measurem_product_9fb93d_idx'), models.Index(fields=['batch_number'], name='qc_measurem_batch_n_98723b_idx')],
+                'unique_together': {('report_type', 'report_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.10 on 2026-10-19 18:03
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0055_qc_measurement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QCDataVersion',
+            fields=[
+                ('report_type', models.CharField(choices=[('dongtai', '东泰QC报表'), ('yuantong', '远通QC报表'), ('yuantong2', '远通2号QC报表'), ('dayuan', '大塬QC报表'), ('changfu', '长富QC报表'), ('xinghui', '兴辉QC报表'), ('xinghui2', '兴辉2号QC报表')], max_length=20, primary_key=True, serialize=False, verbose_name='报表类型')),
+                ('version', models.BigIntegerField(default=0, verbose_name='版本号')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': 'QC报表数据版本',
+                'verbose_name_plural': 'QC报表数据版本',
+                'db_table': 'qc_data_version',
+            },
+        ),
+    ]
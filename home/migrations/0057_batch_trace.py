@@ -0,0 +1,32 @@
+# Generated by Django 4.2.10 on 2026-10-19 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0056_qc_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BatchTrace',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_key', models.CharField(max_length=100, verbose_name='规范化批号')),
+                ('batch_number', models.CharField(max_length=100, verbose_name='原始批号')),
+                ('source_type', models.CharField(choices=[('dongtai', '东泰QC报表'), ('yuantong', '远通QC报表'), ('yuantong2', '远通2号QC报表'), ('dayuan', '大塬QC报表'), ('changfu', '长富QC报表'), ('xinghui', '兴辉QC报表'), ('xinghui2', '兴辉2号QC报表'), ('raw_soil', '原土入库')], max_length=20, verbose_name='来源类型')),
+                ('source_id', models.BigIntegerField(verbose_name='来源记录ID')),
+                ('fnumber', models.CharField(blank=True, default='', max_length=100, verbose_name='原土入库单据编号')),
+                ('date', models.DateField(blank=True, null=True, verbose_name='日期')),
+            ],
+            options={
+                'verbose_name': '批号追溯索引',
+                'verbose_name_plural': '批号追溯索引',
+                'db_table': 'batch_trace',
+                'indexes': [models.Index(fields=['batch_key', 'date'], name='batch_trace_batch_k_e5ede3_idx')],
+                'unique_together': {('source_type', 'source_id')},
+            },
+        ),
+    ]
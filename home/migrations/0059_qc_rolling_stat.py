@@ -0,0 +1,32 @@
+# Generated by Django 4.2.10 on 2026-10-19 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0058_qc_spec_limit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QCRollingStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_type', models.CharField(choices=[('dongtai', '东泰QC报表'), ('yuantong', '远通QC报表'), ('yuantong2', '远通2号QC报表'), ('dayuan', '大塬QC报表'), ('changfu', '长富QC报表'), ('xinghui', '兴辉QC报表'), ('xinghui2', '兴辉2号QC报表')], max_length=20, verbose_name='报表类型')),
+                ('product_name', models.CharField(max_length=100, verbose_name='产品型号')),
+                ('field_name', models.CharField(max_length=50, verbose_name='指标字段')),
+                ('count', models.IntegerField(default=0, verbose_name='样本数')),
+                ('mean', models.FloatField(default=0, verbose_name='均值')),
+                ('m2', models.FloatField(default=0, verbose_name='偏差平方和')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': 'QC指标滚动统计',
+                'verbose_name_plural': 'QC指标滚动统计',
+                'db_table': 'qc_rolling_stat',
+                'unique_together': {('report_type', 'product_name', 'field_name')},
+            },
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from decimal import Decimal
 from django.contrib.auth.models import User
+from django.utils import timezone
 from datetime import date
 
 class NullableFloatField(models.FloatField):
@@ -121,11 +122,87 @@ class RawSoilStorage(models.Model):
         ordering = ['-biz_date', '-created_at']
         verbose_name = '原土入库记录'
         verbose_name_plural = '原土入库记录'
+        indexes = [
+            models.Index(fields=['biz_date', 'created_at']),
+            models.Index(fields=['storage_org_code', 'biz_date', 'created_at']),
+        ]
 
     def __str__(self):
         return f"{self.fnumber} - {self.material_name} - {self.biz_date}"
 
 
+class EASStorageDocument(models.Model):
+    """EAS入库单据本地缓存（按 库存组织+仓库 查询结果缓存，保留EAS原始单据）"""
+    fnumber = models.CharField('单据编号', max_length=100)
+    org_code = models.CharField('库存组织编码', max_length=50)
+    warehouse_code = models.CharField('仓库编码', max_length=50)
+    biz_date = models.DateField('业务日期', null=True, blank=True)
+    payload = models.JSONField('EAS原始单据', default=dict)
+    synced_at = models.DateTimeField('同步时间', auto_now=True)
+
+    class Meta:
+        db_table = 'eas_storage_document'
+        ordering = ['-biz_date', 'fnumber']
+        verbose_name = 'EAS入库单据缓存'
+        verbose_name_plural = 'EAS入库单据缓存'
+        unique_together = ['fnumber', 'org_code', 'warehouse_code']
+        indexes = [
+            models.Index(fields=['org_code', 'warehouse_code', 'biz_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.fnumber} - {self.org_code}/{self.warehouse_code} - {self.biz_date}"
+
+
+class EASStorageEntry(models.Model):
+    """EAS入库单据分录缓存，入库历史的列表、筛选、分页和物料汇总直接查询此表"""
+    document = models.ForeignKey(EASStorageDocument, on_delete=models.CASCADE, related_name='entries')
+    entry_seq = models.IntegerField('分录序号', default=0)
+    fnumber = models.CharField('单据编号', max_length=100)
+    org_code = models.CharField('库存组织编码', max_length=50)
+    warehouse_code = models.CharField('仓库编码', max_length=50)
+    biz_date = models.DateField('业务日期', null=True, blank=True)
+    biz_date_text = models.CharField('业务日期原文', max_length=50, blank=True, default='')
+    warehouse_name = models.CharField('仓库名称', max_length=100, blank=True, default='')
+    storage_org_name = models.CharField('库存组织名称', max_length=100, blank=True, default='')
+    cost_center_name = models.CharField('成本中心名称', max_length=100, blank=True, default='')
+    material_number = models.CharField('物料编码', max_length=50, blank=True, default='')
+    material_name = models.CharField('物料名称', max_length=100, blank=True, default='')
+    quantity = models.DecimalField('数量', max_digits=18, decimal_places=4, null=True, blank=True)
+    lot = models.CharField('批次号', max_length=100, blank=True, default='')
+
+    class Meta:
+        db_table = 'eas_storage_entry'
+        ordering = ['-biz_date', 'fnumber', 'entry_seq']
+        verbose_name = 'EAS入库分录缓存'
+        verbose_name_plural = 'EAS入库分录缓存'
+        indexes = [
+            models.Index(fields=['org_code', 'warehouse_code', 'biz_date']),
+            models.Index(fields=['warehouse_code', 'biz_date']),
+            models.Index(fields=['biz_date', 'material_name']),
+        ]
+
+    def __str__(self):
+        return f"{self.fnumber}#{self.entry_seq} - {self.material_name} - {self.quantity}"
+
+
+class EASSyncWindow(models.Model):
+    """EAS缓存同步窗口：记录每个 库存组织+仓库+业务日期 最近一次从EAS拉取的时间"""
+    org_code = models.CharField('库存组织编码', max_length=50)
+    warehouse_code = models.CharField('仓库编码', max_length=50)
+    biz_date = models.DateField('业务日期')
+    synced_at = models.DateTimeField('同步时间')
+
+    class Meta:
+        db_table = 'eas_sync_window'
+        verbose_name = 'EAS缓存同步窗口'
+        verbose_name_plural = 'EAS缓存同步窗口'
+        unique_together = ['org_code', 'warehouse_code', 'biz_date']
+
+    def __str__(self):
+        return f"{self.org_code}/{self.warehouse_code} - {self.biz_date} - {self.synced_at}"
+
+
 class QCReport(models.Model):
     """QC报表基础模型"""
     date = models.DateField('检测日期')
@@ -568,6 +645,190 @@ class Yuantong2QCReport(models.Model):
         return f"{self.date} - {self.product_name}"
 
 
+class QCMeasurement(models.Model):
+    """
+    各厂区QC报表统一存储（跨厂区查询、统计用）
+    七张厂区QC报表表仍是数据来源，保存/删除时由信号同步到这里（home/signals.py），
+    历史数据用 sync_qc_measurements 命令回填；某厂区没有的专属字段为空
+    """
+    REPORT_TYPES = [
+        ('dongtai', '东泰QC报表'),
+        ('yuantong', '远通QC报表'),
+        ('yuantong2', '远通2号QC报表'),
+        ('dayuan', '大塬QC报表'),
+        ('changfu', '长富QC报表'),
+        ('xinghui', '兴辉QC报表'),
+        ('xinghui2', '兴辉2号QC报表'),
+    ]
+
+    report_type = models.CharField('报表类型', max_length=20, choices=REPORT_TYPES)
+    report_id = models.BigIntegerField('报表ID')
+    # 基本信息
+    date = models.DateField('日期')
+    time = models.TimeField('时间')
+    shift = models.CharField('班次', max_length=10, default='')
+    product_name = models.CharField('产品名称', max_length=100, default='')
+    packaging = models.CharField('包装类型', max_length=50, default='')
+    batch_number = models.CharField('批号', max_length=50, default='')
+    material_type = models.CharField('物料类型', max_length=50, blank=True, default='')
+    moisture_after_drying = models.FloatField('干燥后原土水分(%)', null=True, blank=True)
+    alkali_content = models.FloatField('入窑前碱含量(%)', null=True, blank=True)
+    flux = models.CharField('助溶剂添加比例', max_length=50, null=True, blank=True)
+    # 渗透率及相关参数
+    permeability = models.FloatField('远通渗透率(Darcy)', null=True, blank=True)
+    permeability_long = models.FloatField('长富渗透率(Darcy)', null=True, blank=True)
+    xinghui_permeability = models.FloatField('兴辉渗透率(Darcy)', null=True, blank=True)
+    dongtai_permeability_coefficient = models.FloatField('东泰渗透率系数', null=True, blank=True)
+    dongtai_sample_weight = models.FloatField('东泰样品重量', null=True, blank=True)
+    dongtai_filter_area = models.FloatField('东泰过滤面积', null=True, blank=True)
+    yuantong_permeability_coefficient = models.FloatField('远通渗透率系数', null=True, blank=True)
+    yuantong_sample_weight = models.FloatField('远通样品重量', null=True, blank=True)
+    yuantong_filter_area = models.FloatField('远通过滤面积', null=True, blank=True)
+    wet_cake_density = models.FloatField('饼密度(g/cm3)', null=True, blank=True)
+    yuantong_cake_density = models.FloatField('远通饼密度(g/cm3)', null=True, blank=True)
+    changfu_cake_density = models.FloatField('长富饼密度(g/cm3)', null=True, blank=True)
+    filter_time = models.FloatField('过滤时间(秒)', null=True, blank=True)
+    water_viscosity = models.DecimalField('水黏度(mPa.s)', max_digits=8, decimal_places=4, null=True, blank=True)
+    cake_thickness = models.FloatField('饼厚(mm)', null=True, blank=True)
+    # 物理化学指标
+    bulk_density = models.FloatField('振实密度(g/cm3)', null=True, blank=True)
+    brightness = models.FloatField('白度', null=True, blank=True)
+    # 东泰的涡值是文本，统一按文本保存
+    swirl = models.CharField('涡值(cm)', max_length=100, null=True, blank=True)
+    odor = NullableFloatField('气味', null=True, blank=True)
+    conductance = models.FloatField('电导值(ms/cm)', null=True, blank=True)
+    ph = models.FloatField('pH', null=True, blank=True)
+    moisture = models.FloatField('水分(%)', null=True, blank=True)
+    bags = models.FloatField('袋数', null=True, blank=True)
+    tons = models.DecimalField('吨', max_digits=10, decimal_places=4, null=True, blank=True)
+    sieving_14m = models.FloatField('+14M (%)', null=True, blank=True)
+    sieving_30m = models.FloatField('+30M (%)', null=True, blank=True)
+    sieving_40m = models.FloatField('+40M (%)', null=True, blank=True)
+    sieving_80m = models.FloatField('+80M (%)', null=True, blank=True)
+    sieving_100m = models.CharField('+100M (%)', max_length=100, blank=True, null=True)
+    sieving_150m = models.CharField('+150M (%)', max_length=100, blank=True, null=True)
+    sieving_200m = models.CharField('+200M (%)', max_length=100, blank=True, null=True)
+    sieving_325m = models.CharField('+325M (%)', max_length=100, blank=True, null=True)
+    fe_ion = models.FloatField('Fe离子', null=True, blank=True)
+    ca_ion = models.FloatField('Ca离子', null=True, blank=True)
+    al_ion = models.FloatField('Al离子', null=True, blank=True)
+    oil_absorption = models.FloatField('吸油量', null=True, blank=True)
+    water_absorption = models.FloatField('吸水量', null=True, blank=True)
+    remarks = models.TextField('备注', blank=True, default='')
+    username = models.CharField('用户名', max_length=150, null=True, blank=True)
+    # 与来源报表一致的创建、更新时间
+    created_at = models.DateTimeField('创建时间')
+    updated_at = models.DateTimeField('更新时间')
+
+    class Meta:
+        db_table = 'qc_measurement'
+        ordering = ['-date', '-time', '-id']
+        verbose_name = 'QC报表统一存储'
+        verbose_name_plural = 'QC报表统一存储'
+        unique_together = ['report_type', 'report_id']
+        indexes = [
+            models.Index(fields=['date', 'report_type']),
+            models.Index(fields=['product_name', 'date']),
+            models.Index(fields=['batch_number']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_report_type_display()} #{self.report_id} - {self.date} - {self.product_name}"
+
+
+class QCDataVersion(models.Model):
+    """
+    各厂区QC报表的数据版本号
+    报表保存/删除时由信号递增（home/signals.py），列表、统计和导出接口据此生成 ETag/Last-Modified，
+    数据未变化时直接返回304，不查询报表表；report_type 为 'permissions' 的记录是编辑权限参数和角色权限的版本号
+    """
+    report_type = models.CharField('报表类型', max_length=20, choices=QCMeasurement.REPORT_TYPES, primary_key=True)
+    version = models.BigIntegerField('版本号', default=0)
+    updated_at = models.DateTimeField('更新时间', default=timezone.now)
+
+    class Meta:
+        db_table = 'qc_data_version'
+        verbose_name = 'QC报表数据版本'
+        verbose_name_plural = 'QC报表数据版本'
+
+    def __str__(self):
+        return f"{self.get_report_type_display()} v{self.version}"
+
+
+class BatchTrace(models.Model):
+    """
+    批号追溯索引：规范化后的批号 -> 各厂区QC报表和原土入库记录
+    QC报表的 batch_number、原土入库的 lot 保存/删除时由信号同步（home/signals.py），
+    历史数据用 sync_batch_traces 命令回填；批号为空的记录不写入
+    """
+    SOURCE_TYPES = QCMeasurement.REPORT_TYPES + [('raw_soil', '原土入库')]
+
+    batch_key = models.CharField('规范化批号', max_length=100)
+    batch_number = models.CharField('原始批号', max_length=100)
+    source_type = models.CharField('来源类型', max_length=20, choices=SOURCE_TYPES)
+    source_id = models.BigIntegerField('来源记录ID')
+    fnumber = models.CharField('原土入库单据编号', max_length=100, blank=True, default='')
+    date = models.DateField('日期', null=True, blank=True)
+
+    class Meta:
+        db_table = 'batch_trace'
+        verbose_name = '批号追溯索引'
+        verbose_name_plural = '批号追溯索引'
+        unique_together = ['source_type', 'source_id']
+        indexes = [
+            models.Index(fields=['batch_key', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.batch_key} - {self.get_source_type_display()} #{self.source_id}"
+
+
+class QCSpecLimit(models.Model):
+    """
+    QC指标规格限（SPC过程能力 Cp/Cpk 使用）
+    product_name 为空表示该厂区该指标的默认规格，具体产品型号的配置优先
+    """
+    report_type = models.CharField('报表类型', max_length=20, choices=QCMeasurement.REPORT_TYPES)
+    product_name = models.CharField('产品型号', max_length=100, blank=True, default='')
+    field_name = models.CharField('指标字段', max_length=50)
+    lsl = models.FloatField('规格下限', null=True, blank=True)
+    usl = models.FloatField('规格上限', null=True, blank=True)
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+
+    class Meta:
+        db_table = 'qc_spec_limit'
+        verbose_name = 'QC指标规格限'
+        verbose_name_plural = 'QC指标规格限'
+        unique_together = ['report_type', 'product_name', 'field_name']
+
+    def __str__(self):
+        return f"{self.get_report_type_display()} {self.product_name or '全部产品'} {self.field_name}: {self.lsl} ~ {self.usl}"
+
+
+class QCRollingStat(models.Model):
+    """
+    QC指标滚动统计（按 厂区 + 产品型号 + 指标 的最近N个检测值）
+    新建报表时用 Welford 算法 O(1) 更新均值和偏差平方和（m2，方差 = m2 / (count - 1)），
+    用于判断新检测值是否超出均值 ± N倍标准差
+    """
+    report_type = models.CharField('报表类型', max_length=20, choices=QCMeasurement.REPORT_TYPES)
+    product_name = models.CharField('产品型号', max_length=100)
+    field_name = models.CharField('指标字段', max_length=50)
+    count = models.IntegerField('样本数', default=0)
+    mean = models.FloatField('均值', default=0)
+    m2 = models.FloatField('偏差平方和', default=0)
+    updated_at = models.DateTimeField('更新时间', auto_now=True)
+
+    class Meta:
+        db_table = 'qc_rolling_stat'
+        verbose_name = 'QC指标滚动统计'
+        verbose_name_plural = 'QC指标滚动统计'
+        unique_together = ['report_type', 'product_name', 'field_name']
+
+    def __str__(self):
+        return f"{self.get_report_type_display()} {self.product_name} {self.field_name}: n={self.count}"
+
+
 class ProductModel(models.Model):
     """产品型号模型"""
     name = models.CharField(max_length=100, unique=True, verbose_name='产品型号名称')
@@ -683,6 +944,8 @@ class UserOperationLog(models.Model):
         ('EXPORT', '导出'),
         ('LOGIN', '登录'),
         ('LOGOUT', '登出'),
+        ('SYNC', '同步'),
+        ('ACCESS', '访问'),
     ]
     
     REPORT_TYPES = [
@@ -715,8 +978,8 @@ class UserOperationLog(models.Model):
     request_path = models.CharField('请求路径', max_length=500)
     request_method = models.CharField('请求方法', max_length=10)
     
-    # 时间信息
-    created_at = models.DateTimeField('操作时间', auto_now_add=True)
+    # 时间信息（日志缓冲写入，操作时间在记录时确定而不是写库时）
+    created_at = models.DateTimeField('操作时间', default=timezone.now)
     
     class Meta:
         db_table = 'user_operation_log'
@@ -728,6 +991,7 @@ class UserOperationLog(models.Model):
             models.Index(fields=['operation_type', 'created_at']),
             models.Index(fields=['report_type', 'created_at']),
             models.Index(fields=['username', 'created_at']),
+            models.Index(fields=['created_at']),
         ]
     
     def __str__(self):
@@ -736,13 +1000,18 @@ class UserOperationLog(models.Model):
     @classmethod
     def log_operation(cls, request, operation_type, report_type=None, report_id=None, 
                      operation_detail='', old_data=None, new_data=None):
-        """记录用户操作的便捷方法"""
+        """
+        记录用户操作的便捷方法
+        日志对象放入缓冲队列由后台线程批量写库，返回的对象可能尚未保存（id 为 None）
+        """
         try:
             from decimal import Decimal
             import datetime
             
             user = request.user if hasattr(request, 'user') else None
             username = user.username if user and user.is_authenticated else 'anonymous'
+            if not (user and user.is_authenticated):
+                user = None
             
             # 获取客户端IP地址
             ip_address = cls._get_client_ip(request)
@@ -780,7 +1049,7 @@ class UserOperationLog(models.Model):
             serialized_new_data = serialize_for_json(new_data) if new_data is not None else None
             
             # 创建日志记录
-            log_entry = cls.objects.create(
+            log_entry = cls(
                 user=user,
                 username=username,
                 operation_type=operation_type,
@@ -794,11 +1063,28 @@ class UserOperationLog(models.Model):
                 request_path=request_path,
                 request_method=request_method,
             )
+            from home.utils.operation_log import enqueue_operation_log
+            enqueue_operation_log(log_entry)
+            # 标记本次请求已记录，审计中间件并入用户操作日志时据此去重
+            try:
+                request._operation_logged = True
+            except AttributeError:
+                pass
             
-            # 同时记录到Django日志
+            # 同时记录一条结构化日志
+            import json
             import logging
             logger = logging.getLogger('user_operations')
-            logger.info(f"用户操作日志: {log_entry}")
+            logger.info("用户操作 " + json.dumps({
+                'username': username,
+                'operation_type': operation_type,
+                'report_type': report_type,
+                'report_id': report_id,
+                'detail': operation_detail,
+                'method': request_method,
+                'path': request_path,
+                'ip': ip_address,
+            }, ensure_ascii=False))
             
             return log_entry
             
@@ -817,4 +1103,37 @@ class UserOperationLog(models.Model):
             ip = x_forwarded_for.split(',')[0]
         else:
             ip = request.META.get('REMOTE_ADDR')
-        return ip
\ No newline at end of file
+        return ip
+
+
+class UserOperationLogArchive(models.Model):
+    """用户操作日志归档表：超过保留期的日志按月从 user_operation_log 移入，保留原ID，操作日志页面按日期范围透明查询"""
+    id = models.BigIntegerField(primary_key=True)
+    user_id = models.IntegerField('操作用户ID', null=True, blank=True)
+    username = models.CharField('用户名', max_length=150)
+    operation_type = models.CharField('操作类型', max_length=20, choices=UserOperationLog.OPERATION_TYPES)
+    report_type = models.CharField('报表类型', max_length=20, choices=UserOperationLog.REPORT_TYPES, null=True, blank=True)
+    report_id = models.IntegerField('报表ID', null=True, blank=True)
+    operation_detail = models.TextField('操作详情', blank=True)
+    old_data = models.JSONField('旧数据', null=True, blank=True)
+    new_data = models.JSONField('新数据', null=True, blank=True)
+    ip_address = models.GenericIPAddressField('IP地址', null=True, blank=True)
+    user_agent = models.TextField('用户代理', blank=True)
+    request_path = models.CharField('请求路径', max_length=500)
+    request_method = models.CharField('请求方法', max_length=10)
+    created_at = models.DateTimeField('操作时间')
+
+    class Meta:
+        db_table = 'user_operation_log_archive'
+        ordering = ['-created_at']
+        verbose_name = '用户操作日志归档'
+        verbose_name_plural = '用户操作日志归档'
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['username', 'created_at']),
+            models.Index(fields=['operation_type', 'created_at']),
+            models.Index(fields=['report_type', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.username} - {self.get_operation_type_display()} - {self.created_at.strftime('%Y-%m-%d %H:%M:%S')}"
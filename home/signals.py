@@ -0,0 +1,132 @@
+"""
+Django信号处理器
+厂区QC报表保存、删除时同步跨厂区统一存储（QCMeasurement），并递增该厂区的数据版本号（QCDataVersion）；
+QC报表新建时判断指标是否异常并更新滚动统计（QCRollingStat），异常指标保存在 instance._qc_alerts 供接口返回和告警
+QC报表和原土入库记录保存、删除时同步批号追溯索引（BatchTrace）
+规格限（QCSpecLimit）变化时也递增对应厂区的数据版本号，SPC接口的ETag随之失效
+编辑期限、跨用户编辑参数（Parameter）和角色权限（system 的 Permission/RolePermission/UserRole）变化时递增权限版本号，
+列表中的编辑、删除权限标记随之刷新
+产品型号、包装物变化时递增自动完成索引版本号，各进程下次查询时重建索引
+"""
+import logging
+
+from django.db.models.signals import post_delete, post_save
+
+from home.utils.autocomplete import bump_suggest_version
+from home.utils.batch_trace import delete_batch_trace, sync_batch_trace
+from home.utils.qc_data_version import EDIT_PERMISSION_PARAMETERS, bump_data_version, bump_permission_version
+from home.utils.qc_profiles import QC_REPORT_MODELS, delete_measurement, get_profile_for_model, sync_measurement
+from home.utils.qc_rolling_stats import update_rolling_stats
+
+logger = logging.getLogger(__name__)
+
+
+def sync_qc_measurement(sender, instance, **kwargs):
+    # 同步失败不影响报表保存，可用 sync_qc_measurements 命令补齐
+    try:
+        sync_measurement(instance)
+    except Exception as e:
+        logger.error(f"同步QC统一存储失败 {sender.__name__}#{instance.pk}: {str(e)}", exc_info=True)
+
+
+def remove_qc_measurement(sender, instance, **kwargs):
+    try:
+        delete_measurement(instance)
+    except Exception as e:
+        logger.error(f"删除QC统一存储记录失败 {sender.__name__}#{instance.pk}: {str(e)}", exc_info=True)
+
+
+def bump_qc_data_version(sender, instance, **kwargs):
+    # 版本号递增失败时条件请求可能返回旧数据的304，记录错误以便排查
+    try:
+        bump_data_version(get_profile_for_model(sender).report_type)
+    except Exception as e:
+        logger.error(f"递增QC数据版本失败 {sender.__name__}#{instance.pk}: {str(e)}", exc_info=True)
+
+
+def update_qc_rolling_stats(sender, instance, created, **kwargs):
+    # 只统计新建的报表（修改报表不重复计入）；统计失败不影响报表保存，可用 rebuild_qc_rolling_stats 命令重建
+    if not created:
+        return
+    try:
+        instance._qc_alerts = update_rolling_stats(get_profile_for_model(sender).report_type, instance)
+    except Exception as e:
+        logger.error(f"更新QC滚动统计失败 {sender.__name__}#{instance.pk}: {str(e)}", exc_info=True)
+
+
+def bump_spec_limit_data_version(sender, instance, **kwargs):
+    try:
+        bump_data_version(instance.report_type)
+    except Exception as e:
+        logger.error(f"递增QC数据版本失败 QCSpecLimit#{instance.pk}: {str(e)}", exc_info=True)
+
+
+def bump_parameter_permission_version(sender, instance, **kwargs):
+    if instance.pk not in EDIT_PERMISSION_PARAMETERS:
+        return
+    try:
+        bump_permission_version()
+    except Exception as e:
+        logger.error(f"递增QC权限版本失败 Parameter#{instance.pk}: {str(e)}", exc_info=True)
+
+
+def bump_role_permission_version(sender, instance, **kwargs):
+    try:
+        bump_permission_version()
+    except Exception as e:
+        logger.error(f"递增QC权限版本失败 {sender.__name__}#{instance.pk}: {str(e)}", exc_info=True)
+
+
+def bump_product_model_suggest_version(sender, instance, **kwargs):
+    try:
+        bump_suggest_version('product_model')
+    except Exception as e:
+        logger.error(f"递增自动完成索引版本失败 ProductModel#{instance.pk}: {str(e)}", exc_info=True)
+
+
+def bump_packaging_suggest_version(sender, instance, **kwargs):
+    try:
+        bump_suggest_version('packaging')
+    except Exception as e:
+        logger.error(f"递增自动完成索引版本失败 Packaging#{instance.pk}: {str(e)}", exc_info=True)
+
+
+def sync_batch_trace_index(sender, instance, **kwargs):
+    # 同步失败不影响记录保存，可用 sync_batch_traces 命令补齐
+    try:
+        sync_batch_trace(instance)
+    except Exception as e:
+        logger.error(f"同步批号追溯索引失败 {sender.__name__}#{instance.pk}: {str(e)}", exc_info=True)
+
+
+def remove_batch_trace_index(sender, instance, **kwargs):
+    try:
+        delete_batch_trace(instance)
+    except Exception as e:
+        logger.error(f"删除批号追溯索引失败 {sender.__name__}#{instance.pk}: {str(e)}", exc_info=True)
+
+
+for _report_type, _model_name in QC_REPORT_MODELS:
+    post_save.connect(sync_qc_measurement, sender=f'home.{_model_name}', dispatch_uid=f'qc_measurement_save_{_report_type}')
+    post_delete.connect(remove_qc_measurement, sender=f'home.{_model_name}', dispatch_uid=f'qc_measurement_delete_{_report_type}')
+    post_save.connect(bump_qc_data_version, sender=f'home.{_model_name}', dispatch_uid=f'qc_data_version_save_{_report_type}')
+    post_delete.connect(bump_qc_data_version, sender=f'home.{_model_name}', dispatch_uid=f'qc_data_version_delete_{_report_type}')
+    post_save.connect(update_qc_rolling_stats, sender=f'home.{_model_name}', dispatch_uid=f'qc_rolling_stats_save_{_report_type}')
+
+for _model_name in [model_name for _, model_name in QC_REPORT_MODELS] + ['RawSoilStorage']:
+    post_save.connect(sync_batch_trace_index, sender=f'home.{_model_name}', dispatch_uid=f'batch_trace_save_{_model_name}')
+    post_delete.connect(remove_batch_trace_index, sender=f'home.{_model_name}', dispatch_uid=f'batch_trace_delete_{_model_name}')
+
+post_save.connect(bump_spec_limit_data_version, sender='home.QCSpecLimit', dispatch_uid='qc_data_version_save_spec_limit')
+post_delete.connect(bump_spec_limit_data_version, sender='home.QCSpecLimit', dispatch_uid='qc_data_version_delete_spec_limit')
+
+post_save.connect(bump_parameter_permission_version, sender='home.Parameter', dispatch_uid='qc_permission_version_save_parameter')
+post_delete.connect(bump_parameter_permission_version, sender='home.Parameter', dispatch_uid='qc_permission_version_delete_parameter')
+for _model_name in ('Permission', 'RolePermission', 'UserRole'):
+    post_save.connect(bump_role_permission_version, sender=f'system.{_model_name}', dispatch_uid=f'qc_permission_version_save_{_model_name}')
+    post_delete.connect(bump_role_permission_version, sender=f'system.{_model_name}', dispatch_uid=f'qc_permission_version_delete_{_model_name}')
+
+post_save.connect(bump_product_model_suggest_version, sender='home.ProductModel', dispatch_uid='suggest_version_save_product_model')
+post_delete.connect(bump_product_model_suggest_version, sender='home.ProductModel', dispatch_uid='suggest_version_delete_product_model')
+post_save.connect(bump_packaging_suggest_version, sender='home.Packaging', dispatch_uid='suggest_version_save_packaging')
+post_delete.connect(bump_packaging_suggest_version, sender='home.Packaging', dispatch_uid='suggest_version_delete_packaging')
@@ -0,0 +1,681 @@
+"""
+Redis 缓存/会话配置测试
+用 fakeredis 代替 Redis 服务器：按 CACHE_PROFILE=redis 加载配置，验证 cached_db 会话读写和
+SessionRefreshThrottleMiddleware 的续期节流
+QC滚动统计测试：验证任何方式新建报表都会由 post_save 信号更新统计，接口只负责返回和发送告警
+模型校验表测试：整批校验的错误矩阵，以及Excel导入按错误矩阵跳过有错误的行
+操作日志缓冲测试：整批写入失败时逐条写入，单条错误写入日志文件，数据库不可用时放回队列
+条件请求测试：编辑权限参数、角色权限变化后 ETag 失效
+跨厂区查询和批号追溯测试：从统一存储（QCMeasurement）一次查询，排序、条数限制和各厂区数据权限
+日志归档测试：归档文件写入或热表删除中途中断后重新归档不写重复数据；操作日志查询跨热表和归档表分页
+原土入库游标分页测试：排序键相同的记录、恰好整页的最后一页和篡改的游标
+QC趋势降采样测试：LTTB 保留首尾点和尖峰，分组汇总按日期范围和点数选择粒度
+自动完成索引测试：前缀、拼音首字母、包含的匹配顺序，名称表变化后重建索引
+企业微信审批事件测试：处理失败重试时不重复发送已成功的通知
+运行: python manage.py test home（需安装 fakeredis）
+"""
+import base64
+import copy
+import importlib.util
+import gzip
+import io
+import json
+import os
+import runpy
+import tempfile
+from datetime import date, datetime, time, timedelta
+from unittest import mock, skipUnless
+
+import fakeredis
+import pandas as pd
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError
+from django.db.models import Q
+from django.db.models.query import QuerySet
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from core.middleware import SessionRefreshThrottleMiddleware
+from system.models import Role, UserRole
+from home.excel_import_utils import import_xinghui_report_data
+from home.models import (
+    Packaging, Parameter, ProductModel, QCMeasurement, QCRollingStat, QCSpecLimit, RawSoilStorage, UserOperationLog,
+    UserOperationLogArchive, XinghuiQCReport,
+)
+from home.utils.autocomplete import SuggestIndex, name_initials
+from home.utils.batch_trace import trace_batch
+from home.utils.log_archive import OperationLogQuery, _write_month, archive_logs
+from home.utils.operation_log import OperationLogBuffer
+from home.utils.qc_data_version import conditional_qc_response
+from home.utils.qc_profiles import get_profile
+from home.utils.qc_trend import get_trend, lttb
+from home.utils.raw_soil_query import RawSoilQueryResult, build_raw_soil_queryset
+from home.utils.qc_search import search_qc_reports
+from home.utils.validators import get_validation_schema
+from home.views.qc_reports import DayuanQCReportAPI
+from tasks.models import TaskLog, WeChatEventReceipt
+from tasks.tasks import process_wechat_approval_event
+
+SETTINGS_PATH = os.path.join(settings.BASE_DIR, 'yuantong', 'settings.py')
+FAKE_REDIS_SERVER = fakeredis.FakeServer()
+
+
+def load_profile_settings(profile):
+    """按指定 CACHE_PROFILE 执行 settings.py，返回其中的配置（不影响当前进程已加载的配置）"""
+    with mock.patch.dict(os.environ, {'CACHE_PROFILE': profile}):
+        return runpy.run_path(SETTINGS_PATH)
+
+
+def fake_redis_caches():
+    """CACHE_PROFILE=redis 的缓存配置，连接改为 fakeredis"""
+    caches = copy.deepcopy(load_profile_settings('redis')['CACHES'])
+    caches['default']['OPTIONS'] = {'connection_class': fakeredis.FakeConnection, 'server': FAKE_REDIS_SERVER}
+    return caches
+
+
+class CacheProfileSettingsTests(TestCase):
+
+    def test_redis_profile_uses_redis_cache_and_cached_db_sessions(self):
+        profile = load_profile_settings('redis')
+        self.assertEqual(profile['CACHES']['default']['BACKEND'], 'django.core.cache.backends.redis.RedisCache')
+        self.assertEqual(profile['SESSION_ENGINE'], 'django.contrib.sessions.backends.cached_db')
+        self.assertEqual(profile['SESSION_CACHE_ALIAS'], 'default')
+
+    def test_locmem_profile_uses_database_sessions(self):
+        profile = load_profile_settings('locmem')
+        self.assertEqual(profile['CACHES']['default']['BACKEND'], 'django.core.cache.backends.locmem.LocMemCache')
+        self.assertEqual(profile['SESSION_ENGINE'], 'django.contrib.sessions.backends.db')
+
+
+@override_settings(
+    CACHES=fake_redis_caches(),
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    SESSION_CACHE_ALIAS='default',
+)
+class RedisSessionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def _create_session(self):
+        session = SessionStore()
+        session['_auth_user_id'] = '1'
+        session.create()
+        return session
+
+    def test_session_read_from_redis_without_database_query(self):
+        session = self._create_session()
+        self.assertIsNotNone(cache.get(session.cache_key))
+        with self.assertNumQueries(0):
+            self.assertEqual(SessionStore(session.session_key)['_auth_user_id'], '1')
+
+    def test_session_survives_redis_flush(self):
+        session = self._create_session()
+        cache.clear()
+        # 缓存中没有时回源数据库，用户不会因 Redis 清空而退出登录
+        with self.assertNumQueries(1):
+            self.assertEqual(SessionStore(session.session_key)['_auth_user_id'], '1')
+        self.assertIsNotNone(cache.get(session.cache_key))
+
+
+@override_settings(
+    CACHES=fake_redis_caches(),
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    SESSION_CACHE_ALIAS='default',
+    SESSION_SAVE_EVERY_REQUEST=False,
+    SESSION_REFRESH_INTERVAL=300,
+)
+class SessionRefreshThrottleMiddlewareTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        # 与 settings.MIDDLEWARE 中的顺序一致：节流中间件在 SessionMiddleware 之后
+        self.middleware = SessionMiddleware(SessionRefreshThrottleMiddleware(lambda request: HttpResponse('ok')))
+
+    def _request(self, session_key=None):
+        request = self.factory.get('/')
+        if session_key:
+            request.COOKIES[settings.SESSION_COOKIE_NAME] = session_key
+        return request
+
+    def _request_at(self, timestamp, session_key):
+        with mock.patch('core.middleware.time.time', return_value=timestamp):
+            return self.middleware(self._request(session_key))
+
+    def test_refresh_is_throttled_by_interval(self):
+        session = SessionStore()
+        session['_auth_user_id'] = '1'
+        session.create()
+        key = session.session_key
+
+        response = self._request_at(1000, key)
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertEqual(SessionStore(key)[SessionRefreshThrottleMiddleware.REFRESH_KEY], 1000)
+
+        # 续期间隔内不写会话，也不重新下发 cookie
+        response = self._request_at(1100, key)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertEqual(SessionStore(key)[SessionRefreshThrottleMiddleware.REFRESH_KEY], 1000)
+
+        response = self._request_at(1400, key)
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertEqual(SessionStore(key)[SessionRefreshThrottleMiddleware.REFRESH_KEY], 1400)
+
+    def test_anonymous_request_does_not_create_session(self):
+        response = self.middleware(self._request())
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+
+class QCRollingStatSignalTests(TestCase):
+
+    def setUp(self):
+        self.model = get_profile('dayuan').model
+
+    def _create_report(self, moisture):
+        return self.model.objects.create(
+            date=date(2026, 1, 5), time=time(8, 0), username='tester', product_name='P1', moisture=moisture,
+        )
+
+    def _moisture_stat(self):
+        return QCRollingStat.objects.get(report_type='dayuan', product_name='P1', field_name='moisture')
+
+    def test_create_outside_api_updates_stats(self):
+        for value in (1.0, 2.0, 3.0):
+            self._create_report(value)
+        stat = self._moisture_stat()
+        self.assertEqual(stat.count, 3)
+        self.assertAlmostEqual(stat.mean, 2.0)
+
+    def test_update_does_not_count_again(self):
+        report = self._create_report(1.0)
+        report.moisture = 5.0
+        report.save()
+        self.assertEqual(self._moisture_stat().count, 1)
+
+    def test_api_dispatches_alerts_computed_on_create(self):
+        QCSpecLimit.objects.create(report_type='dayuan', field_name='moisture', usl=2.0)
+        report = self._create_report(3.0)
+        with mock.patch('tasks.tasks.send_qc_alert.delay') as delay:
+            alerts = DayuanQCReportAPI()._check_qc_alerts(report)
+        self.assertEqual([alert['field'] for alert in alerts], ['moisture'])
+        self.assertEqual(alerts[0]['reasons'], ['高于规格上限'])
+        delay.assert_called_once_with('dayuan', report.id, alerts)
+        # 统计已在创建时更新，接口不再重复计入
+        self.assertEqual(self._moisture_stat().count, 1)
+
+    def test_api_without_alerts_does_not_dispatch(self):
+        report = self._create_report(1.0)
+        with mock.patch('tasks.tasks.send_qc_alert.delay') as delay:
+            self.assertEqual(DayuanQCReportAPI()._check_qc_alerts(report), [])
+        delay.assert_not_called()
+
+
+class ValidationSchemaTests(TestCase):
+
+    def setUp(self):
+        self.schema = get_validation_schema(XinghuiQCReport)
+
+    def test_validate_rows_returns_only_error_rows(self):
+        rows = {
+            2: {'date': '2026-01-05', 'shift': '白班', 'moisture': '1.5'},
+            3: {'date': '2026-13-05', 'shift': '白班' * 10, 'moisture': '1.5'},
+            4: {'date': '2026-01-05', 'moisture': 'abc'},
+        }
+        matrix = self.schema.validate_rows(rows, {'moisture': '水分'})
+        self.assertEqual(sorted(matrix), [3, 4])
+        self.assertEqual(sorted(matrix[3]), ['date', 'shift'])
+        self.assertIn('水分', matrix[4]['moisture'])
+
+    def test_validate_rows_accepts_sequence_and_skip(self):
+        rows = [{'username': 'x' * 500}, {'moisture': 'abc'}]
+        self.assertEqual(list(self.schema.validate_rows(rows, skip=('username',))), [1])
+
+
+class ExcelImportValidationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('importer')
+        self.factory = RequestFactory()
+
+    def _import(self, rows):
+        buffer = io.BytesIO()
+        pd.DataFrame(rows).to_excel(buffer, index=False)
+        upload = SimpleUploadedFile('import.xlsx', buffer.getvalue())
+        request = self.factory.post('/import/', {'excel_file': upload})
+        request.user = self.user
+        return json.loads(import_xinghui_report_data(request, XinghuiQCReport, '兴辉报表', 'xinghui').content)
+
+    def test_rows_with_errors_are_skipped_and_reported_by_excel_line(self):
+        result = self._import([
+            {'日期': '2026-01-05', '产品名称': 'P1', '班次': '白班'},
+            {'日期': '2026-01-05', '产品名称': 'P2', '班次': '白班' * 10},
+            {'日期': '2026-01-06', '产品名称': 'P3', '班次': '夜班'},
+        ])
+        self.assertEqual(result['imported_count'], 2)
+        self.assertEqual(result['error_count'], 1)
+        # 第1行为表头，第二条数据位于Excel第3行
+        self.assertTrue(result['error_messages'][0].startswith('第 3 行数据校验失败'))
+        self.assertEqual(
+            sorted(XinghuiQCReport.objects.values_list('product_name', flat=True)), ['P1', 'P3']
+        )
+
+
+class CrossPlantQueryTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', password='x')
+        self.nobody = User.objects.create_user('nobody')
+
+    def _create(self, report_type, day, hour, batch_number='B-2026-01', username='tester'):
+        return get_profile(report_type).model.objects.create(
+            date=date(2026, 1, day), time=time(hour, 0), username=username,
+            product_name='P1', batch_number=batch_number,
+        )
+
+    def test_reports_are_mirrored_into_measurements(self):
+        report = self._create('dayuan', 5, 8)
+        self.assertTrue(QCMeasurement.objects.filter(report_type='dayuan', report_id=report.pk).exists())
+        report.delete()
+        self.assertFalse(QCMeasurement.objects.exists())
+
+    def test_search_orders_across_plants_in_one_query(self):
+        self._create('dayuan', 5, 8)
+        latest = self._create('xinghui', 6, 9)
+        self._create('changfu', 6, 7)
+        with self.assertNumQueries(1):
+            rows = search_qc_reports(self.admin, {'batch_number': 'B-2026'})
+        self.assertEqual([row['report_type'] for row in rows], ['xinghui', 'changfu', 'dayuan'])
+        self.assertEqual(rows[0]['id'], latest.pk)
+        self.assertEqual(rows[0]['report_label'], get_profile('xinghui').label)
+
+    def test_search_limit_and_report_types(self):
+        for day in range(1, 6):
+            self._create('dayuan', day, 8)
+            self._create('changfu', day, 9)
+        rows = search_qc_reports(self.admin, {}, limit=3)
+        self.assertEqual([(row['report_type'], row['date'].day) for row in rows],
+                         [('changfu', 5), ('dayuan', 5), ('changfu', 4)])
+        rows = search_qc_reports(self.admin, {'start_date': date(2026, 1, 4)}, report_types=['dayuan'])
+        self.assertEqual([row['date'].day for row in rows], [5, 4])
+
+    def test_search_applies_each_plants_data_filter(self):
+        self._create('dayuan', 5, 8, username='alice')
+        self._create('dayuan', 5, 9, username='bob')
+        self._create('changfu', 5, 10, username='bob')
+        filters = {
+            'dayuan_qc_report': {'username': 'alice'},
+            'changfu_qc_report': {'id': None},
+        }
+        with mock.patch('home.utils.qc_search.get_user_data_filter_by_company_department',
+                        side_effect=lambda user, module, field: filters.get(module, {'id': None})):
+            rows = search_qc_reports(self.admin, {})
+        self.assertEqual([(row['report_type'], row['username']) for row in rows], [('dayuan', 'alice')])
+        self.assertEqual(search_qc_reports(self.nobody, {}), [])
+
+    def test_trace_reads_qc_details_from_measurements(self):
+        self._create('dayuan', 5, 8, batch_number='b-2026 01')
+        self._create('xinghui', 6, 8, batch_number='B2026-01')
+        self._create('changfu', 6, 8, batch_number='C2026')
+        result = trace_batch('B202601', self.admin)
+        self.assertEqual([row['report_type'] for row in result['qc_reports']], ['xinghui', 'dayuan'])
+        self.assertEqual(trace_batch('B202601', self.nobody)['qc_reports'], [])
+
+
+class QCConditionalResponseTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('viewer')
+        self.factory = RequestFactory()
+
+    def _get(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        request = self.factory.get('/api/dayuan-report/', **headers)
+        request.user = self.user
+        return conditional_qc_response(request, 'dayuan', lambda: HttpResponse('ok'))
+
+    def _assert_invalidated_by(self, change):
+        etag = self._get()['ETag']
+        self.assertEqual(self._get(etag).status_code, 304)
+        change()
+        response = self._get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_edit_limit_parameter_invalidates_etag(self):
+        self._assert_invalidated_by(lambda: Parameter.objects.create(id='report_edit_limit', name='编辑期限', value='3'))
+
+    def test_role_assignment_invalidates_etag(self):
+        role = Role.objects.create(name='QC')
+        self._assert_invalidated_by(lambda: UserRole.objects.create(user=self.user, role=role))
+
+    def test_unrelated_parameter_keeps_etag(self):
+        etag = self._get()['ETag']
+        Parameter.objects.create(id='site_title', name='标题', value='x')
+        self.assertEqual(self._get(etag).status_code, 304)
+
+
+class OperationLogBufferTests(TestCase):
+
+    def setUp(self):
+        self.buffer = OperationLogBuffer('home.UserOperationLog', batch_size=10, flush_interval=60, max_size=100)
+
+    def _enqueue(self, *usernames):
+        # 直接放入队列，不启动后台写入线程
+        for username in usernames:
+            self.buffer._queue.append(UserOperationLog(username=username, operation_type='VIEW'))
+
+    def test_invalid_row_is_dumped_and_does_not_block_later_flushes(self):
+        self._enqueue('a', None, 'b')
+        with self.assertLogs('user_operations', 'ERROR') as logs:
+            self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(len(self.buffer), 0)
+        self.assertIn('操作日志写库失败', logs.output[0])
+        self.assertEqual(sorted(UserOperationLog.objects.values_list('username', flat=True)), ['a', 'b'])
+
+        self._enqueue('c')
+        self.assertEqual(self.buffer.flush(), 1)
+
+    def test_rows_are_requeued_while_database_is_unavailable(self):
+        self._enqueue('a', 'b')
+        error = OperationalError('connection lost')
+        with mock.patch.object(UserOperationLog.objects, 'bulk_create', side_effect=error), \
+                mock.patch.object(UserOperationLog, 'save', side_effect=error), \
+                mock.patch('django.db.backends.sqlite3.base.DatabaseWrapper.is_usable', return_value=False):
+            self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual([entry.username for entry in self.buffer._queue], ['a', 'b'])
+        self.assertEqual(self.buffer.flush(), 2)
+
+
+class LogArchiveTests(TestCase):
+
+    TODAY = date(2026, 10, 19)  # TASK_LOG_RETENTION_DAYS=30 时归档 9 月之前的日志
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.archive_dir = tmp.name
+        for day in (date(2026, 7, 10), date(2026, 8, 5), date(2026, 8, 20)):
+            log = TaskLog.objects.create(task_name='send_qc_report', status='success')
+            TaskLog.objects.filter(id=log.id).update(created_at=timezone.make_aware(datetime.combine(day, time(8))))
+        TaskLog.objects.create(task_name='send_qc_report', status='success')
+
+    def _archive(self):
+        with override_settings(LOG_ARCHIVE_DIR=self.archive_dir, TASK_LOG_RETENTION_DAYS=30):
+            return archive_logs(['task_log'], batch_size=2, today=self.TODAY)['task_log']['count']
+
+    def _archived_ids(self):
+        ids = []
+        for month in ('2026-07', '2026-08'):
+            with gzip.open(os.path.join(self.archive_dir, 'task_log', f'{month}.jsonl.gz'), 'rt', encoding='utf-8') as fp:
+                ids += [json.loads(line)['id'] for line in fp]
+        return sorted(ids)
+
+    def test_archive_moves_old_logs_by_month(self):
+        self.assertEqual(self._archive(), 3)
+        self.assertEqual(len(self._archived_ids()), 3)
+        self.assertEqual(TaskLog.objects.count(), 1)
+
+    def test_rerun_after_crash_before_delete_does_not_duplicate(self):
+        with mock.patch.object(QuerySet, 'delete', side_effect=RuntimeError('killed')):
+            with self.assertRaises(RuntimeError):
+                self._archive()
+        self.assertEqual(TaskLog.objects.count(), 4)
+        self.assertEqual(self._archive(), 1)
+        self.assertEqual(len(set(self._archived_ids())), 3)
+        self.assertEqual(len(self._archived_ids()), 3)
+        self.assertEqual(TaskLog.objects.count(), 1)
+
+    def test_rerun_after_crash_while_writing_does_not_duplicate(self):
+        # 第一批（7月、8月各一条）正常写入，第二批追加到已有的 8 月文件后中断
+        calls = []
+
+        def write_then_crash(path, rows):
+            _write_month(path, rows)
+            calls.append(path)
+            if len(calls) == 3:
+                raise RuntimeError('killed')
+
+        with mock.patch('home.utils.log_archive._write_month', side_effect=write_then_crash):
+            with self.assertRaises(RuntimeError):
+                self._archive()
+        self.assertEqual(TaskLog.objects.count(), 2)
+        self.assertEqual(self._archive(), 1)
+        self.assertEqual(len(self._archived_ids()), 3)
+        self.assertEqual(len(set(self._archived_ids())), 3)
+        self.assertEqual(TaskLog.objects.count(), 1)
+
+
+class OperationLogQueryTests(TestCase):
+
+    def setUp(self):
+        base = timezone.make_aware(datetime(2026, 10, 1, 8))
+        for index in range(3):
+            UserOperationLog.objects.create(
+                username='hot', operation_type='VIEW', request_path='/', request_method='GET',
+                created_at=base + timedelta(hours=index),
+            )
+        for index in range(3):
+            # 归档表的ID沿用热表ID，不自增
+            UserOperationLogArchive.objects.create(
+                id=index + 1, username='archive', operation_type='VIEW', request_path='/', request_method='GET',
+                created_at=base - timedelta(days=60, hours=index),
+            )
+
+    def _usernames(self, logs):
+        return [(log.username, archived) for log, archived in logs]
+
+    def test_page_spans_hot_and_archive_tables(self):
+        query = OperationLogQuery(Q())
+        logs, pagination = query.page(2, 2)
+        self.assertEqual(self._usernames(logs), [('hot', False), ('archive', True)])
+        self.assertEqual(pagination['total_count'], 6)
+        self.assertEqual(pagination['total_pages'], 3)
+
+        logs, pagination = query.page(3, 2)
+        self.assertEqual(self._usernames(logs), [('archive', True), ('archive', True)])
+        self.assertFalse(pagination['has_next'])
+        created = [log.created_at for log, _ in query.page(1, 6)[0]]
+        self.assertEqual(created, sorted(created, reverse=True))
+
+    def test_out_of_range_page_returns_last_page(self):
+        logs, pagination = OperationLogQuery(Q()).page(99, 4)
+        self.assertEqual(pagination['current_page'], 2)
+        self.assertEqual(len(logs), 2)
+
+    def test_start_date_inside_hot_table_skips_archive(self):
+        query = OperationLogQuery(Q(), start_datetime=timezone.make_aware(datetime(2026, 10, 1, 9)))
+        self.assertFalse(query.include_archive)
+        self.assertEqual(query.page(1, 10)[1]['total_count'], 3)
+
+
+class RawSoilCursorPagingTests(TestCase):
+
+    def setUp(self):
+        # 三天各两条，其中 1 月 2 日的两条创建时间相同，只能靠主键区分顺序
+        same_moment = timezone.make_aware(datetime(2026, 1, 2, 8))
+        for index, (day, hour) in enumerate([(1, 8), (1, 9), (2, None), (2, None), (3, 8), (3, 9)]):
+            soil = RawSoilStorage.objects.create(
+                fnumber=f'F{index}', biz_date=date(2026, 1, day), material_code='M', material_name='原土',
+                quantity=index + 1, cost_center_code='C', storage_org_code='S', warehouse_code='W',
+                cost_object_code='O', created_by='tester',
+            )
+            created_at = same_moment if hour is None else timezone.make_aware(datetime(2026, 1, day, hour))
+            RawSoilStorage.objects.filter(id=soil.id).update(created_at=created_at)
+        self.expected = ['F5', 'F4', 'F3', 'F2', 'F1', 'F0']
+
+    def _page(self, cursor=None, limit=4, chunk_size=2):
+        result = RawSoilQueryResult(build_raw_soil_queryset(cursor=cursor), limit=limit, chunk_size=chunk_size)
+        rows = list(result.rows())
+        return [row['fnumber'] for row in rows], result.summary()
+
+    def test_pages_follow_ordering_without_gaps_or_duplicates(self):
+        fnumbers, summary = self._page()
+        self.assertEqual(fnumbers, self.expected[:4])
+        self.assertEqual(summary['count'], 4)
+        self.assertEqual(summary['quantity_total'], 6 + 5 + 4 + 3)
+
+        fnumbers, summary = self._page(summary['next_cursor'])
+        self.assertEqual(fnumbers, self.expected[4:])
+        self.assertIsNone(summary['next_cursor'])
+
+    def test_cursor_between_tied_rows(self):
+        # 游标停在创建时间相同的两条记录之间
+        fnumbers, summary = self._page(limit=3)
+        self.assertEqual(fnumbers, self.expected[:3])
+        fnumbers, _ = self._page(summary['next_cursor'], limit=3)
+        self.assertEqual(fnumbers, self.expected[3:])
+
+    def test_exactly_full_last_page_has_no_next_cursor(self):
+        fnumbers, summary = self._page(limit=3, chunk_size=3)
+        fnumbers, summary = self._page(summary['next_cursor'], limit=3, chunk_size=3)
+        self.assertEqual(fnumbers, self.expected[3:])
+        self.assertIsNone(summary['next_cursor'])
+
+    def test_unlimited_query_streams_all_rows_in_chunks(self):
+        fnumbers, summary = self._page(limit=None, chunk_size=4)
+        self.assertEqual(fnumbers, self.expected)
+        self.assertNotIn('next_cursor', summary)
+
+    def test_tampered_cursor_is_rejected(self):
+        def encode(value):
+            return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+        cursors = (
+            'not-a-cursor',
+            base64.urlsafe_b64encode(b'\xff\xfe').decode(),
+            encode({'a': 1}),
+            encode(['2026-01-02', 'x', 1]),
+            encode(['2026-01-02', '2026-01-02T08:00:00+08:00']),
+            encode(['2026-01-02', '2026-01-02T08:00:00+08:00', None]),
+        )
+        for cursor in cursors:
+            with self.subTest(cursor=cursor), self.assertRaises(ValueError):
+                build_raw_soil_queryset(cursor=cursor)
+
+
+class QCTrendTests(TestCase):
+
+    def test_lttb_keeps_endpoints_and_spike(self):
+        points = [(x, 1000.0 if x == 37 else float(x % 5), None) for x in range(100)]
+        sampled = lttb(points, 10)
+        self.assertEqual(len(sampled), 10)
+        self.assertEqual(sampled[0], points[0])
+        self.assertEqual(sampled[-1], points[-1])
+        xs = [point[0] for point in sampled]
+        self.assertEqual(xs, sorted(set(xs)))
+        self.assertIn(37, xs)
+
+    def test_lttb_returns_short_series_unchanged(self):
+        points = [(x, float(x), None) for x in range(5)]
+        self.assertEqual(lttb(points, 5), points)
+        self.assertEqual(lttb(points, 2), points)
+
+    def _create(self, day, value):
+        XinghuiQCReport.objects.create(date=day, time=time(8), username='tester', product_name='P1', ph=value)
+
+    def test_lttb_trend_downsamples_reports(self):
+        for offset in range(20):
+            self._create(date(2026, 1, 1) + timedelta(days=offset), offset)
+        result = get_trend('xinghui', 'ph', date(2026, 1, 1), date(2026, 1, 31), points=5)
+        self.assertEqual(result['sample_count'], 20)
+        self.assertEqual(len(result['data']), 5)
+        self.assertEqual(result['data'][0], {'t': '2026-01-01 08:00', 'value': 0})
+
+    def test_bucket_granularity_follows_span_and_points(self):
+        self._create(date(2026, 1, 5), 7)
+        self._create(date(2026, 1, 5), 9)
+        self._create(date(2026, 2, 20), 8)
+        cases = [
+            ((date(2026, 1, 1), date(2026, 1, 31), 31), 'day'),
+            ((date(2026, 1, 1), date(2026, 1, 31), 30), 'week'),
+            ((date(2026, 1, 1), date(2026, 6, 30), 10), 'month'),
+            ((date(2024, 1, 1), date(2026, 6, 30), 3), 'month'),  # 月粒度仍超过点数时使用最粗粒度
+        ]
+        for (start_date, end_date, points), granularity in cases:
+            with self.subTest(points=points, granularity=granularity):
+                result = get_trend('xinghui', 'ph', start_date, end_date, points=points, method='bucket')
+                self.assertEqual(result['granularity'], granularity)
+                self.assertEqual(result['sample_count'], 3 if end_date.month > 1 else 2)
+        first = get_trend('xinghui', 'ph', date(2026, 1, 1), date(2026, 1, 31), points=31, method='bucket')['data'][0]
+        self.assertEqual(first, {'t': '2026-01-05', 'min': 7.0, 'max': 9.0, 'avg': 8.0, 'count': 2})
+
+
+class SuggestIndexTests(TestCase):
+
+    INITIALS = {'矮白': 'ab', '大矮白': 'dab'}
+
+    def setUp(self):
+        cache.clear()
+        for name in ('XAB', 'AB100', 'AB200', '矮白', '大矮白', 'CD'):
+            ProductModel.objects.create(name=name)
+        for _ in range(2):
+            XinghuiQCReport.objects.create(date=date.today(), time=time(8), username='tester', product_name='AB200')
+        self.index = SuggestIndex('product_model')
+        # 拼音首字母固定，不依赖 pypinyin
+        patcher = mock.patch(
+            'home.utils.autocomplete.name_initials', side_effect=lambda name: self.INITIALS.get(name, '')
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _names(self, query, limit=10):
+        return [item['name'] for item in self.index.search(query, limit)]
+
+    def test_tiers_are_prefix_initials_contains(self):
+        # 名称前缀（按使用次数）、拼音首字母前缀、名称包含、拼音首字母包含
+        self.assertEqual(self._names('Ab'), ['AB200', 'AB100', '矮白', 'XAB', '大矮白'])
+        self.assertEqual(self._names('ab', limit=3), ['AB200', 'AB100', '矮白'])
+        self.assertEqual(self._names('  '), [])
+
+    def test_name_change_bumps_version_and_rebuilds(self):
+        self.assertEqual(self._names('zz'), [])
+        with self.assertNumQueries(0):
+            self._names('cd')
+        ProductModel.objects.create(name='ZZ1')
+        self.assertEqual(self._names('zz'), ['ZZ1'])
+        ProductModel.objects.filter(name='ZZ1').get().delete()
+        self.assertEqual(self._names('zz'), [])
+
+    def test_packaging_index_is_separate(self):
+        Packaging.objects.create(name='AB袋')
+        self.assertEqual([item['name'] for item in SuggestIndex('packaging').search('ab')], ['AB袋'])
+
+    @skipUnless(importlib.util.find_spec('pypinyin'), '未安装 pypinyin')
+    def test_name_initials_with_pypinyin(self):
+        self.assertEqual(name_initials('吨袋25kg'), 'dd25kg')
+
+    def test_name_initials_without_chinese(self):
+        self.assertEqual(name_initials('AB100'), '')
+
+
+class WeChatApprovalEventTests(TestCase):
+
+    APPROVAL_INFO = {'approval_info': {
+        'ThirdNo': 'SP001', 'OpenSpStatus': '2', 'ApplyUserId': 'applicant',
+        'approval_nodes': [{'NodeStatus': '2', 'items': [{'ItemUserId': 'approver', 'ItemStatus': '2'}]}],
+    }}
+
+    def test_retry_does_not_resend_successful_notifications(self):
+        # 申请人发送成功后审批人发送异常，重试时只补发审批人
+        with mock.patch('home.utils.wechat_approval.get_approval_detail', return_value=None), \
+                mock.patch('home.utils.wechat_approval.send_approval_notification',
+                           side_effect=[True, RuntimeError('timeout'), True]) as send:
+            process_wechat_approval_event.apply(args=(self.APPROVAL_INFO,))
+        self.assertEqual([call.args[0] for call in send.call_args_list], ['applicant', 'approver', 'approver'])
+        receipt = WeChatEventReceipt.objects.get(sp_no='SP001')
+        self.assertEqual(receipt.status, 'done')
+        self.assertEqual(receipt.notified_users, ['applicant', 'approver'])
+
+    def test_duplicate_push_is_skipped(self):
+        with mock.patch('home.utils.wechat_approval.get_approval_detail', return_value=None), \
+                mock.patch('home.utils.wechat_approval.send_approval_notification', return_value=True) as send:
+            process_wechat_approval_event.apply(args=(self.APPROVAL_INFO,))
+            process_wechat_approval_event.apply(args=(self.APPROVAL_INFO,))
+        self.assertEqual(send.call_count, 2)
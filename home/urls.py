@@ -22,6 +22,7 @@ from .views import (
     export_xinghui_report_excel, export_xinghui_yesterday_production, export_xinghui_today_production,
     export_changfu_report_excel, export_changfu_yesterday_production, export_changfu_today_production,
     export_xinghui2_report_excel, export_xinghui2_yesterday_production, export_xinghui2_today_production,
+    qc_search_api, batch_trace_api, qc_spc_api, qc_trend_api,
     # 导入缺失的函数
     yuantong_report_download_template, yuantong_report_import_excel,
     yuantong2_report_download_template, yuantong2_report_import_excel,
@@ -184,6 +185,10 @@ urlpatterns = [
     path('api/xinghui2-report/<int:report_id>/', Xinghui2QCReportAPI.as_view(), name='xinghui2_report_detail_api'),
     path('api/yuantong2-report/', Yuantong2QCReportAPI.as_view(), name='yuantong2_report_api'),
     path('api/yuantong2-report/<int:report_id>/', Yuantong2QCReportAPI.as_view(), name='yuantong2_report_detail_api'),
+    path('api/qc/search/', qc_search_api, name='qc_search_api'),
+    path('api/batch-trace/', batch_trace_api, name='batch_trace_api'),
+    path('api/qc/spc/', qc_spc_api, name='qc_spc_api'),
+    path('api/qc/trend/', qc_trend_api, name='qc_trend_api'),
     
     # RBAC权限管理路由
     path('system/rbac-management/', views.rbac_management, name='rbac_management'),
@@ -0,0 +1,152 @@
+"""
+产品型号、包装物自动完成索引模块
+每个进程在内存中保存产品型号（ProductModel）和包装物（Packaging）的名称索引，按最近QC报表中的使用次数排序，
+支持前缀、包含和拼音首字母匹配，输入时不再查询数据库。
+名称表变化时由信号递增缓存中的版本号，各进程查询前比较版本号，变化或超过 QC_SUGGEST_REFRESH_SECONDS 后重建
+（使用次数随报表录入变化，定期重建即可，不随每次报表保存重建）
+"""
+
+import logging
+import threading
+import time as time_module
+from collections import Counter
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from home.models import Packaging, ProductModel
+from home.utils.qc_profiles import get_profiles
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUGGEST_LIMIT = 10
+
+# 索引类型: (名称表, QC报表中对应的字段)
+SUGGEST_SOURCES = {
+    'product_model': (ProductModel, 'product_name'),
+    'packaging': (Packaging, 'packaging'),
+}
+
+
+def _version_key(kind):
+    return f'qc_suggest_version:{kind}'
+
+
+def bump_suggest_version(kind):
+    """名称表变化后递增版本号，各进程下次查询时重建索引"""
+    key = _version_key(kind)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def name_initials(name):
+    """中文名称的拼音首字母（如 '吨袋25kg' -> 'dd25kg'）；不含中文或未安装 pypinyin 时为空字符串"""
+    if not any('一' <= char <= '鿿' for char in name):
+        return ''
+    # pypinyin 加载拼音词典较慢，只在重建索引时导入
+    try:
+        from pypinyin import Style, lazy_pinyin
+    except ImportError:
+        return ''
+    return ''.join(lazy_pinyin(name, style=Style.FIRST_LETTER, errors='default')).lower()
+
+
+def usage_counts(field_name, days):
+    """最近 days 天各厂区QC报表中每个名称出现的次数"""
+    since = date.today() - timedelta(days=days)
+    counts = Counter()
+    for profile in get_profiles().values():
+        rows = profile.model.objects.filter(date__gte=since).exclude(**{field_name: ''}).values(
+            field_name
+        ).annotate(usage=Count('id')).values_list(field_name, 'usage')
+        for name, usage in rows:
+            if name:
+                counts[name.strip()] += usage
+    return counts
+
+
+class SuggestIndex:
+    """单个类型的内存索引；entries 为按使用次数降序、名称升序排列的 (id, 名称, 小写名称, 拼音首字母, 使用次数)"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.entries = ()
+        self.version = None
+        self.built_at = 0.0
+        self._lock = threading.Lock()
+
+    def _current_version(self):
+        try:
+            return cache.get(_version_key(self.kind), 0)
+        except Exception as e:
+            logger.warning(f"读取自动完成索引版本失败 {self.kind}: {str(e)}")
+            return self.version if self.version is not None else 0
+
+    def _is_fresh(self, version):
+        return (
+            self.version is not None
+            and version == self.version
+            and time_module.monotonic() - self.built_at < settings.QC_SUGGEST_REFRESH_SECONDS
+        )
+
+    def ensure_fresh(self):
+        version = self._current_version()
+        if self._is_fresh(version):
+            return
+        with self._lock:
+            if not self._is_fresh(version):
+                self.rebuild(version)
+
+    def rebuild(self, version):
+        model, field_name = SUGGEST_SOURCES[self.kind]
+        started = time_module.monotonic()
+        usage = usage_counts(field_name, settings.QC_SUGGEST_USAGE_DAYS)
+        entries = [
+            (pk, name, name.lower(), name_initials(name), usage.get(name.strip(), 0))
+            for pk, name in model.objects.values_list('id', 'name')
+        ]
+        entries.sort(key=lambda entry: (-entry[4], entry[1]))
+        # 整体替换，查询线程看到的始终是完整的索引
+        self.entries = tuple(entries)
+        self.version = version
+        self.built_at = time_module.monotonic()
+        logger.info(
+            f"自动完成索引重建 {self.kind}: {len(entries)}条, 耗时{(self.built_at - started) * 1000:.0f}ms"
+        )
+
+    def search(self, query, limit=DEFAULT_SUGGEST_LIMIT):
+        """
+        依次返回：名称前缀匹配、拼音首字母前缀匹配、名称包含、拼音首字母包含，同一级内按使用次数排序
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+        self.ensure_fresh()
+
+        tiers = ([], [], [], [])
+        for entry in self.entries:
+            _, _, lower_name, initials, _ = entry
+            if lower_name.startswith(query):
+                tiers[0].append(entry)
+                if len(tiers[0]) >= limit:
+                    break
+            elif initials.startswith(query) and initials:
+                tiers[1].append(entry)
+            elif query in lower_name:
+                tiers[2].append(entry)
+            elif query in initials:
+                tiers[3].append(entry)
+        matched = [entry for tier in tiers for entry in tier][:limit]
+        return [{'id': pk, 'name': name} for pk, name, _, _, _ in matched]
+
+
+_indexes = {kind: SuggestIndex(kind) for kind in SUGGEST_SOURCES}
+
+
+def suggest(kind, query, limit=DEFAULT_SUGGEST_LIMIT):
+    """按类型（product_model / packaging）查询自动完成候选"""
+    return _indexes[kind].search(query, limit)
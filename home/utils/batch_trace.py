@@ -0,0 +1,170 @@
+"""
+批号追溯模块
+QC报表的批号和原土入库的批次号没有索引，按批号追溯时只能逐表模糊查询。
+这里维护规范化批号 -> 来源记录的索引表（BatchTrace），追溯时按索引找到记录ID，
+QC报表明细从跨厂区统一存储（QCMeasurement）一次取出，原土入库明细按主键从原表取出
+"""
+
+import logging
+import operator
+import re
+import unicodedata
+from datetime import date, time
+from functools import reduce
+
+from django.db import transaction
+from django.db.models import Q
+
+from home.models import BatchTrace, RawSoilStorage
+from home.utils.permissions import user_has_permission
+from home.utils.qc_profiles import QC_REPORT_MODELS, get_profile, get_profile_for_model
+from home.utils.qc_search import visible_measurements
+
+logger = logging.getLogger(__name__)
+
+RAW_SOIL_SOURCE = 'raw_soil'
+SYNC_BATCH_SIZE = 500
+TRACE_LIMIT = 500
+
+# 规范化时去掉的空白和连接符
+_SEPARATORS = re.compile(r'[\s\-_/\\.·]+')
+
+# QC报表明细的列（id 为来源厂区报表的ID）
+QC_TRACE_FIELDS = ('date', 'time', 'shift', 'product_name', 'packaging', 'batch_number', 'tons', 'username')
+RAW_SOIL_TRACE_FIELDS = (
+    'id', 'fnumber', 'biz_date', 'material_code', 'material_name', 'quantity', 'actual_quantity', 'lot',
+    'storage_org_code', 'warehouse_code',
+)
+
+
+def normalize_batch_key(value):
+    """全角转半角、去掉空白和连接符、转大写，如 ' ｂ-2024 01 ' -> 'B202401'"""
+    value = unicodedata.normalize('NFKC', str(value or ''))
+    return _SEPARATORS.sub('', value).upper()[:100]
+
+
+def _trace_source(instance):
+    """返回 (来源类型, 原始批号, 日期, 原土单据编号)，不是追溯来源的模型返回 None"""
+    if isinstance(instance, RawSoilStorage):
+        return RAW_SOIL_SOURCE, instance.lot, instance.biz_date, instance.fnumber
+    profile = get_profile_for_model(instance)
+    if profile is None:
+        return None
+    return profile.report_type, instance.batch_number, instance.date, ''
+
+
+def _trace_entry(source_type, source_id, batch_number, day, fnumber):
+    return BatchTrace(
+        batch_key=normalize_batch_key(batch_number),
+        batch_number=str(batch_number).strip()[:100],
+        source_type=source_type,
+        source_id=source_id,
+        fnumber=fnumber or '',
+        date=day,
+    )
+
+
+def sync_batch_trace(instance):
+    """记录保存后更新追溯索引；批号被清空时删除索引"""
+    source = _trace_source(instance)
+    if source is None:
+        return
+    source_type, batch_number, day, fnumber = source
+    if not normalize_batch_key(batch_number):
+        BatchTrace.objects.filter(source_type=source_type, source_id=instance.pk).delete()
+        return
+    entry = _trace_entry(source_type, instance.pk, batch_number, day, fnumber)
+    BatchTrace.objects.update_or_create(
+        source_type=source_type, source_id=instance.pk,
+        defaults={
+            'batch_key': entry.batch_key, 'batch_number': entry.batch_number,
+            'fnumber': entry.fnumber, 'date': entry.date,
+        },
+    )
+
+
+def delete_batch_trace(instance):
+    """记录删除后移除追溯索引"""
+    source = _trace_source(instance)
+    if source is None:
+        return
+    BatchTrace.objects.filter(source_type=source[0], source_id=instance.pk).delete()
+
+
+def _source_queryset(source_type):
+    """来源表查询：(模型, values 字段: 批号、日期、单据编号)"""
+    if source_type == RAW_SOIL_SOURCE:
+        return RawSoilStorage, ('lot', 'biz_date', 'fnumber')
+    return get_profile(source_type).model, ('batch_number', 'date')
+
+
+def backfill_batch_traces(source_types=None, batch_size=SYNC_BATCH_SIZE):
+    """
+    按来源表重建追溯索引：按ID分批覆盖写入，并删除来源记录已不存在的索引
+    返回 {来源类型: {'synced': 写入条数, 'removed': 删除条数}}
+    """
+    all_sources = [report_type for report_type, _ in QC_REPORT_MODELS] + [RAW_SOIL_SOURCE]
+    results = {}
+    for source_type in source_types or all_sources:
+        model, fields = _source_queryset(source_type)
+        synced = 0
+        last_id = 0
+        while True:
+            rows = list(model.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', *fields)[:batch_size])
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            entries = [
+                _trace_entry(source_type, pk, batch_number, day, fnumber[0] if fnumber else '')
+                for pk, batch_number, day, *fnumber in rows
+                if normalize_batch_key(batch_number)
+            ]
+            with transaction.atomic():
+                BatchTrace.objects.filter(source_type=source_type, source_id__in=[row[0] for row in rows]).delete()
+                BatchTrace.objects.bulk_create(entries)
+            synced += len(entries)
+
+        removed, _ = BatchTrace.objects.filter(source_type=source_type).exclude(
+            source_id__in=model.objects.values('pk')
+        ).delete()
+        results[source_type] = {'synced': synced, 'removed': removed}
+        logger.info(f"批号追溯索引回填 {source_type}: 写入{synced}条, 删除{removed}条")
+    return results
+
+
+def trace_batch(batch_number, user, prefix=False, limit=TRACE_LIMIT):
+    """
+    按批号追溯：先查索引，再取明细（QC报表按各厂区数据权限过滤，原土入库需要查看权限）
+    prefix 为 True 时按规范化批号前缀匹配
+    返回 {'batch_key', 'qc_reports': [...], 'raw_soil': [...]}，明细按日期倒序；批号为空时返回 None
+    """
+    key = normalize_batch_key(batch_number)
+    if not key:
+        return None
+
+    entries = BatchTrace.objects.filter(**{'batch_key__startswith' if prefix else 'batch_key': key})
+    ids_by_source = {}
+    for source_type, source_id in entries.order_by('-date', '-id').values_list('source_type', 'source_id')[:limit]:
+        ids_by_source.setdefault(source_type, []).append(source_id)
+
+    raw_soil = []
+    raw_soil_ids = ids_by_source.pop(RAW_SOIL_SOURCE, None)
+    if raw_soil_ids and user_has_permission(user, 'raw_soil_storage_view'):
+        raw_soil = list(RawSoilStorage.objects.filter(pk__in=raw_soil_ids).values(*RAW_SOIL_TRACE_FIELDS))
+
+    qc_reports = []
+    measurements = visible_measurements(user, list(ids_by_source)) if ids_by_source else None
+    if measurements is not None:
+        # 各厂区的报表ID合并为一个查询
+        condition = reduce(operator.or_, (
+            Q(report_type=source_type, report_id__in=ids) for source_type, ids in ids_by_source.items()
+        ))
+        rows = measurements.filter(condition).values('report_type', 'report_id', *QC_TRACE_FIELDS)
+        for row in rows:
+            row['id'] = row.pop('report_id')
+            row['report_label'] = get_profile(row['report_type']).label
+            qc_reports.append(row)
+
+    qc_reports.sort(key=lambda row: (row['date'] or date.min, row['time'] or time.min), reverse=True)
+    raw_soil.sort(key=lambda row: row['biz_date'], reverse=True)
+    return {'batch_key': key, 'qc_reports': qc_reports, 'raw_soil': raw_soil}
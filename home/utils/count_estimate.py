@@ -0,0 +1,46 @@
+"""
+查询计数估算模块
+大表上宽条件的 COUNT(*) 需要扫描大量索引行，分页只需要大致总数；
+MySQL 下先用 EXPLAIN 的行数估算，估算值超过阈值时直接使用估算值，否则执行精确计数
+"""
+
+import logging
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# 估算行数低于该值时精确计数（代价可接受）
+ESTIMATE_THRESHOLD = 10000
+
+
+def explain_row_estimate(queryset):
+    """返回 MySQL 优化器对查询的行数估算（rows × filtered%），无法估算时返回 None"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'mysql':
+        return None
+    try:
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {sql}', params)
+            columns = [column[0].lower() for column in cursor.description]
+            row = dict(zip(columns, cursor.fetchone()))
+    except Exception as e:
+        logger.warning(f"EXPLAIN 估算行数失败，改用精确计数: {str(e)}")
+        return None
+    if row.get('rows') is None:
+        return None
+    filtered = row.get('filtered')
+    estimate = float(row['rows']) * (float(filtered) / 100 if filtered is not None else 1)
+    return int(estimate)
+
+
+def estimate_count(queryset, threshold=ESTIMATE_THRESHOLD):
+    """
+    返回 (count, estimated)
+    估算值达到阈值（宽条件）时返回估算值，否则返回精确计数
+    """
+    estimate = explain_row_estimate(queryset.order_by())
+    if estimate is not None and estimate >= threshold:
+        return estimate, True
+    return queryset.count(), False
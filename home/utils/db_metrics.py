@@ -0,0 +1,71 @@
+"""
+数据库连接复用统计
+按进程（gunicorn worker、Celery 子进程）统计处理的请求/任务数和新建的数据库连接数。
+CONN_MAX_AGE 生效时新建连接数应远小于请求数；复用率偏低说明连接被频繁关闭（如 MySQL wait_timeout 小于 CONN_MAX_AGE）
+"""
+
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionReuseStats:
+    """进程内计数器；gunicorn preload_app 时主进程 fork 出 worker，按 pid 变化重新计数"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.units = 0
+        self.connections_created = 0
+
+    def _check_pid(self):
+        if self.pid != os.getpid():
+            self._reset()
+
+    def record_connection(self):
+        with self._lock:
+            self._check_pid()
+            self.connections_created += 1
+
+    def record_unit(self):
+        """一个请求或任务处理完成，每 DB_CONN_METRICS_LOG_EVERY 次输出一次统计"""
+        with self._lock:
+            self._check_pid()
+            self.units += 1
+            units = self.units
+        log_every = settings.DB_CONN_METRICS_LOG_EVERY
+        if log_every and units % log_every == 0:
+            self.log()
+
+    def snapshot(self):
+        with self._lock:
+            self._check_pid()
+            units, created = self.units, self.connections_created
+        # 后台写日志线程也会建连接，复用率最低按0计
+        reuse_rate = max(1 - created / units, 0) if units else None
+        return {'pid': self.pid, 'units': units, 'connections_created': created, 'reuse_rate': reuse_rate}
+
+    def log(self):
+        stats = self.snapshot()
+        if not stats['units']:
+            return
+        logger.info(f"数据库连接复用 pid={stats['pid']}: 处理请求/任务{stats['units']}次, "
+                    f"新建连接{stats['connections_created']}次, 复用率{stats['reuse_rate']:.1%}")
+
+
+connection_stats = ConnectionReuseStats()
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    connection_stats.record_connection()
+
+
+connection_created.connect(_on_connection_created, dispatch_uid='home.utils.db_metrics')
@@ -0,0 +1,252 @@
+"""
+EAS入库单据本地缓存模块
+按 (库存组织, 仓库, 业务日期) 记录同步时间，读取时只回源已过期的日期窗口；
+当天及以后的窗口使用较短的有效期，历史窗口由定时任务增量刷新
+"""
+
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from home.models import EASStorageDocument, EASStorageEntry, EASSyncWindow, OperationObject
+from home.utils.eas_client import fetch_eas_documents_concurrently
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_biz_date(value):
+    """解析EAS业务日期（取前10位 YYYY-MM-DD），无法解析时返回None"""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def _parse_quantity(value):
+    """将EAS数量转换为Decimal，无法转换时返回None"""
+    if value in (None, ''):
+        return None
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError, TypeError):
+        return None
+
+
+def _daterange(start_date, end_date):
+    day = start_date
+    while day <= end_date:
+        yield day
+        day += timedelta(days=1)
+
+
+def _window_ttl(day, today):
+    """当天及以后的数据仍在录入，使用短有效期；历史数据使用长有效期"""
+    if day >= today:
+        return settings.EAS_CACHE_TODAY_TTL
+    return settings.EAS_CACHE_HISTORY_TTL
+
+
+def get_stale_windows(targets, start_date, end_date):
+    """
+    计算各仓库在 [start_date, end_date] 内需要回源的日期范围
+    返回 {(org_code, warehouse_code): (stale_start, stale_end)}，全部有效的仓库不出现在结果中
+    """
+    targets = list(dict.fromkeys(targets))
+    if not targets:
+        return {}
+
+    now = timezone.now()
+    today = timezone.localdate()
+    target_filter = Q()
+    for org_code, warehouse_code in targets:
+        target_filter |= Q(org_code=org_code, warehouse_code=warehouse_code)
+
+    synced = {
+        (org_code, warehouse_code, biz_date): synced_at
+        for org_code, warehouse_code, biz_date, synced_at in EASSyncWindow.objects.filter(
+            target_filter, biz_date__gte=start_date, biz_date__lte=end_date
+        ).values_list('org_code', 'warehouse_code', 'biz_date', 'synced_at')
+    }
+
+    stale = {}
+    for org_code, warehouse_code in targets:
+        stale_days = []
+        for day in _daterange(start_date, end_date):
+            synced_at = synced.get((org_code, warehouse_code, day))
+            if synced_at is None or (now - synced_at).total_seconds() > _window_ttl(day, today):
+                stale_days.append(day)
+        if stale_days:
+            stale[(org_code, warehouse_code)] = (stale_days[0], stale_days[-1])
+    return stale
+
+
+@transaction.atomic
+def store_eas_documents(org_code, warehouse_code, start_date, end_date, documents):
+    """
+    用EAS返回的单据替换某仓库 [start_date, end_date] 内的缓存，并记录同步窗口
+    """
+    # 同一单据编号只保留最后一次出现的数据
+    documents = {str(doc.get('FNumber')): doc for doc in documents if doc.get('FNumber')}
+    fnumbers = list(documents)
+
+    EASStorageDocument.objects.filter(org_code=org_code, warehouse_code=warehouse_code).filter(
+        Q(biz_date__gte=start_date, biz_date__lte=end_date) | Q(fnumber__in=fnumbers)
+    ).delete()
+
+    EASStorageDocument.objects.bulk_create([
+        EASStorageDocument(
+            fnumber=str(doc.get('FNumber')),
+            org_code=org_code,
+            warehouse_code=warehouse_code,
+            biz_date=_parse_biz_date(doc.get('FBizDate')),
+            payload=doc,
+        )
+        for doc in documents.values()
+    ])
+    # MySQL 下 bulk_create 不回填主键，重新查询单据ID
+    document_ids = dict(
+        EASStorageDocument.objects.filter(
+            org_code=org_code, warehouse_code=warehouse_code, fnumber__in=fnumbers
+        ).values_list('fnumber', 'id')
+    )
+
+    entries = []
+    for doc in documents.values():
+        fnumber = str(doc.get('FNumber'))
+        biz_date_text = doc.get('FBizDate') or ''
+        for seq, entry in enumerate(doc.get('entry') or []):
+            entries.append(EASStorageEntry(
+                document_id=document_ids[fnumber],
+                entry_seq=seq,
+                fnumber=fnumber,
+                org_code=org_code,
+                warehouse_code=warehouse_code,
+                biz_date=_parse_biz_date(biz_date_text),
+                biz_date_text=str(biz_date_text)[:50],
+                warehouse_name=(entry.get('WarehouseName') or '')[:100],
+                storage_org_name=(doc.get('storageOrgUnitName') or '')[:100],
+                cost_center_name=(doc.get('costCenterOrgUnitName') or '')[:100],
+                material_number=(entry.get('materialNumber') or '')[:50],
+                material_name=(entry.get('materialName') or '')[:100],
+                quantity=_parse_quantity(entry.get('FQty')),
+                lot=(entry.get('FLot') or '')[:100],
+            ))
+    EASStorageEntry.objects.bulk_create(entries, batch_size=500)
+
+    now = timezone.now()
+    EASSyncWindow.objects.filter(
+        org_code=org_code, warehouse_code=warehouse_code,
+        biz_date__gte=start_date, biz_date__lte=end_date
+    ).delete()
+    EASSyncWindow.objects.bulk_create([
+        EASSyncWindow(org_code=org_code, warehouse_code=warehouse_code, biz_date=day, synced_at=now)
+        for day in _daterange(start_date, end_date)
+    ])
+    return len(entries)
+
+
+def ensure_eas_cache(targets, start_date, end_date, force=False):
+    """
+    读穿缓存：确保各仓库 [start_date, end_date] 内的缓存有效，过期的日期窗口并发回源EAS
+    返回回源失败或超时的仓库列表（这些仓库继续使用已有缓存）
+    """
+    targets = list(dict.fromkeys(targets))
+    if force:
+        stale = {target: (start_date, end_date) for target in targets}
+    else:
+        stale = get_stale_windows(targets, start_date, end_date)
+    if not stale:
+        return []
+
+    # 按回源日期范围分组，同一范围的仓库一起并发查询
+    groups = {}
+    for target, window in stale.items():
+        groups.setdefault(window, []).append(target)
+
+    failed = []
+    for (stale_start, stale_end), group_targets in groups.items():
+        documents_by_target, group_failed = fetch_eas_documents_concurrently(
+            group_targets, stale_start.strftime('%Y-%m-%d'), stale_end.strftime('%Y-%m-%d')
+        )
+        failed.extend(group_failed)
+        for (org_code, warehouse_code), documents in documents_by_target.items():
+            try:
+                count = store_eas_documents(org_code, warehouse_code, stale_start, stale_end, documents)
+                logger.info(f"EAS缓存已刷新 组织: {org_code}, 仓库: {warehouse_code}, "
+                            f"日期: {stale_start} ~ {stale_end}, 分录{count}条")
+            except Exception as e:
+                logger.error(f"EAS缓存写入失败 组织: {org_code}, 仓库: {warehouse_code}: {str(e)}", exc_info=True)
+                failed.append({'org_code': org_code, 'warehouse_code': warehouse_code, 'error': str(e)})
+    return failed
+
+
+def invalidate_eas_cache(fnumber=None, org_code=None, warehouse_code=None, biz_date=None):
+    """
+    本系统新增、修改、删除EAS单据后使相关同步窗口失效，下次读取时重新回源
+    失效失败不影响单据提交，缓存会在有效期后自动刷新
+    """
+    try:
+        windows = Q(pk__in=[])
+        if fnumber:
+            # 同时移除缓存中的旧单据，避免回源前仍读到修改前的数据
+            cached_documents = EASStorageDocument.objects.filter(fnumber=str(fnumber))
+            for doc_org, doc_warehouse, doc_date in cached_documents.values_list('org_code', 'warehouse_code', 'biz_date'):
+                if doc_date:
+                    windows |= Q(org_code=doc_org, warehouse_code=doc_warehouse, biz_date=doc_date)
+            cached_documents.delete()
+        if org_code and warehouse_code and biz_date:
+            if isinstance(biz_date, str):
+                biz_date = _parse_biz_date(biz_date)
+            if biz_date:
+                windows |= Q(org_code=org_code, warehouse_code=warehouse_code, biz_date=biz_date)
+        deleted, _ = EASSyncWindow.objects.filter(windows).delete()
+    except Exception as e:
+        logger.error(f"EAS缓存窗口失效失败: {str(e)}", exc_info=True)
+        return
+    if deleted:
+        logger.info(f"EAS缓存窗口已失效: fnumber={fnumber}, 组织={org_code}, 仓库={warehouse_code}, 日期={biz_date}")
+
+
+def get_configured_targets():
+    """获取所有操作对象配置的 (库存组织编码, 仓库编码) 组合"""
+    return list(
+        OperationObject.objects.values_list('inventory_org__org_code', 'warehouse__warehouse_code').distinct()
+    )
+
+
+def refresh_recent_eas_cache(days=None):
+    """定时任务调用：强制刷新所有仓库最近 days 天（含今天）的缓存"""
+    if days is None:
+        days = settings.EAS_CACHE_REFRESH_DAYS
+    today = timezone.localdate()
+    start_date = today - timedelta(days=days - 1)
+    targets = get_configured_targets()
+    failed = ensure_eas_cache(targets, start_date, today, force=True)
+    return len(targets), failed
+
+
+def query_cached_entries(targets, start_date, end_date, warehouse_code=None):
+    """按仓库组合和业务日期范围查询缓存分录（走 org_code/warehouse_code/biz_date 索引）"""
+    target_filter = Q(pk__in=[])
+    for org_code, target_warehouse in dict.fromkeys(targets):
+        target_filter |= Q(org_code=org_code, warehouse_code=target_warehouse)
+    qs = EASStorageEntry.objects.filter(target_filter, biz_date__gte=start_date, biz_date__lte=end_date)
+    if warehouse_code:
+        qs = qs.filter(warehouse_code=warehouse_code)
+    return qs
+
+
+def find_cached_document(fnumber, targets):
+    """在指定仓库组合的缓存中查找单据，返回EAS原始单据或None"""
+    target_filter = Q(pk__in=[])
+    for org_code, warehouse_code in dict.fromkeys(targets):
+        target_filter |= Q(org_code=org_code, warehouse_code=warehouse_code)
+    document = EASStorageDocument.objects.filter(target_filter, fnumber=str(fnumber)).first()
+    return document.payload if document else None
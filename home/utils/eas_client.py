@@ -0,0 +1,148 @@
+"""
+EAS接口调用辅助模块
+统一封装原土入库单据查询，并支持多个库存组织/仓库并发查询
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def get_eas_query_url():
+    """获取EAS单据查询接口地址"""
+    return settings.EAS_API_HOST + settings.EAS_API_PATH_GET
+
+
+def fetch_eas_documents(org_code, warehouse_code, biz_date_start, biz_date_end,
+                        page=1, page_num=1000, timeout=None, **extra):
+    """
+    查询单个库存组织+仓库的EAS入库单据
+    返回EAS原始单据列表（兼容 data / sysnList 两种返回结构），请求失败时抛出异常
+    """
+    post_data = {
+        "orgNumber": org_code,
+        "WarehouseNumber": warehouse_code,
+        "pageNum": page_num,
+        "page": page,
+        "bizDateStart": biz_date_start,
+        "bizDateEnd": biz_date_end,
+    }
+    post_data.update(extra)
+    if timeout is None:
+        timeout = settings.EAS_API_TIMEOUT
+
+    resp = requests.post(get_eas_query_url(), json=post_data, timeout=timeout)
+    resp.raise_for_status()
+    data = resp.json()
+    return data.get('data') or data.get('sysnList') or []
+
+
+def flatten_eas_documents(documents, org_code, warehouse_code):
+    """将EAS单据按 entry 明细展开为历史记录页面使用的扁平记录"""
+    flat_records = []
+    for rec in documents:
+        entry_list = rec.get('entry') or []
+        for entry in entry_list:
+            flat_records.append({
+                'warehouse_name': entry.get('WarehouseName'),
+                'FBizDate': rec.get('FBizDate'),
+                'storageOrgUnitName': rec.get('storageOrgUnitName'),
+                'material_name': entry.get('materialName'),
+                'quantity': entry.get('FQty'),
+                'cost_center': rec.get('costCenterOrgUnitName'),
+                'batch_number': entry.get('FLot'),
+                'materialNumber': entry.get('materialNumber'),
+                'FNumber': rec.get('FNumber'),
+                'org_code': org_code,
+                'warehouse_code': warehouse_code,
+            })
+    return flat_records
+
+
+def _timed_fetch(org_code, warehouse_code, biz_date_start, biz_date_end):
+    """查询单个仓库并记录耗时，供线程池调用"""
+    started = time.monotonic()
+    try:
+        documents = fetch_eas_documents(org_code, warehouse_code, biz_date_start, biz_date_end)
+    finally:
+        elapsed_ms = (time.monotonic() - started) * 1000
+        logger.info(f"EAS查询 组织: {org_code}, 仓库: {warehouse_code}, 耗时: {elapsed_ms:.0f}ms")
+    return documents
+
+
+def fetch_eas_documents_concurrently(targets, biz_date_start, biz_date_end,
+                                     max_workers=None, deadline=None):
+    """
+    并发查询多个 (org_code, warehouse_code) 组合的EAS入库单据
+
+    使用有界线程池并发请求，整体耗时接近最慢的单次请求而不是所有请求之和；
+    超过整体截止时间仍未返回的仓库记为超时，不阻塞页面渲染。
+    线程中只做HTTP请求，不访问数据库。
+
+    返回 (documents_by_target, failed)：
+    - documents_by_target: {(org_code, warehouse_code): EAS原始单据列表}，仅包含查询成功的仓库
+    - failed: 查询失败或超时的仓库列表 [{'org_code', 'warehouse_code', 'error'}]
+    """
+    # 同一组织+仓库可能被多个用户配置，去重后只查询一次
+    unique_targets = list(dict.fromkeys(targets))
+    if not unique_targets:
+        return {}, []
+
+    if max_workers is None:
+        max_workers = settings.EAS_FANOUT_MAX_WORKERS
+    if deadline is None:
+        deadline = settings.EAS_FANOUT_DEADLINE
+
+    started = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(unique_targets)))
+    futures = {
+        executor.submit(_timed_fetch, org_code, warehouse_code, biz_date_start, biz_date_end): (org_code, warehouse_code)
+        for org_code, warehouse_code in unique_targets
+    }
+    done, not_done = wait(futures, timeout=deadline)
+    # 不等待超时的请求，已排队未开始的直接取消
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    documents_by_target = {}
+    failed = []
+    for future in done:
+        org_code, warehouse_code = futures[future]
+        try:
+            documents_by_target[(org_code, warehouse_code)] = future.result()
+        except Exception as e:
+            logger.error(f"EAS查询组织 {org_code} 仓库 {warehouse_code} 失败: {str(e)}")
+            failed.append({'org_code': org_code, 'warehouse_code': warehouse_code, 'error': str(e)})
+    for future in not_done:
+        org_code, warehouse_code = futures[future]
+        logger.error(f"EAS查询组织 {org_code} 仓库 {warehouse_code} 超过整体截止时间 {deadline}s")
+        failed.append({'org_code': org_code, 'warehouse_code': warehouse_code, 'error': '查询超时'})
+
+    elapsed_ms = (time.monotonic() - started) * 1000
+    logger.info(
+        f"EAS并发查询完成: 仓库{len(unique_targets)}个, 成功{len(documents_by_target)}个, "
+        f"失败{len(failed)}个, 总耗时{elapsed_ms:.0f}ms"
+    )
+    return documents_by_target, failed
+
+
+def fetch_eas_records_concurrently(targets, biz_date_start, biz_date_end,
+                                   max_workers=None, deadline=None):
+    """
+    并发查询多个仓库并展开为扁平记录
+
+    返回 (records, failed)：records 按 targets 顺序展开，failed 同 fetch_eas_documents_concurrently
+    """
+    documents_by_target, failed = fetch_eas_documents_concurrently(
+        targets, biz_date_start, biz_date_end, max_workers=max_workers, deadline=deadline
+    )
+    records = []
+    for org_code, warehouse_code in dict.fromkeys(targets):
+        documents = documents_by_target.get((org_code, warehouse_code))
+        if documents:
+            records.extend(flatten_eas_documents(documents, org_code, warehouse_code))
+    return records, failed
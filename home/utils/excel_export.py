@@ -9,9 +9,9 @@ from datetime import datetime, timedelta
 from django.http import HttpResponse, JsonResponse
 from django.db.models import Q
 from django.contrib.auth.models import User
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
+
+from home.utils.production_stats import get_production_groups
+from home.utils.qc_profiles import get_profile_for_model
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +26,9 @@ def export_production_excel(request, model_class, report_name, period):
     logger.info(f"统计周期: {period}")
     
     try:
+        # openpyxl（及其依赖的numpy）只在导出时加载，不拖慢worker启动
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
         logger.info("✅ openpyxl库导入成功")
         
         # 确定日期范围
@@ -42,56 +45,19 @@ def export_production_excel(request, model_class, report_name, period):
         logger.info(f"📅 查询开始日期: {start_date}")
         logger.info(f"📅 查询结束日期: {end_date}")
         
-        # 构建查询
-        query = Q(date__gte=start_date) & Q(date__lte=end_date)
-        logger.info(f"🔍 构建查询条件: {query}")
-        
-        # 执行查询
-        reports = model_class.objects.filter(query).order_by('shift', 'product_name', 'packaging', 'batch_number', 'remarks')
-        logger.info(f"📊 查询到{reports.count()}条记录")
+        # 分组统计结果按数据版本缓存，与页面产量统计共用
+        production = get_production_groups(model_class, target_date)
+        logger.info(f"📊 查询到{production['row_count']}条记录")
         
-        if not reports.exists():
+        if not production['row_count']:
             logger.warning(f"⚠️ {report_name}{period}没有找到产量数据")
             return HttpResponse(f"{report_name}{period}没有找到产量数据", content_type='text/plain')
         
-        # 按5个字段分组累加产量（与统计报表逻辑保持一致）
-        logger.info("📊 开始按5个字段分组累加产量...")
-        grouped_production = {}
-        for report in reports:
-            # 创建分组键
-            group_key = (
-                report.shift or '未设置',
-                report.product_name or '未设置',
-                report.packaging or '未设置',
-                report.batch_number or '未设置',
-                report.remarks or '未设置'
-            )
-            
-            if group_key not in grouped_production:
-                grouped_production[group_key] = {
-                    'shift': group_key[0],
-                    'product_name': group_key[1],
-                    'packaging': group_key[2],
-                    'batch_number': group_key[3],
-                    'remarks': group_key[4],
-                    'total_tons': 0,
-                    'count': 0
-                }
-            
-            # 累加产量
-            try:
-                if report.tons is not None:
-                    grouped_production[group_key]['total_tons'] += float(report.tons)
-                    grouped_production[group_key]['count'] += 1
-            except (ValueError, TypeError):
-                logger.warning(f"    ⚠️ 产量值转换失败: {report.tons}")
-                continue
-        
-        logger.info(f"📊 分组累加完成，共{len(grouped_production)}个唯一组合")
+        logger.info(f"📊 分组累加完成，共{len(production['groups'])}个唯一组合")
         
         # 按班组分组数据（用于Excel显示）
         grouped_data = {}
-        for group_key, production_data in grouped_production.items():
+        for production_data in production['groups']:
             shift = production_data['shift']
             if shift not in grouped_data:
                 grouped_data[shift] = []
@@ -274,6 +240,7 @@ def export_production_excel(request, model_class, report_name, period):
 def export_qc_report_excel(request, model_class, report_name, field_mapping):
     """通用的QC报表Excel导出函数 (智能隐藏空列版本)"""
     try:
+        from openpyxl import Workbook
         # 1. 获取筛选参数
         start_date = request.GET.get('start_date')
         end_date = request.GET.get('end_date')
@@ -304,7 +271,10 @@ def export_qc_report_excel(request, model_class, report_name, field_mapping):
         reports = model_class.objects.filter(query).order_by('date', 'time')
         logger.info(f"导出{report_name}，查询到{reports.count()}条记录")
 
-        # 4. 检查每个字段是否在所有行中均为空值
+        # 4. 按厂区字段配置去掉该厂区没有的字段，再检查每个字段是否在所有行中均为空值
+        profile = get_profile_for_model(model_class)
+        if profile:
+            field_mapping = profile.export_mapping(field_mapping)
         field_values = {field: [] for field in field_mapping.keys()}
         
         for report in reports:
@@ -392,6 +362,9 @@ def export_qc_report_excel(request, model_class, report_name, field_mapping):
 def export_qc_report_excel_universal(request, model_class, report_name, field_mapping, use_formatted_style=False):
     """通用的QC报表Excel导出函数 - 支持大塬格式和标准格式"""
     from django.db import models
+    from openpyxl import Workbook
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    from openpyxl.utils import get_column_letter
     try:
         # 1. 获取筛选参数
         start_date = request.GET.get('start_date')
@@ -427,7 +400,16 @@ def export_qc_report_excel_universal(request, model_class, report_name, field_ma
             logger.warning(f"⚠️ {report_name}没有找到QC数据")
             return HttpResponse(f"{report_name}没有找到QC数据", content_type='text/plain')
 
-        # 4. 检查每个字段是否在所有行中均为空值
+        # 4. 按厂区字段配置去掉该厂区没有的字段，再检查每个字段是否在所有行中均为空值
+        profile = get_profile_for_model(model_class)
+        if profile:
+            field_mapping = profile.export_mapping(field_mapping)
+            numeric_fields = profile.numeric_fields
+        else:
+            numeric_fields = {
+                field.name for field in model_class._meta.concrete_fields
+                if isinstance(field, (models.FloatField, models.IntegerField, models.DecimalField))
+            }
         field_values = {field: [] for field in field_mapping.keys()}
         
         for report in reports:
@@ -456,8 +438,7 @@ def export_qc_report_excel_universal(request, model_class, report_name, field_ma
                     if value is not None:
                         if use_formatted_style:
                             # 检查字段类型，如果是数字类型则保持数字格式
-                            field_obj = report._meta.get_field(field)
-                            if isinstance(field_obj, (models.FloatField, models.IntegerField, models.DecimalField)):
+                            if field in numeric_fields:
                                 field_values[field].append(value)  # 保持数字格式
                                 logger.debug(f"字段 {field} 保持数字格式: {value}")
                             else:
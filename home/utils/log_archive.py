@@ -0,0 +1,217 @@
+"""
+日志归档模块
+按月滚动：超过保留期的日志按整月移出热表。用户操作日志移入归档表，操作日志页面仍可按日期范围查询；
+审计日志和任务日志写入按月分文件的 JSONL.gz（LOG_ARCHIVE_DIR/<日志类型>/YYYY-MM.jsonl.gz）
+"""
+
+import gzip
+import json
+import logging
+import math
+import os
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from home.models import UserOperationLog, UserOperationLogArchive
+from home.utils.count_estimate import estimate_count
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_BATCH_SIZE = 1000
+
+# 日志类型 -> (模型, 时间字段, 保留天数配置项, 归档方式)
+LOG_TYPES = {
+    'user_operation_log': ('home.UserOperationLog', 'created_at', 'OPERATION_LOG_RETENTION_DAYS', 'table'),
+    'audit_operationlog': ('audit.OperationLog', 'timestamp', 'AUDIT_LOG_RETENTION_DAYS', 'file'),
+    'task_log': ('tasks.TaskLog', 'created_at', 'TASK_LOG_RETENTION_DAYS', 'file'),
+}
+
+
+def get_archive_cutoff(retention_days, today=None):
+    """归档边界：保留期起点所在月份的第一天，早于该时间的日志按整月归档"""
+    today = today or timezone.localdate()
+    month_start = (today - timedelta(days=retention_days)).replace(day=1)
+    return timezone.make_aware(datetime.combine(month_start, time.min))
+
+
+def _archive_to_table(cutoff, batch_size):
+    """将 cutoff 之前的用户操作日志移入归档表，按ID分批，每批在一个事务中复制并删除"""
+    fields = [field.attname for field in UserOperationLog._meta.concrete_fields]
+    queryset = UserOperationLog.objects.filter(created_at__lt=cutoff).order_by('id')
+    moved = 0
+    while True:
+        with transaction.atomic():
+            rows = list(queryset.values(*fields)[:batch_size])
+            if not rows:
+                return moved
+            UserOperationLogArchive.objects.bulk_create(
+                [UserOperationLogArchive(**row) for row in rows], ignore_conflicts=True
+            )
+            UserOperationLog.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        moved += len(rows)
+
+
+def _write_journal(path, data):
+    """原子写入归档日志（先写临时文件再替换）"""
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(data), encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def _recover_pending_batch(model, directory, journal_path):
+    """
+    处理上次中断的批次：写文件阶段中断时把各月文件截回写入前的长度，
+    写文件完成但未删除热表时补删这批日志，避免重新归档时写入重复数据
+    """
+    if not journal_path.exists():
+        return
+    journal = json.loads(journal_path.read_text(encoding='utf-8'))
+    if journal['phase'] == 'writing':
+        for month, size in journal['sizes'].items():
+            path = directory / f'{month}.jsonl.gz'
+            if not path.exists():
+                continue
+            if size:
+                with open(path, 'r+b') as fp:
+                    fp.truncate(size)
+            else:
+                path.unlink()
+        logger.warning(f"日志归档 {directory.name}: 上次写入中断，已截回 {len(journal['sizes'])} 个归档文件")
+    else:
+        deleted, _ = model.objects.filter(id__in=journal['ids']).delete()
+        logger.warning(f"日志归档 {directory.name}: 上次删除中断，补删已归档日志{deleted}条")
+    journal_path.unlink()
+
+
+def _write_month(path, rows):
+    """追加一个 gzip 成员并落盘；gzip 多成员文件读取时按一个文件处理"""
+    with open(path, 'ab') as raw:
+        with gzip.open(raw, 'wt', encoding='utf-8') as fp:
+            for row in rows:
+                fp.write(json.dumps(row, ensure_ascii=False, cls=DjangoJSONEncoder) + '\n')
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def _archive_to_files(log_type, model, date_field, cutoff, batch_size):
+    """
+    将 cutoff 之前的日志按月追加到 JSONL.gz 文件后从热表删除
+    每批的进度记在目录下的 .pending.json：写文件前记录各月文件长度，写完后记录这批日志ID，
+    删除完成后清除；进程中途退出时下次运行先按它回滚或补删，同一条日志不会归档两次
+    """
+    directory = Path(settings.LOG_ARCHIVE_DIR) / log_type
+    directory.mkdir(parents=True, exist_ok=True)
+    journal_path = directory / '.pending.json'
+    _recover_pending_batch(model, directory, journal_path)
+
+    fields = [field.attname for field in model._meta.concrete_fields]
+    queryset = model.objects.filter(**{f'{date_field}__lt': cutoff}).order_by('id')
+    moved = 0
+    while True:
+        rows = list(queryset.values(*fields)[:batch_size])
+        if not rows:
+            return moved
+        by_month = {}
+        for row in rows:
+            month = timezone.localtime(row[date_field]).strftime('%Y-%m')
+            by_month.setdefault(month, []).append(row)
+        sizes = {}
+        for month in by_month:
+            path = directory / f'{month}.jsonl.gz'
+            sizes[month] = path.stat().st_size if path.exists() else 0
+        _write_journal(journal_path, {'phase': 'writing', 'sizes': sizes})
+        for month, month_rows in by_month.items():
+            _write_month(directory / f'{month}.jsonl.gz', month_rows)
+        ids = [row['id'] for row in rows]
+        _write_journal(journal_path, {'phase': 'written', 'ids': ids})
+        model.objects.filter(id__in=ids).delete()
+        journal_path.unlink()
+        moved += len(rows)
+
+
+def archive_logs(log_types=None, dry_run=False, batch_size=ARCHIVE_BATCH_SIZE, today=None):
+    """
+    归档超过保留期的日志
+    返回 {日志类型: {'cutoff', 'count', 'skipped'}}，保留天数为0的日志类型不归档
+    """
+    results = {}
+    for log_type in log_types or LOG_TYPES:
+        model_label, date_field, retention_setting, mode = LOG_TYPES[log_type]
+        retention_days = getattr(settings, retention_setting)
+        if not retention_days:
+            results[log_type] = {'cutoff': None, 'count': 0, 'skipped': True}
+            continue
+
+        cutoff = get_archive_cutoff(retention_days, today)
+        model = apps.get_model(model_label)
+        if dry_run:
+            count = model.objects.filter(**{f'{date_field}__lt': cutoff}).count()
+        elif mode == 'table':
+            count = _archive_to_table(cutoff, batch_size)
+        else:
+            count = _archive_to_files(log_type, model, date_field, cutoff, batch_size)
+        results[log_type] = {'cutoff': cutoff, 'count': count, 'skipped': False}
+        logger.info(f"日志归档 {log_type}: 早于 {cutoff:%Y-%m-%d} 的日志{'待归档' if dry_run else '已归档'}{count}条")
+    return results
+
+
+class OperationLogQuery:
+    """
+    用户操作日志查询：热表覆盖查询起始日期时只查热表，否则在热表之后接着查归档表
+    归档表中的日志都早于热表，按操作时间倒序分页时两张表可以直接首尾相接
+    """
+
+    def __init__(self, filters, start_datetime=None):
+        self.hot = UserOperationLog.objects.filter(filters).order_by('-created_at', '-id')
+        self.archive = UserOperationLogArchive.objects.filter(filters).order_by('-created_at', '-id')
+        self.include_archive = self._needs_archive(start_datetime)
+
+    @staticmethod
+    def _needs_archive(start_datetime):
+        if start_datetime is not None:
+            oldest_hot = UserOperationLog.objects.order_by('created_at').values_list('created_at', flat=True).first()
+            if oldest_hot is not None and start_datetime >= oldest_hot:
+                return False
+        return UserOperationLogArchive.objects.exists()
+
+    def page(self, page, page_size):
+        """
+        返回 (logs, pagination)，logs 为 (日志对象, 是否归档) 列表；页码超出范围时取最后一页
+        宽条件下总数使用估算值（pagination.count_estimated 为 true）；
+        需要接着查归档表时热表精确计数，以便确定两张表的分页衔接位置
+        """
+        archive_count = 0
+        estimated = False
+        if self.include_archive:
+            hot_count = self.hot.count()
+            archive_count, estimated = estimate_count(self.archive)
+        else:
+            hot_count, estimated = estimate_count(self.hot)
+        total_count = hot_count + archive_count
+        total_pages = max(math.ceil(total_count / page_size), 1)
+        page = min(max(page, 1), total_pages)
+
+        offset = (page - 1) * page_size
+        logs = []
+        if offset < hot_count:
+            logs = [(log, False) for log in self.hot[offset:offset + page_size]]
+        remaining = page_size - len(logs)
+        if remaining > 0 and archive_count:
+            archive_offset = max(offset - hot_count, 0)
+            logs += [(log, True) for log in self.archive[archive_offset:archive_offset + remaining]]
+
+        pagination = {
+            "current_page": page,
+            "total_pages": total_pages,
+            "total_count": total_count,
+            "has_previous": page > 1,
+            "has_next": page < total_pages,
+            "count_estimated": estimated,
+        }
+        return logs, pagination
@@ -0,0 +1,177 @@
+"""
+操作日志缓冲写入模块（用户操作日志 UserOperationLog、审计日志 audit.OperationLog）
+请求线程只把日志对象放入进程内缓冲队列，后台线程按批 bulk_create 写库；
+整批写入失败时改为逐条写入，单条数据错误（如超长字段）的日志写入日志文件，数据库不可用时放回队列等待重试；
+gunicorn worker 退出、Celery 子进程关闭和解释器退出时同步写出剩余日志
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+from collections import deque
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections, router, transaction
+
+logger = logging.getLogger('user_operations')
+
+
+class OperationLogBuffer:
+    """进程内日志缓冲区（每个日志模型一个），后台写入线程在首次写入时按进程启动（兼容 gunicorn preload_app）"""
+
+    def __init__(self, model_label, batch_size, flush_interval, max_size):
+        self.model_label = model_label
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_size = max_size
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def __len__(self):
+        return len(self._queue)
+
+    def put(self, entry):
+        with self._lock:
+            if len(self._queue) >= self.max_size:
+                # 数据库长时间不可用时丢弃最早的日志，内容写入日志文件
+                _dump_unsaved(self._queue.popleft(), '操作日志缓冲已满')
+            self._queue.append(entry)
+            size = len(self._queue)
+        self._ensure_writer()
+        if size >= self.batch_size:
+            self._wakeup.set()
+
+    def _ensure_writer(self):
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name=f'log-writer-{self.model_label}', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"操作日志写入线程异常: {str(e)}", exc_info=True)
+            finally:
+                # 后台线程不经过请求周期，需要自行释放数据库连接
+                close_old_connections()
+
+    def flush(self):
+        """
+        写出缓冲中的全部日志，返回写入条数
+        整批写入失败时逐条写入；数据库不可用时未写入的日志放回队列等待下次重试
+        """
+        model = apps.get_model(self.model_label)
+
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                if not batch:
+                    return written
+                try:
+                    # 单独的事务（外层已有事务时为保存点），失败后仍可逐条写入
+                    with transaction.atomic(using=router.db_for_write(model)):
+                        model.objects.bulk_create(batch)
+                except Exception as e:
+                    logger.warning(f"批量写入{self.model_label}失败（{len(batch)}条），改为逐条写入: {str(e)}")
+                    saved, unsaved = self._save_each(model, batch)
+                    written += saved
+                    if unsaved:
+                        logger.error(f"数据库不可用，{self.model_label} {len(unsaved)}条日志稍后重试")
+                        with self._lock:
+                            self._queue.extendleft(reversed(unsaved))
+                        return written
+                    continue
+                written += len(batch)
+
+    def _save_each(self, model, batch):
+        """
+        逐条写入，返回 (写入条数, 因数据库不可用未写入的日志)
+        数据库可用但单条写入失败时，该日志写入日志文件，不再放回队列（否则每次写库都会失败）
+        """
+        connection = connections[router.db_for_write(model)]
+        saved = 0
+        for index, entry in enumerate(batch):
+            try:
+                with transaction.atomic(using=connection.alias):
+                    entry.save(force_insert=True, using=connection.alias)
+            except DatabaseError as e:
+                if connection.connection is None or not connection.is_usable():
+                    return saved, batch[index:]
+                _dump_unsaved(entry, f'操作日志写库失败（{str(e)}）')
+            except Exception as e:
+                _dump_unsaved(entry, f'操作日志写库失败（{str(e)}）')
+            else:
+                saved += 1
+        return saved, []
+
+    def drain(self):
+        """进程退出前调用：写出剩余日志，仍无法写库的日志完整记录到日志文件"""
+        self.flush()
+        with self._lock:
+            remaining = list(self._queue)
+            self._queue.clear()
+        for entry in remaining:
+            _dump_unsaved(entry, '进程退出时操作日志未能写库')
+
+
+def _dump_unsaved(entry, reason):
+    record = {field.attname: getattr(entry, field.attname) for field in entry._meta.concrete_fields}
+    logger.error(f"{reason} {entry._meta.label}: {json.dumps(record, ensure_ascii=False, default=str)}")
+
+
+_buffers = {}
+_buffers_lock = threading.Lock()
+
+
+def get_log_buffer(model_label):
+    buffer = _buffers.get(model_label)
+    if buffer is None:
+        with _buffers_lock:
+            buffer = _buffers.get(model_label)
+            if buffer is None:
+                buffer = _buffers[model_label] = OperationLogBuffer(
+                    model_label,
+                    batch_size=settings.OPERATION_LOG_BATCH_SIZE,
+                    flush_interval=settings.OPERATION_LOG_FLUSH_INTERVAL,
+                    max_size=settings.OPERATION_LOG_MAX_BUFFER,
+                )
+    return buffer
+
+
+def enqueue_operation_log(entry):
+    """提交一条未保存的日志对象（UserOperationLog 或 audit.OperationLog）；关闭缓冲时直接写库"""
+    if not settings.OPERATION_LOG_BUFFERED:
+        entry.save()
+        return
+    get_log_buffer(entry._meta.label).put(entry)
+
+
+def flush_operation_logs():
+    """同步写出当前进程所有缓冲中的日志（gunicorn/Celery 退出钩子和 atexit 调用）"""
+    for buffer in list(_buffers.values()):
+        try:
+            buffer.drain()
+        except Exception as e:
+            logger.error(f"退出时写出{buffer.model_label}失败: {str(e)}", exc_info=True)
+    close_old_connections()
+
+
+atexit.register(flush_operation_logs)
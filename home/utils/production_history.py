@@ -0,0 +1,91 @@
+"""
+入库历史查询模块
+在EAS入库分录缓存表上完成筛选、物料汇总和分页，视图只处理当前页数据
+"""
+
+from django.db.models import Count, Sum
+
+from home.utils.eas_cache import query_cached_entries
+
+# 历史记录页面只需要这些列
+HISTORY_COLUMNS = (
+    'warehouse_name', 'biz_date_text', 'storage_org_name', 'material_name', 'quantity',
+    'cost_center_name', 'lot', 'material_number', 'fnumber', 'org_code', 'warehouse_code',
+)
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+
+def parse_page_params(params, default_page_size=DEFAULT_PAGE_SIZE, max_page_size=MAX_PAGE_SIZE):
+    """解析分页参数，非法值回退到默认值，每页数量限制在 [1, max_page_size]"""
+    try:
+        page_size = int(params.get('page_size', default_page_size))
+    except (TypeError, ValueError):
+        page_size = default_page_size
+    try:
+        page = int(params.get('page', 1))
+    except (TypeError, ValueError):
+        page = 1
+    return max(page, 1), min(max(page_size, 1), max_page_size)
+
+
+class ProductionHistoryQuery:
+    """
+    入库历史查询
+    筛选条件下推为缓存表上的索引查询；物料汇总和总数各一次聚合查询，分页只取当前页的列
+    """
+
+    def __init__(self, targets, start_date, end_date, warehouse_code=None):
+        self.queryset = query_cached_entries(targets, start_date, end_date, warehouse_code=warehouse_code)
+
+    def summarize(self):
+        """
+        一次分组聚合同时得到各物料总重量和记录总数
+        返回 (material_total_weight, total_records)
+        """
+        material_total_weight = {}
+        total_records = 0
+        rows = self.queryset.order_by().values('material_name').annotate(
+            total_weight=Sum('quantity'), records=Count('id')
+        ).order_by('material_name')
+        for row in rows:
+            total_records += row['records']
+            if row['material_name'] and row['total_weight']:
+                material_total_weight[row['material_name']] = float(row['total_weight'])
+        return material_total_weight, total_records
+
+    def page(self, page, page_size, total_records):
+        """取当前页记录，返回 (records, pagination)；页码超出范围时取最后一页"""
+        total_pages = (total_records + page_size - 1) // page_size
+        if total_pages and page > total_pages:
+            page = total_pages
+        start_index = (page - 1) * page_size
+        rows = self.queryset.values(*HISTORY_COLUMNS)[start_index:start_index + page_size]
+
+        records = [{
+            'warehouse_name': row['warehouse_name'],
+            'FBizDate': row['biz_date_text'],
+            'storageOrgUnitName': row['storage_org_name'],
+            'material_name': row['material_name'],
+            'quantity': float(row['quantity']) if row['quantity'] is not None else None,
+            'cost_center': row['cost_center_name'],
+            'batch_number': row['lot'],
+            'materialNumber': row['material_number'],
+            'FNumber': row['fnumber'],
+            'org_code': row['org_code'],
+            'warehouse_code': row['warehouse_code'],
+        } for row in rows]
+
+        pagination = {
+            'current_page': page,
+            'total_pages': total_pages,
+            'total_records': total_records,
+            'page_size': page_size,
+            'has_previous': page > 1,
+            'has_next': page < total_pages,
+            'previous_page': page - 1 if page > 1 else None,
+            'next_page': page + 1 if page < total_pages else None,
+            'page_range': range(1, total_pages + 1)
+        }
+        return records, pagination
@@ -0,0 +1,65 @@
+"""
+QC报表产量统计模块
+按 (报表类型, 日期, 分组字段, 数据版本) 缓存按班组、产品型号、包装类型、批号（、备注）分组累加的产量，
+页面的今日/昨日产量统计和产量统计Excel导出共用同一份结果；报表保存/删除后数据版本变化，缓存自然失效，
+历史日期的结果在报表被修改前一直有效
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from home.utils.qc_data_version import get_data_version
+from home.utils.qc_profiles import get_profile_for_model
+
+logger = logging.getLogger(__name__)
+
+# 产量统计分组字段；兴辉、兴辉二线的导出不按备注分组
+PRODUCTION_GROUP_FIELDS = ('shift', 'product_name', 'packaging', 'batch_number', 'remarks')
+XINGHUI_GROUP_FIELDS = PRODUCTION_GROUP_FIELDS[:4]
+
+
+def compute_production_groups(model_class, target_date, group_fields=PRODUCTION_GROUP_FIELDS):
+    """
+    统计指定日期的产量分组
+    返回 {'row_count': 当天报表条数, 'groups': [{分组字段..., 'total_tons', 'count'}]}，
+    groups 按分组字段排序后首次出现的顺序排列；count 为有吨数的报表条数（只有空吨数报表的分组 count 为0）
+    """
+    rows = model_class.objects.filter(date=target_date).values_list(
+        *group_fields, 'tons'
+    ).order_by(*group_fields)
+
+    grouped_production = {}
+    row_count = 0
+    for row in rows:
+        row_count += 1
+        group_key = tuple(value or '未设置' for value in row[:-1])
+        if group_key not in grouped_production:
+            grouped_production[group_key] = dict(zip(group_fields, group_key), total_tons=0, count=0)
+        tons = row[-1]
+        if tons is not None:
+            grouped_production[group_key]['total_tons'] += float(tons)
+            grouped_production[group_key]['count'] += 1
+    return {'row_count': row_count, 'groups': list(grouped_production.values())}
+
+
+def get_production_groups(model_class, target_date, group_fields=PRODUCTION_GROUP_FIELDS):
+    """按数据版本缓存的 compute_production_groups；缓存不可用时直接统计"""
+    report_type = get_profile_for_model(model_class).report_type
+    # 先读版本再统计：统计期间有报表保存时，较新的结果写入旧版本的键，版本递增后不再使用
+    version, _ = get_data_version(report_type)
+    key = f'qc_production:{report_type}:{target_date.isoformat()}:{len(group_fields)}:{version}'
+    try:
+        production = cache.get(key)
+    except Exception as e:
+        logger.warning(f"读取产量统计缓存失败 {key}: {str(e)}")
+        return compute_production_groups(model_class, target_date, group_fields)
+
+    if production is None:
+        production = compute_production_groups(model_class, target_date, group_fields)
+        try:
+            cache.set(key, production, settings.PRODUCTION_STATS_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"写入产量统计缓存失败 {key}: {str(e)}")
+    return production
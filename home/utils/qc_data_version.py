@@ -0,0 +1,121 @@
+"""
+QC报表数据版本与条件请求模块
+各厂区报表保存、删除时递增数据版本号（QCDataVersion）。列表、统计和导出接口的 ETag 由
+数据版本号 + 权限版本号 + 用户 + 查询参数 + 当天日期生成（数据权限、编辑权限和“今日/昨日”统计与用户、日期有关），
+浏览器带 If-None-Match/If-Modified-Since 轮询时，数据未变化则直接返回304，不查询报表表。
+列表中的 can_edit/can_delete/permission_reason 取决于编辑期限、跨用户编辑参数和角色权限，
+这些变化时由信号递增权限版本号（同表中 report_type 为 PERMISSION_VERSION_KEY 的记录），所有厂区的 ETag 随之失效
+"""
+
+import hashlib
+import logging
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from home.models import QCDataVersion
+from home.utils.qc_profiles import get_profile_for_model
+
+logger = logging.getLogger(__name__)
+
+PERMISSION_VERSION_KEY = 'permissions'
+# 影响报表编辑、删除权限的系统参数
+EDIT_PERMISSION_PARAMETERS = frozenset({'report_edit_limit', 'enable_cross_user_edit'})
+
+
+def bump_data_version(report_type):
+    """报表数据变化后递增版本号（首次变化时创建记录）"""
+    now = timezone.now()
+    updated = QCDataVersion.objects.filter(report_type=report_type).update(version=F('version') + 1, updated_at=now)
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            QCDataVersion.objects.create(report_type=report_type, version=1, updated_at=now)
+    except IntegrityError:
+        # 并发创建时另一请求已插入，改为递增
+        QCDataVersion.objects.filter(report_type=report_type).update(version=F('version') + 1, updated_at=now)
+
+
+def bump_permission_version():
+    """编辑权限参数或角色权限变化后递增权限版本号"""
+    bump_data_version(PERMISSION_VERSION_KEY)
+
+
+def get_data_version(report_type):
+    """返回 (版本号, 更新时间)；报表尚无变化记录时为 (0, None)"""
+    row = QCDataVersion.objects.filter(report_type=report_type).values_list('version', 'updated_at').first()
+    return row or (0, None)
+
+
+def get_versions(report_type):
+    """一次查询返回 (数据版本号, 权限版本号, 两者中较晚的更新时间)；尚无记录时版本号为0、时间为 None"""
+    rows = {
+        key: (version, updated_at)
+        for key, version, updated_at in QCDataVersion.objects.filter(
+            report_type__in=(report_type, PERMISSION_VERSION_KEY)
+        ).values_list('report_type', 'version', 'updated_at')
+    }
+    version, updated_at = rows.get(report_type, (0, None))
+    permission_version, permission_updated_at = rows.get(PERMISSION_VERSION_KEY, (0, None))
+    latest = max(filter(None, (updated_at, permission_updated_at)), default=None)
+    return version, permission_version, latest
+
+
+def make_etag(request, report_type, version, permission_version=0):
+    """数据版本号 + 权限版本号 + 用户（含超级管理员标记）+ 请求路径和参数 + 当天日期"""
+    fingerprint = '|'.join([
+        report_type,
+        str(version),
+        str(permission_version),
+        str(request.user.pk),
+        str(request.user.is_superuser),
+        request.path,
+        '&'.join(f'{key}={value}' for key, value in sorted(request.GET.lists())),
+        timezone.localdate().isoformat(),
+    ])
+    return quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+
+
+def conditional_qc_response(request, report_type, build_response):
+    """
+    按数据版本处理条件请求：未变化时返回304，否则调用 build_response() 生成响应并附加 ETag/Last-Modified
+    版本记录读取失败时直接生成响应（不加缓存头），不影响接口可用性
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return build_response()
+    try:
+        version, permission_version, updated_at = get_versions(report_type)
+    except Exception as e:
+        logger.error(f"读取QC数据版本失败 {report_type}: {str(e)}")
+        return build_response()
+
+    etag = make_etag(request, report_type, version, permission_version)
+    # 跨天后“今日/昨日”统计和编辑期限都会变化，Last-Modified 不早于当天零点
+    day_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    last_modified = int(max(updated_at, day_start).timestamp()) if updated_at else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = build_response()
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        # 每次使用前都要向服务器确认；内容与用户有关，不允许共享缓存
+        response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def qc_data_conditional(model_class):
+    """视图装饰器：按QC报表模型的数据版本处理条件请求（放在登录、权限装饰器之后）"""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            report_type = get_profile_for_model(model_class).report_type
+            return conditional_qc_response(request, report_type, lambda: view_func(request, *args, **kwargs))
+        return wrapper
+    return decorator
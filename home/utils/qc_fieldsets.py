@@ -0,0 +1,107 @@
+"""
+QC报表列表字段裁剪模块
+历史记录页面只显示部分列，列表接口可通过 ?fields= 指定需要的字段：查询只取这些列（.values()/.only()），
+响应也只输出这些字段；?format=columnar 时以 {columns, rows} 列式格式返回，不再每行重复字段名
+"""
+
+from datetime import date, datetime, time
+
+from home.utils.qc_profiles import get_profile_for_model
+from home.utils.user_helpers import get_user_info
+
+# 不直接对应模型字段的输出字段（与 _serialize_report 的输出一致）
+USER_FIELDS = ('username', 'original_username')
+PERMISSION_FIELDS = ('can_edit', 'can_delete', 'permission_reason')
+# 权限判断需要读取的模型字段
+PERMISSION_MODEL_FIELDS = ('date', 'username')
+
+
+def parse_fields(value):
+    """解析逗号分隔的字段列表（去重、保持顺序），未指定时返回 None"""
+    if not value:
+        return None
+    fields = []
+    for name in value.split(','):
+        name = name.strip()
+        if name and name not in fields:
+            fields.append(name)
+    return fields or None
+
+
+def _format_value(value):
+    """日期时间格式与 _serialize_report 一致"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    if isinstance(value, time):
+        return value.strftime('%H:%M')
+    return value
+
+
+class QCFieldset:
+    """
+    按请求字段裁剪的QC报表序列化
+    不需要权限字段时用 .values() 只取字典，需要时用 .only() 取模型实例（权限判断按报表对象进行）；
+    未知字段忽略，columns 为实际输出的字段（id 在首列）
+    """
+
+    def __init__(self, model, fields):
+        profile = get_profile_for_model(model)
+        model_fields = ('id',) + profile.fields
+        # id 始终输出，页面的编辑、删除按报表ID进行
+        self.columns = ['id'] + [
+            name for name in fields
+            if name != 'id' and (name in model_fields or name in USER_FIELDS or name in PERMISSION_FIELDS)
+        ]
+        self.needs_instances = any(name in PERMISSION_FIELDS for name in self.columns)
+
+        load = {name for name in self.columns if name in model_fields}
+        if any(name in USER_FIELDS for name in self.columns):
+            load.add('username')
+        if self.needs_instances:
+            load.update(PERMISSION_MODEL_FIELDS)
+        self.load_fields = ['id'] + sorted(load - {'id'})
+        self._display_names = {}
+
+    def apply(self, queryset):
+        if self.needs_instances:
+            return queryset.only(*self.load_fields)
+        return queryset.values(*self.load_fields)
+
+    def _display_name(self, username):
+        """同一页中同一用户只查询一次显示名"""
+        if username not in self._display_names:
+            self._display_names[username] = get_user_info(username).get('name', username)
+        return self._display_names[username]
+
+    def serialize(self, item, permission_getters=None):
+        """
+        item 为 .values() 的字典或 .only() 的模型实例；
+        permission_getters 为 {权限字段: 函数(report)}，只计算请求了的权限字段
+        """
+        if self.needs_instances:
+            def get(name):
+                return getattr(item, name)
+        else:
+            get = item.get
+
+        data = {}
+        for name in self.columns:
+            if name == 'username':
+                data[name] = self._display_name(get('username'))
+            elif name == 'original_username':
+                data[name] = get('username')
+            elif name in PERMISSION_FIELDS:
+                data[name] = permission_getters[name](item)
+            else:
+                value = get(name)
+                data[name] = '' if value is None and name in ('date', 'time') else _format_value(value)
+        return data
+
+
+def to_columnar(data, columns=None):
+    """将字典行列表转换为 {columns, rows}；columns 未指定时取第一行的字段"""
+    if columns is None:
+        columns = list(data[0]) if data else []
+    return {'columns': columns, 'rows': [[row.get(name) for name in columns] for row in data]}
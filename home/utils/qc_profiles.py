@@ -0,0 +1,175 @@
+"""
+QC报表厂区字段配置模块
+七个厂区的QC报表模型字段大体相同、各有少量专属字段。报表类型、模型和各厂区实际拥有的字段在这里统一登记，
+日志序列化、Excel导出列和跨厂区统一存储（QCMeasurement）同步都按字段配置处理，不再每个厂区各写一遍
+"""
+
+import logging
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.apps import apps
+from django.db import models, transaction
+
+logger = logging.getLogger(__name__)
+
+# 报表类型 -> 模型名（顺序与 UserOperationLog.REPORT_TYPES 一致）
+QC_REPORT_MODELS = (
+    ('dongtai', 'DongtaiQCReport'),
+    ('yuantong', 'YuantongQCReport'),
+    ('yuantong2', 'Yuantong2QCReport'),
+    ('dayuan', 'DayuanQCReport'),
+    ('changfu', 'ChangfuQCReport'),
+    ('xinghui', 'XinghuiQCReport'),
+    ('xinghui2', 'Xinghui2QCReport'),
+)
+
+# 统一存储中不来自报表字段的列
+_MEASUREMENT_OWN_FIELDS = ('id', 'report_type', 'report_id')
+_NUMERIC_FIELD_TYPES = (models.FloatField, models.DecimalField, models.IntegerField)
+
+SYNC_BATCH_SIZE = 500
+
+
+def _json_value(value):
+    """转换为可写入JSON的值（与原日志序列化一致：日期时间转字符串）"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime, time)):
+        return str(value)
+    return value
+
+
+class QCFieldProfile:
+    """
+    单个厂区的字段配置
+    fields 为该厂区模型拥有的统一存储字段（按统一存储的字段顺序），numeric_fields 为其中的数值字段
+    """
+
+    def __init__(self, report_type, model):
+        measurement = apps.get_model('home', 'QCMeasurement')
+        self.report_type = report_type
+        self.model = model
+        self.label = dict(measurement.REPORT_TYPES)[report_type]
+        self.permission_code = f'{report_type}_qc_report'
+
+        model_fields = {field.name: field for field in model._meta.concrete_fields}
+        self.fields = tuple(
+            field.name for field in measurement._meta.concrete_fields
+            if field.name not in _MEASUREMENT_OWN_FIELDS and field.name in model_fields
+        )
+        self.numeric_fields = frozenset(
+            name for name in self.fields if isinstance(model_fields[name], _NUMERIC_FIELD_TYPES)
+        )
+        self._measurement_fields = {name: measurement._meta.get_field(name) for name in self.fields}
+
+    def __repr__(self):
+        return f'<QCFieldProfile {self.report_type}>'
+
+    def serialize(self, report, fields=None):
+        """按字段配置序列化报表（JSON可写入的值），fields 为空时输出全部字段"""
+        data = {'id': report.pk}
+        for name in fields or self.fields:
+            if name in self._measurement_fields:
+                data[name] = _json_value(getattr(report, name))
+        return data
+
+    def export_mapping(self, field_mapping):
+        """从通用导出字段映射中去掉该厂区没有的字段（username 由导出函数单独处理）"""
+        return {
+            name: header for name, header in field_mapping.items()
+            if name == 'username' or name in self._measurement_fields
+        }
+
+    def measurement_values(self, report):
+        """报表对应的统一存储字段值（按统一存储的字段类型转换，如东泰以外厂区的数值涡值转为文本）"""
+        values = {}
+        for name, field in self._measurement_fields.items():
+            value = getattr(report, name)
+            values[name] = field.to_python(value) if value is not None else None
+        return values
+
+
+_profiles = None
+
+
+def get_profiles():
+    """返回 {报表类型: QCFieldProfile}（首次调用时按模型元数据生成）"""
+    global _profiles
+    if _profiles is None:
+        _profiles = {
+            report_type: QCFieldProfile(report_type, apps.get_model('home', model_name))
+            for report_type, model_name in QC_REPORT_MODELS
+        }
+    return _profiles
+
+
+def get_profile(report_type):
+    """按报表类型获取字段配置，未知类型返回 None"""
+    return get_profiles().get(report_type)
+
+
+def get_profile_for_model(model):
+    """按QC报表模型类（或实例）获取字段配置，非QC报表模型返回 None"""
+    if not isinstance(model, type):
+        model = type(model)
+    for profile in get_profiles().values():
+        if profile.model is model:
+            return profile
+    return None
+
+
+def sync_measurement(report):
+    """将一条厂区报表写入统一存储（新增或覆盖）"""
+    profile = get_profile_for_model(report)
+    if profile is None:
+        return
+    measurement = apps.get_model('home', 'QCMeasurement')
+    measurement.objects.update_or_create(
+        report_type=profile.report_type, report_id=report.pk,
+        defaults=profile.measurement_values(report),
+    )
+
+
+def delete_measurement(report):
+    """厂区报表删除后移除统一存储中的对应记录"""
+    profile = get_profile_for_model(report)
+    if profile is None:
+        return
+    apps.get_model('home', 'QCMeasurement').objects.filter(
+        report_type=profile.report_type, report_id=report.pk
+    ).delete()
+
+
+def backfill_measurements(report_types=None, batch_size=SYNC_BATCH_SIZE):
+    """
+    按厂区报表表重建统一存储：按ID分批覆盖写入，并删除来源报表已不存在的记录
+    返回 {报表类型: {'synced': 写入条数, 'removed': 删除条数}}
+    """
+    measurement = apps.get_model('home', 'QCMeasurement')
+    results = {}
+    for report_type in report_types or [report_type for report_type, _ in QC_REPORT_MODELS]:
+        profile = get_profile(report_type)
+        synced = 0
+        last_id = 0
+        while True:
+            reports = list(profile.model.objects.filter(pk__gt=last_id).order_by('pk')[:batch_size])
+            if not reports:
+                break
+            last_id = reports[-1].pk
+            with transaction.atomic():
+                measurement.objects.filter(
+                    report_type=report_type, report_id__in=[report.pk for report in reports]
+                ).delete()
+                measurement.objects.bulk_create([
+                    measurement(report_type=report_type, report_id=report.pk, **profile.measurement_values(report))
+                    for report in reports
+                ])
+            synced += len(reports)
+
+        removed, _ = measurement.objects.filter(report_type=report_type).exclude(
+            report_id__in=profile.model.objects.values('pk')
+        ).delete()
+        results[report_type] = {'synced': synced, 'removed': removed}
+        logger.info(f"QC统一存储回填 {report_type}: 写入{synced}条, 删除{removed}条")
+    return results
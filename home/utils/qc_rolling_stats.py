@@ -0,0 +1,186 @@
+"""
+QC指标滚动统计与超限判断模块
+新建报表时由 post_save 信号按 厂区 + 产品型号 + 指标 读取滚动统计（QCRollingStat），先用已有统计判断新检测值是否
+超出规格限（QCSpecLimit）或偏离均值超过 QC_ALERT_SIGMA 倍标准差，再用 Welford 算法 O(1) 更新统计。
+样本数达到窗口大小后改为权重 1/窗口 的指数加权更新，统计量近似最近N个检测值，不需要保存历史检测值
+"""
+
+import logging
+import math
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from home.models import QCRollingStat, QCSpecLimit
+from home.utils.qc_profiles import QC_REPORT_MODELS, get_profile
+
+logger = logging.getLogger(__name__)
+
+# 产量、袋数不是质量指标，不做滚动统计
+EXCLUDED_FIELDS = frozenset({'tons', 'bags'})
+REBUILD_BATCH_SIZE = 2000
+
+
+def welford_update(count, mean, m2, value, window):
+    """
+    加入一个检测值，返回新的 (count, mean, m2)
+    count < window 时为标准 Welford 更新；达到窗口后 count 不再增加，按 alpha = 1/window 指数加权
+    """
+    if count < window:
+        count += 1
+        delta = value - mean
+        mean += delta / count
+        m2 += delta * (value - mean)
+        return count, mean, m2
+    alpha = 1.0 / window
+    variance = m2 / (count - 1) if count > 1 else 0.0
+    delta = value - mean
+    increment = alpha * delta
+    mean += increment
+    variance = (1 - alpha) * (variance + delta * increment)
+    return count, mean, variance * (count - 1)
+
+
+def stat_sigma(count, m2):
+    """样本标准差，样本数不足2个时为 None"""
+    return math.sqrt(max(m2, 0.0) / (count - 1)) if count > 1 else None
+
+
+def tracked_values(profile, report):
+    """报表中参与滚动统计的数值指标 {字段: float值}（空值不统计）"""
+    values = {}
+    for field_name in profile.numeric_fields - EXCLUDED_FIELDS:
+        value = getattr(report, field_name, None)
+        if value is None or value == '':
+            continue
+        try:
+            values[field_name] = float(value)
+        except (TypeError, ValueError):
+            continue
+    return values
+
+
+def _spec_limits(report_type, product_name, field_names):
+    """{字段: (规格下限, 规格上限)}，产品型号的配置优先于厂区默认配置"""
+    limits = {}
+    specs = QCSpecLimit.objects.filter(
+        report_type=report_type, product_name__in=[product_name, ''], field_name__in=field_names,
+    ).order_by('product_name')
+    # 按产品型号升序，默认配置（空字符串）先写入，随后被产品型号的配置覆盖
+    for spec in specs:
+        limits[spec.field_name] = (spec.lsl, spec.usl)
+    return limits
+
+
+def check_value(value, stat, spec):
+    """
+    判断单个检测值是否异常，返回原因列表（正常时为空）
+    stat 为更新前的 (count, mean, m2)，spec 为 (规格下限, 规格上限)
+    """
+    reasons = []
+    lsl, usl = spec
+    if lsl is not None and value < lsl:
+        reasons.append('低于规格下限')
+    if usl is not None and value > usl:
+        reasons.append('高于规格上限')
+    count, mean, m2 = stat
+    sigma = stat_sigma(count, m2)
+    if count >= settings.QC_ALERT_MIN_SAMPLES and sigma and abs(value - mean) > settings.QC_ALERT_SIGMA * sigma:
+        reasons.append(f'偏离均值超过{settings.QC_ALERT_SIGMA:g}倍标准差')
+    return reasons
+
+
+def update_rolling_stats(report_type, report):
+    """
+    新建报表后由 post_save 信号调用：判断各指标是否异常并更新滚动统计
+    返回告警列表 [{'field', 'field_label', 'value', 'mean', 'sigma', 'z_score', 'lsl', 'usl', 'sample_count', 'reasons'}]
+    """
+    profile = get_profile(report_type)
+    product_name = (report.product_name or '').strip()
+    if profile is None or not product_name:
+        return []
+    values = tracked_values(profile, report)
+    if not values:
+        return []
+
+    window = settings.QC_ROLLING_WINDOW
+    limits = _spec_limits(report_type, product_name, list(values))
+    alerts = []
+    now = timezone.now()
+    with transaction.atomic():
+        stats = {
+            stat.field_name: stat
+            for stat in QCRollingStat.objects.select_for_update().filter(
+                report_type=report_type, product_name=product_name, field_name__in=list(values),
+            )
+        }
+        to_create = []
+        for field_name, value in values.items():
+            stat = stats.get(field_name)
+            if stat is None:
+                stat = QCRollingStat(report_type=report_type, product_name=product_name, field_name=field_name)
+                to_create.append(stat)
+            spec = limits.get(field_name, (None, None))
+            reasons = check_value(value, (stat.count, stat.mean, stat.m2), spec)
+            if reasons:
+                sigma = stat_sigma(stat.count, stat.m2)
+                alerts.append({
+                    'field': field_name,
+                    'field_label': str(profile.model._meta.get_field(field_name).verbose_name),
+                    'value': value,
+                    'mean': round(stat.mean, 6) if stat.count else None,
+                    'sigma': round(sigma, 6) if sigma else None,
+                    'z_score': round((value - stat.mean) / sigma, 2) if sigma else None,
+                    'lsl': spec[0],
+                    'usl': spec[1],
+                    'sample_count': stat.count,
+                    'reasons': reasons,
+                })
+            stat.count, stat.mean, stat.m2 = welford_update(stat.count, stat.mean, stat.m2, value, window)
+            stat.updated_at = now
+
+        if stats:
+            QCRollingStat.objects.bulk_update(list(stats.values()), ['count', 'mean', 'm2', 'updated_at'])
+        if to_create:
+            # 并发首次写入同一指标时其中一次的样本丢失，不影响后续统计
+            QCRollingStat.objects.bulk_create(to_create, ignore_conflicts=True)
+    return alerts
+
+
+def rebuild_rolling_stats(report_types=None, batch_size=REBUILD_BATCH_SIZE):
+    """
+    按报表历史数据（按日期、时间顺序）重建滚动统计，用于上线或修改窗口大小后初始化
+    返回 {报表类型: 统计条数}
+    """
+    window = settings.QC_ROLLING_WINDOW
+    results = {}
+    for report_type in report_types or [report_type for report_type, _ in QC_REPORT_MODELS]:
+        profile = get_profile(report_type)
+        field_names = sorted(profile.numeric_fields - EXCLUDED_FIELDS)
+        stats = {}
+        queryset = profile.model.objects.order_by('date', 'time', 'id').values_list('product_name', *field_names)
+        for row in queryset.iterator(chunk_size=batch_size):
+            product_name = (row[0] or '').strip()
+            if not product_name:
+                continue
+            for field_name, value in zip(field_names, row[1:]):
+                if value is None or value == '':
+                    continue
+                try:
+                    value = float(value)
+                except (TypeError, ValueError):
+                    continue
+                key = (product_name, field_name)
+                stats[key] = welford_update(*stats.get(key, (0, 0.0, 0.0)), value, window)
+
+        with transaction.atomic():
+            QCRollingStat.objects.filter(report_type=report_type).delete()
+            QCRollingStat.objects.bulk_create([
+                QCRollingStat(report_type=report_type, product_name=product_name, field_name=field_name,
+                              count=count, mean=mean, m2=m2)
+                for (product_name, field_name), (count, mean, m2) in stats.items()
+            ], batch_size=batch_size)
+        results[report_type] = len(stats)
+        logger.info(f"QC滚动统计重建 {report_type}: {len(stats)}条")
+    return results
@@ -0,0 +1,82 @@
+"""
+跨厂区QC报表查询模块
+按批号、产品型号等条件在跨厂区统一存储（QCMeasurement）中一次查询七个厂区的QC报表：
+各厂区的数据权限合并为一个查询条件，按日期、时间倒序取前N条，每行标记所属报表类型。
+统一存储随报表保存、删除由信号同步，上线前需用 sync_qc_measurements 命令回填历史数据
+"""
+
+import logging
+import operator
+from functools import reduce
+
+from django.db.models import Q
+
+from home.models import QCMeasurement
+from home.utils import get_user_data_filter_by_company_department
+from home.utils.qc_profiles import get_profiles
+
+logger = logging.getLogger(__name__)
+
+# 统一查询结果的列（id 为来源厂区报表的ID）
+SEARCH_FIELDS = (
+    'date', 'time', 'shift', 'product_name', 'packaging', 'batch_number',
+    'tons', 'moisture', 'remarks', 'username',
+)
+DEFAULT_SEARCH_LIMIT = 100
+MAX_SEARCH_LIMIT = 500
+
+
+def visible_measurements(user, report_types=None):
+    """
+    用户可查看的统一存储记录，各厂区的数据权限与该厂区列表接口一致
+    没有任何厂区的查看权限时返回 None
+    """
+    profiles = get_profiles()
+    conditions = []
+    for report_type in report_types or profiles:
+        data_filter = get_user_data_filter_by_company_department(user, profiles[report_type].permission_code, 'username')
+        # 没有任何查看权限时过滤条件为 {'id': None}，不查询该厂区
+        if 'id' in data_filter and data_filter['id'] is None:
+            continue
+        conditions.append(Q(report_type=report_type, **data_filter))
+    if not conditions:
+        return None
+    return QCMeasurement.objects.filter(reduce(operator.or_, conditions))
+
+
+def build_search_queryset(user, filters, report_types=None):
+    """
+    filters 支持 keyword（批号或产品型号包含）、batch_number、product_name、shift、start_date、end_date
+    无任何厂区的查看权限时返回 None
+    """
+    queryset = visible_measurements(user, report_types)
+    if queryset is None:
+        return None
+    keyword = filters.get('keyword')
+    if keyword:
+        queryset = queryset.filter(Q(batch_number__icontains=keyword) | Q(product_name__icontains=keyword))
+    if filters.get('batch_number'):
+        queryset = queryset.filter(batch_number__icontains=filters['batch_number'])
+    if filters.get('product_name'):
+        queryset = queryset.filter(product_name__icontains=filters['product_name'])
+    if filters.get('shift'):
+        queryset = queryset.filter(shift__icontains=filters['shift'])
+    if filters.get('start_date'):
+        queryset = queryset.filter(date__gte=filters['start_date'])
+    if filters.get('end_date'):
+        queryset = queryset.filter(date__lte=filters['end_date'])
+    return queryset.order_by('-date', '-time', '-report_id').values('report_type', 'report_id', *SEARCH_FIELDS)
+
+
+def search_qc_reports(user, filters, report_types=None, limit=DEFAULT_SEARCH_LIMIT):
+    """返回按日期、时间倒序的前 limit 条记录，每条带 id（厂区报表ID）、report_type、report_label"""
+    queryset = build_search_queryset(user, filters, report_types)
+    if queryset is None:
+        return []
+    profiles = get_profiles()
+    rows = list(queryset[:limit])
+    for row in rows:
+        row['id'] = row.pop('report_id')
+        row['report_label'] = profiles[row['report_type']].label
+    logger.debug(f"跨厂区QC查询: 返回{len(rows)}条")
+    return rows
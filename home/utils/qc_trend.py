@@ -0,0 +1,152 @@
+"""
+QC指标趋势降采样模块
+长时间范围的单指标趋势图不再经分页列表接口逐页拉取全部报表，由服务端降采样到指定点数后返回：
+- lttb: Largest-Triangle-Three-Buckets，从原始检测值中选出保留形状的点（只查询时间和指标两列）
+- bucket: 按日/周/月在数据库中分组汇总最小值、最大值、平均值和条数，选择分组数不超过点数的最细粒度
+"""
+
+import logging
+from datetime import datetime, time
+
+from django.db.models import Avg, Count, Max, Min
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+from home.utils.qc_profiles import get_profile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POINTS = 500
+MIN_POINTS = 3
+MAX_POINTS = 2000
+TREND_METHODS = ('lttb', 'bucket')
+
+# (粒度, 截断函数, 每组大致天数)，由细到粗
+BUCKET_GRANULARITIES = (
+    ('day', TruncDay, 1),
+    ('week', TruncWeek, 7),
+    ('month', TruncMonth, 31),
+)
+
+
+class TrendError(ValueError):
+    """趋势参数错误（未知厂区、非数值指标、日期范围无效等）"""
+
+
+def lttb(points, threshold):
+    """
+    Largest-Triangle-Three-Buckets 降采样
+    points 为按 x 升序的 [(x, y, 原始数据)]，保留首尾点，其余每个桶选出与前一选中点、下一桶均值点
+    构成三角形面积最大的点；点数不超过 threshold 时原样返回
+    """
+    count = len(points)
+    if threshold >= count or threshold < MIN_POINTS:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (count - 2) / (threshold - 2)
+    previous = 0
+    for index in range(threshold - 2):
+        start = int(index * bucket_size) + 1
+        end = int((index + 1) * bucket_size) + 1
+        # 下一桶的平均点（最后一个桶用末尾点）
+        next_start = end
+        next_end = min(int((index + 2) * bucket_size) + 1, count)
+        if next_start >= count - 1:
+            avg_x, avg_y = points[-1][0], points[-1][1]
+        else:
+            span = next_end - next_start
+            avg_x = sum(point[0] for point in points[next_start:next_end]) / span
+            avg_y = sum(point[1] for point in points[next_start:next_end]) / span
+
+        prev_x, prev_y = points[previous][0], points[previous][1]
+        best_index = start
+        best_area = -1.0
+        for candidate in range(start, end):
+            x, y = points[candidate][0], points[candidate][1]
+            area = abs((prev_x - avg_x) * (y - prev_y) - (prev_x - x) * (avg_y - prev_y))
+            if area > best_area:
+                best_area = area
+                best_index = candidate
+        sampled.append(points[best_index])
+        previous = best_index
+    sampled.append(points[-1])
+    return sampled
+
+
+def _lttb_trend(queryset, field_name, points):
+    rows = queryset.order_by('date', 'time', 'id').values_list('date', 'time', field_name)
+    series = []
+    for day, moment, value in rows.iterator():
+        timestamp = datetime.combine(day, moment or time.min)
+        series.append((timestamp.timestamp(), float(value), timestamp))
+    sampled = lttb(series, points)
+    return len(series), [
+        {'t': timestamp.strftime('%Y-%m-%d %H:%M'), 'value': round(value, 6)}
+        for _, value, timestamp in sampled
+    ]
+
+
+def _bucket_trend(queryset, field_name, start_date, end_date, points):
+    span_days = (end_date - start_date).days + 1
+    granularity, trunc, days = next(
+        (option for option in BUCKET_GRANULARITIES if span_days / option[2] <= points),
+        BUCKET_GRANULARITIES[-1],
+    )
+    rows = queryset.annotate(bucket=trunc('date')).values('bucket').annotate(
+        min=Min(field_name), max=Max(field_name), avg=Avg(field_name), count=Count('id'),
+    ).order_by('bucket')
+    sample_count = 0
+    data = []
+    for row in rows:
+        sample_count += row['count']
+        data.append({
+            't': row['bucket'].strftime('%Y-%m-%d'),
+            'min': round(float(row['min']), 6),
+            'max': round(float(row['max']), 6),
+            'avg': round(float(row['avg']), 6),
+            'count': row['count'],
+        })
+    return sample_count, data, granularity
+
+
+def get_trend(report_type, field_name, start_date, end_date, product_name='', points=DEFAULT_POINTS,
+              method='lttb', data_filter=None):
+    """
+    返回降采样后的指标趋势
+    data_filter 为用户的数据权限过滤条件；product_name 为空时统计该厂区全部产品；参数错误抛出 TrendError
+    """
+    profile = get_profile(report_type)
+    if profile is None:
+        raise TrendError(f'未知的报表类型: {report_type}')
+    if field_name not in profile.numeric_fields:
+        raise TrendError(f'{profile.label}没有数值指标 {field_name}')
+    if method not in TREND_METHODS:
+        raise TrendError(f"降采样方式需为 {'、'.join(TREND_METHODS)}")
+    if start_date > end_date:
+        raise TrendError('开始日期不能晚于结束日期')
+    points = min(max(points, MIN_POINTS), MAX_POINTS)
+
+    queryset = profile.model.objects.filter(
+        date__gte=start_date, date__lte=end_date, **{f'{field_name}__isnull': False}, **(data_filter or {})
+    )
+    if product_name:
+        queryset = queryset.filter(product_name=product_name)
+
+    result = {
+        'report_type': report_type,
+        'report_label': profile.label,
+        'field': field_name,
+        'field_label': str(profile.model._meta.get_field(field_name).verbose_name),
+        'product_name': product_name,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'method': method,
+        'points': points,
+    }
+    if method == 'lttb':
+        sample_count, data = _lttb_trend(queryset, field_name, points)
+    else:
+        sample_count, data, result['granularity'] = _bucket_trend(queryset, field_name, start_date, end_date, points)
+    result.update(sample_count=sample_count, data=data)
+    logger.debug(f"QC趋势 {report_type}.{field_name} {method}: {sample_count}条 -> {len(data)}点")
+    return result
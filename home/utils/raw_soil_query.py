@@ -0,0 +1,180 @@
+"""
+原土入库外部查询模块
+按 (业务日期, 创建时间, 主键) 键集分页逐批读取记录（每批一次查询），边序列化边累计合计，
+支持 NDJSON / 分块JSON 流式输出和游标分页，大时间范围查询时内存占用与结果条数无关
+"""
+
+import base64
+import json
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import Q
+
+from home.models import RawSoilStorage
+
+logger = logging.getLogger(__name__)
+
+RAW_SOIL_FIELDS = (
+    'fnumber', 'biz_date', 'material_code', 'material_name',
+    'quantity', 'actual_quantity', 'lot', 'remark',
+    'cost_center_code', 'storage_org_code', 'warehouse_code', 'cost_object_code',
+    'rate', 'created_by', 'created_at', 'updated_at'
+)
+
+# 游标排序：在原有 业务日期、创建时间 倒序基础上用主键保证顺序唯一
+RAW_SOIL_ORDERING = ('-biz_date', '-created_at', '-id')
+
+STREAM_CHUNK_SIZE = 2000
+# 流式输出时每次写出的记录数
+STREAM_FLUSH_ROWS = 200
+MAX_PAGE_LIMIT = 5000
+
+STREAM_FORMATS = ('ndjson', 'json')
+
+
+def encode_cursor(row):
+    """用最后一条记录的排序键生成游标"""
+    key = [row['biz_date'].isoformat(), row['created_at'].isoformat(), row['id']]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """解析游标，返回 (biz_date, created_at, id)；游标无效时抛出 ValueError"""
+    try:
+        biz_date, created_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return date.fromisoformat(biz_date), datetime.fromisoformat(created_at), int(pk)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError('cursor 无效') from e
+
+
+def _after(qs, biz_date, created_at, pk):
+    """按排序键取位于 (biz_date, created_at, pk) 之后的记录"""
+    return qs.filter(
+        Q(biz_date__lt=biz_date)
+        | Q(biz_date=biz_date, created_at__lt=created_at)
+        | Q(biz_date=biz_date, created_at=created_at, id__lt=pk)
+    )
+
+
+def build_raw_soil_queryset(start_date=None, end_date=None, storage_org_code=None, cursor=None):
+    """按业务日期范围、库存组织和游标位置构建查询"""
+    qs = RawSoilStorage.objects.order_by(*RAW_SOIL_ORDERING)
+    if start_date:
+        qs = qs.filter(biz_date__gte=start_date)
+    if end_date:
+        qs = qs.filter(biz_date__lte=end_date)
+    if storage_org_code:
+        qs = qs.filter(storage_org_code=storage_org_code)
+    if cursor:
+        qs = _after(qs, *decode_cursor(cursor))
+    return qs
+
+
+def serialize_raw_soil_row(row):
+    """将日期和Decimal字段转换为JSON可序列化的值"""
+    row['biz_date'] = row['biz_date'].strftime('%Y-%m-%d') if row.get('biz_date') else None
+    row['created_at'] = row['created_at'].isoformat() if row.get('created_at') else None
+    row['updated_at'] = row['updated_at'].isoformat() if row.get('updated_at') else None
+    for field in ('quantity', 'actual_quantity', 'rate'):
+        if row.get(field) is not None:
+            row[field] = float(row[field])
+    return row
+
+
+class RawSoilQueryResult:
+    """
+    原土入库查询结果
+    rows() 逐条产出序列化后的记录并在同一次遍历中累计数量合计；遍历结束后 summary() 返回合计和下一页游标
+    MySQL 驱动的 iterator() 会先把整个结果集读入内存，因此按键集分页每次只查询 chunk_size 条
+    """
+
+    def __init__(self, queryset, limit=None, chunk_size=STREAM_CHUNK_SIZE):
+        self.queryset = queryset
+        self.limit = limit
+        self.chunk_size = chunk_size
+        self.count = 0
+        self.quantity_total = Decimal('0')
+        self.actual_quantity_total = Decimal('0')
+        self.next_cursor = None
+
+    def rows(self):
+        qs = self.queryset.values('id', *RAW_SOIL_FIELDS)
+        last_row = None
+        while True:
+            page_qs = _after(qs, last_row['biz_date'], last_row['created_at'], last_row['id']) if last_row else qs
+            # 指定 limit 时最后一批多取一条，用于判断是否还有下一页
+            size = min(self.chunk_size, self.limit + 1 - self.count) if self.limit else self.chunk_size
+            page = list(page_qs[:size])
+            for row in page:
+                if self.limit and self.count >= self.limit:
+                    self.next_cursor = encode_cursor(last_row)
+                    return
+                last_row = {'biz_date': row['biz_date'], 'created_at': row['created_at'], 'id': row.pop('id')}
+                self.count += 1
+                self.quantity_total += row['quantity'] or 0
+                self.actual_quantity_total += row['actual_quantity'] or 0
+                yield serialize_raw_soil_row(row)
+            if len(page) < size:
+                return
+
+    def summary(self):
+        summary = {
+            'quantity_total': float(self.quantity_total),
+            'actual_quantity_total': float(self.actual_quantity_total),
+            'count': self.count,
+        }
+        if self.limit:
+            summary['next_cursor'] = self.next_cursor
+        return summary
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+def stream_ndjson(result):
+    """NDJSON：每行一条记录，最后一行为 {"summary": {...}}，中途出错时最后一行为 {"error": ...}"""
+    buffer = []
+    try:
+        for row in result.rows():
+            buffer.append(_dumps(row))
+            if len(buffer) >= STREAM_FLUSH_ROWS:
+                yield '\n'.join(buffer) + '\n'
+                buffer = []
+        if buffer:
+            yield '\n'.join(buffer) + '\n'
+        yield _dumps({'summary': result.summary()}) + '\n'
+    except Exception as e:
+        logger.error(f"原土入库流式查询失败（已输出{result.count}条）: {str(e)}", exc_info=True)
+        if buffer:
+            yield '\n'.join(buffer) + '\n'
+        yield _dumps({'error': '查询中断', 'count': result.count}) + '\n'
+
+
+def stream_json(result):
+    """
+    分块JSON：与非流式响应结构相同，success 放在最后输出，
+    中途出错时以 success=false 结束，客户端据此判断数据是否完整
+    """
+    yield '{"data": ['
+    first = True
+    buffer = []
+    try:
+        for row in result.rows():
+            buffer.append(_dumps(row))
+            if len(buffer) >= STREAM_FLUSH_ROWS:
+                yield ('' if first else ',') + ','.join(buffer)
+                first = False
+                buffer = []
+        if buffer:
+            yield ('' if first else ',') + ','.join(buffer)
+        tail = result.summary()
+        tail['success'] = True
+    except Exception as e:
+        logger.error(f"原土入库流式查询失败（已输出{result.count}条）: {str(e)}", exc_info=True)
+        if buffer:
+            yield ('' if first else ',') + ','.join(buffer)
+        tail = {'count': result.count, 'success': False, 'message': '查询中断'}
+    yield '], ' + _dumps(tail)[1:]
@@ -0,0 +1,212 @@
+"""
+QC指标统计过程控制（SPC）模块
+按 厂区 + 产品型号 + 数值指标 取最近的检测值，计算单值-移动极差（I-MR）控制图、均值-极差（X-bar/R）控制图
+和过程能力 Cp/Cpk。检测值用 values_list 一次取出后交给 NumPy 计算；结果按数据版本缓存，报表修改后自动失效。
+NumPy 只在计算时导入，不增加 worker 启动耗时
+"""
+
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from home.models import QCSpecLimit
+from home.utils.qc_data_version import get_data_version
+from home.utils.qc_profiles import get_profile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = 100
+MAX_WINDOW = 2000
+DEFAULT_SUBGROUP_SIZE = 5
+
+# X-bar/R 控制图系数（按子组大小 n）：A2、D3、D4、d2
+XBAR_R_CONSTANTS = {
+    2: (1.880, 0.0, 3.267, 1.128),
+    3: (1.023, 0.0, 2.574, 1.693),
+    4: (0.729, 0.0, 2.282, 2.059),
+    5: (0.577, 0.0, 2.114, 2.326),
+    6: (0.483, 0.0, 2.004, 2.534),
+    7: (0.419, 0.076, 1.924, 2.704),
+    8: (0.373, 0.136, 1.864, 2.847),
+    9: (0.337, 0.184, 1.816, 2.970),
+    10: (0.308, 0.223, 1.777, 3.078),
+}
+# 单值控制图：移动极差（n=2）的 d2 和 D4
+MR_D2 = 1.128
+MR_D4 = 3.267
+
+
+class SPCError(ValueError):
+    """SPC参数错误（未知厂区、非数值指标、子组大小不支持等）"""
+
+
+def _round(value):
+    return None if value is None else round(float(value), 6)
+
+
+def get_spec_limits(report_type, product_name, field_name):
+    """返回 (规格下限, 规格上限)，产品型号的配置优先于厂区默认配置；未配置时为 (None, None)"""
+    limits = {
+        spec.product_name: (spec.lsl, spec.usl)
+        for spec in QCSpecLimit.objects.filter(
+            report_type=report_type, field_name=field_name, product_name__in=[product_name, '']
+        )
+    }
+    return limits.get(product_name) or limits.get('') or (None, None)
+
+
+def _individuals_chart(np, values):
+    moving_ranges = np.abs(np.diff(values))
+    center = values.mean()
+    mr_center = moving_ranges.mean() if len(moving_ranges) else 0.0
+    ucl = center + 3 * mr_center / MR_D2
+    lcl = center - 3 * mr_center / MR_D2
+    out_of_control = np.flatnonzero((values > ucl) | (values < lcl))
+    return {
+        'center': _round(center),
+        'ucl': _round(ucl),
+        'lcl': _round(lcl),
+        'mr_center': _round(mr_center),
+        'mr_ucl': _round(MR_D4 * mr_center),
+        'moving_ranges': [None] + [_round(value) for value in moving_ranges],
+        'out_of_control': out_of_control.tolist(),
+    }, mr_center
+
+
+def _xbar_r_chart(np, values, subgroup_size):
+    """按时间顺序每 subgroup_size 个连续检测值为一个子组，不足一组的剩余值不参与；子组少于2个时返回 None"""
+    count = len(values) // subgroup_size
+    if count < 2:
+        return None, None
+    subgroups = values[:count * subgroup_size].reshape(count, subgroup_size)
+    means = subgroups.mean(axis=1)
+    ranges = subgroups.max(axis=1) - subgroups.min(axis=1)
+    a2, d3, d4, d2 = XBAR_R_CONSTANTS[subgroup_size]
+    center = means.mean()
+    r_center = ranges.mean()
+    ucl = center + a2 * r_center
+    lcl = center - a2 * r_center
+    out_of_control = np.flatnonzero((means > ucl) | (means < lcl) | (ranges > d4 * r_center) | (ranges < d3 * r_center))
+    return {
+        'subgroup_size': subgroup_size,
+        'means': [_round(value) for value in means],
+        'ranges': [_round(value) for value in ranges],
+        'center': _round(center),
+        'ucl': _round(ucl),
+        'lcl': _round(lcl),
+        'r_center': _round(r_center),
+        'r_ucl': _round(d4 * r_center),
+        'r_lcl': _round(d3 * r_center),
+        'out_of_control': out_of_control.tolist(),
+    }, r_center / d2
+
+
+def _capability(mean, sigma, lsl, usl):
+    """Cp 需要双侧规格限；Cpk 取到两侧（或已配置的一侧）规格限的较小距离"""
+    if not sigma:
+        return None, None
+    cp = (usl - lsl) / (6 * sigma) if lsl is not None and usl is not None else None
+    sides = []
+    if usl is not None:
+        sides.append((usl - mean) / (3 * sigma))
+    if lsl is not None:
+        sides.append((mean - lsl) / (3 * sigma))
+    return cp, (min(sides) if sides else None)
+
+
+def compute_spc(model_class, field_name, product_name, window=DEFAULT_WINDOW, subgroup_size=DEFAULT_SUBGROUP_SIZE,
+                start_date=None, end_date=None, lsl=None, usl=None):
+    """计算最近 window 个检测值（按日期、时间顺序）的控制图和过程能力"""
+    import numpy as np
+
+    queryset = model_class.objects.filter(product_name=product_name, **{f'{field_name}__isnull': False})
+    if start_date:
+        queryset = queryset.filter(date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(date__lte=end_date)
+    rows = list(queryset.order_by('-date', '-time', '-id').values_list('date', 'time', field_name)[:window])
+    rows.reverse()
+
+    values = np.array([row[2] for row in rows], dtype=float)
+    result = {
+        'sample_count': len(values),
+        'points': [
+            {'date': row[0].strftime('%Y-%m-%d') if row[0] else '', 'time': row[1].strftime('%H:%M') if row[1] else '',
+             'value': _round(value)}
+            for row, value in zip(rows, values)
+        ],
+        'spec': {'lsl': lsl, 'usl': usl},
+        'individuals': None,
+        'xbar_r': None,
+        'capability': None,
+    }
+    if len(values) < 2:
+        return result
+
+    individuals, mr_center = _individuals_chart(np, values)
+    xbar_r, subgroup_sigma = _xbar_r_chart(np, values, subgroup_size)
+    # 组内标准差优先用 R̄/d2，子组不足时用 MR̄/d2
+    sigma_within = subgroup_sigma if subgroup_sigma is not None else mr_center / MR_D2
+    mean = values.mean()
+    cp, cpk = _capability(mean, sigma_within, lsl, usl)
+    result.update({
+        'individuals': individuals,
+        'xbar_r': xbar_r,
+        'capability': {
+            'mean': _round(mean),
+            'sigma_within': _round(sigma_within),
+            'sigma_overall': _round(values.std(ddof=1)),
+            'cp': _round(cp),
+            'cpk': _round(cpk),
+        },
+    })
+    return result
+
+
+def get_spc(report_type, field_name, product_name, window=DEFAULT_WINDOW, subgroup_size=DEFAULT_SUBGROUP_SIZE,
+            start_date=None, end_date=None, lsl=None, usl=None):
+    """
+    校验参数并返回按数据版本缓存的 SPC 结果
+    lsl/usl 未指定时使用 QCSpecLimit 配置；参数错误抛出 SPCError
+    """
+    profile = get_profile(report_type)
+    if profile is None:
+        raise SPCError(f'未知的报表类型: {report_type}')
+    if field_name not in profile.numeric_fields:
+        raise SPCError(f'{profile.label}没有数值指标 {field_name}')
+    if subgroup_size not in XBAR_R_CONSTANTS:
+        raise SPCError(f'子组大小需在 {min(XBAR_R_CONSTANTS)}~{max(XBAR_R_CONSTANTS)} 之间')
+    window = min(max(window, 2), MAX_WINDOW)
+
+    if lsl is None and usl is None:
+        lsl, usl = get_spec_limits(report_type, product_name, field_name)
+
+    version, _ = get_data_version(report_type)
+    fingerprint = '|'.join(str(part) for part in (
+        product_name, window, subgroup_size, start_date, end_date, lsl, usl,
+    ))
+    key = f'qc_spc:{report_type}:{field_name}:{version}:{hashlib.md5(fingerprint.encode()).hexdigest()}'
+    try:
+        result = cache.get(key)
+    except Exception as e:
+        logger.warning(f"读取SPC缓存失败 {key}: {str(e)}")
+        result = None
+    if result is None:
+        result = compute_spc(profile.model, field_name, product_name, window, subgroup_size,
+                             start_date, end_date, lsl, usl)
+        try:
+            cache.set(key, result, settings.SPC_CACHE_TTL)
+        except Exception as e:
+            logger.warning(f"写入SPC缓存失败 {key}: {str(e)}")
+
+    return dict(
+        result,
+        report_type=report_type,
+        report_label=profile.label,
+        field=field_name,
+        field_label=str(profile.model._meta.get_field(field_name).verbose_name),
+        product_name=product_name,
+        window=window,
+    )
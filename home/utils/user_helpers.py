@@ -6,27 +6,24 @@
 from django.contrib.auth.models import User
 
 
+def format_user_display_name(username, first_name='', last_name=''):
+    """用户显示名：有first_name和last_name时组合显示，只有first_name时显示first_name，否则显示用户名"""
+    if first_name and last_name:
+        return f"{last_name}-{first_name}"
+    if first_name:
+        return first_name
+    return username
+
+
 def get_user_info(userid):
     """获取用户信息"""
     try:
         # 尝试从Django User模型获取用户信息
         user = User.objects.get(username=userid)
-        # 如果用户有first_name和last_name，组合显示
-        if user.first_name and user.last_name:
-            return {
-                'name': f"{user.last_name}-{user.first_name}",
-                'userid': userid
-            }
-        elif user.first_name:
-            return {
-                'name': user.first_name,
-                'userid': userid
-            }
-        else:
-            return {
-                'name': userid,
-                'userid': userid
-            }
+        return {
+            'name': format_user_display_name(userid, user.first_name, user.last_name),
+            'userid': userid
+        }
     except User.DoesNotExist:
         # 如果Django User不存在，返回原始userid
         return {'name': userid, 'userid': userid}
@@ -35,6 +32,23 @@ def get_user_info(userid):
         return {'name': userid, 'userid': userid}
 
 
+def resolve_usernames(keyword):
+    """
+    将输入的关键字解析为用户名列表（用户名或显示名包含关键字，不区分大小写）
+    用户表很小，在内存中匹配；关键字本身也作为用户名保留，以便查询已删除用户或 anonymous 的日志
+    """
+    keyword = (keyword or '').strip()
+    if not keyword:
+        return []
+    lowered = keyword.lower()
+    usernames = {keyword}
+    for username, first_name, last_name in User.objects.values_list('username', 'first_name', 'last_name'):
+        display_name = format_user_display_name(username, first_name, last_name)
+        if lowered in username.lower() or lowered in display_name.lower():
+            usernames.add(username)
+    return sorted(usernames)
+
+
 def is_admin_user(userid):
     """检查用户是否是管理员"""
     # 开发环境下暂时返回 True
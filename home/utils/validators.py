@@ -1,175 +1,248 @@
 """
 数据验证工具模块
-提供基于Django模型字段定义的数据验证功能
+提供基于Django模型字段定义的数据验证功能。
+每个模型的字段规则（最大长度、小数位数、是否允许为空、可选值）在首次使用时编译成校验表并按进程缓存，
+Excel导入（整批）和QC报表API的新增、修改共用同一套校验表
 """
 
-from django.db.models.fields import NOT_PROVIDED
+import math
+from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
-from datetime import date, datetime, time
 
+from django.db.models.fields import NOT_PROVIDED
 
-def validate_field_by_model(model_class, field_name, value, field_display_name=None):
-    """
-    根据Django模型字段定义校验字段值
-    
-    Args:
-        model_class: Django模型类
-        field_name: 字段名
-        value: 要校验的值
-        field_display_name: 字段显示名称（用于错误提示）
-    
-    Returns:
-        tuple: (is_valid, error_message)
-    """
-    if field_display_name is None:
-        field_display_name = field_name
-    
-    # 如果值为None或空，且字段允许null/blank或有默认值，则通过校验
-    if value is None or (isinstance(value, str) and value.strip() == ''):
-        try:
-            field = model_class._meta.get_field(field_name)
-            # 如果字段允许null或blank，则允许为空
-            if field.null or field.blank:
-                return True, None
-            # 如果字段有默认值（包括callable），也允许为空，因为Django会自动使用默认值
-            if hasattr(field, 'default'):
-                # 对于NOT_PROVIDED，表示没有默认值
-                if field.default is not NOT_PROVIDED:
-                    return True, None
-            # 没有默认值且不允许null/blank的字段才报错
-            return False, f'字段"{field_display_name}"不能为空'
-        except:
-            return True, None  # 如果字段不存在，跳过校验
-    
-    try:
-        field = model_class._meta.get_field(field_name)
-    except:
-        return True, None  # 字段不存在，跳过校验
-    
-    # 根据字段类型进行校验
-    field_type = type(field).__name__
-    
-    # CharField: 校验最大长度
-    if field_type == 'CharField':
-        max_length = field.max_length
-        if isinstance(value, str):
-            if len(value) > max_length:
-                return False, f'字段"{field_display_name}"值"{value[:50]}{"..." if len(value) > 50 else ""}"超过最大长度{max_length}字符（实际长度：{len(value)}）'
-        else:
-            value_str = str(value)
-            if len(value_str) > max_length:
-                return False, f'字段"{field_display_name}"值"{value_str[:50]}{"..." if len(value_str) > 50 else ""}"超过最大长度{max_length}字符（实际长度：{len(value_str)}）'
-    
-    # TextField: 无长度限制，但需要是字符串
-    elif field_type == 'TextField':
+
+def _is_empty(value):
+    return value is None or (isinstance(value, str) and value.strip() == '')
+
+
+def _char_check(field):
+    max_length = field.max_length
+    if max_length is None:
+        return None
+
+    def check(value, display_name):
+        value_str = value if isinstance(value, str) else str(value)
+        if len(value_str) > max_length:
+            return f'字段"{display_name}"值"{value_str[:50]}{"..." if len(value_str) > 50 else ""}"超过最大长度{max_length}字符（实际长度：{len(value_str)}）'
+    return check
+
+
+def _text_check(field):
+    def check(value, display_name):
         if not isinstance(value, str):
-            return False, f'字段"{field_display_name}"必须是文本类型'
-    
-    # DateField: 校验日期格式
-    elif field_type == 'DateField':
-        if not isinstance(value, (date, datetime)):
-            if isinstance(value, str):
+            return f'字段"{display_name}"必须是文本类型'
+    return check
+
+
+def _date_check(field):
+    def check(value, display_name):
+        if isinstance(value, str) and not isinstance(value, (date, datetime)):
+            text = value.strip()
+            for fmt in ('%Y-%m-%d', '%Y/%m/%d'):
                 try:
-                    datetime.strptime(value.strip(), '%Y-%m-%d')
-                except:
-                    try:
-                        datetime.strptime(value.strip(), '%Y/%m/%d')
-                    except:
-                        return False, f'字段"{field_display_name}"值"{value}"日期格式错误，支持的格式：YYYY-MM-DD 或 YYYY/MM/DD'
-    
-    # TimeField: 校验时间格式
-    elif field_type == 'TimeField':
-        if not isinstance(value, (time, datetime)):
-            if isinstance(value, str):
+                    datetime.strptime(text, fmt)
+                    return None
+                except ValueError:
+                    pass
+            return f'字段"{display_name}"值"{value}"日期格式错误，支持的格式：YYYY-MM-DD 或 YYYY/MM/DD'
+    return check
+
+
+def _time_check(field):
+    def check(value, display_name):
+        if isinstance(value, str):
+            text = value.strip()
+            for fmt in ('%H:%M', '%H:%M:%S'):
                 try:
-                    datetime.strptime(value.strip(), '%H:%M')
-                except:
-                    try:
-                        datetime.strptime(value.strip(), '%H:%M:%S')
-                    except:
-                        return False, f'字段"{field_display_name}"值"{value}"时间格式错误，支持的格式：HH:MM 或 HH:MM:SS'
-    
-    # FloatField: 校验浮点数
-    elif field_type in ['FloatField', 'NullableFloatField']:
+                    datetime.strptime(text, fmt)
+                    return None
+                except ValueError:
+                    pass
+            return f'字段"{display_name}"值"{value}"时间格式错误，支持的格式：HH:MM 或 HH:MM:SS'
+    return check
+
+
+def _float_check(field):
+    def check(value, display_name):
         try:
             float_val = float(value)
-            if abs(float_val) == float('inf') or float_val != float_val:  # 检查inf和NaN
-                return False, f'字段"{field_display_name}"值"{value}"不是有效的数字'
         except (ValueError, TypeError):
-            return False, f'字段"{field_display_name}"值"{value}"无法转换为数字类型'
-    
-    # DecimalField: 校验精度（max_digits和decimal_places）
-    elif field_type == 'DecimalField':
+            return f'字段"{display_name}"值"{value}"无法转换为数字类型'
+        if math.isinf(float_val) or math.isnan(float_val):
+            return f'字段"{display_name}"值"{value}"不是有效的数字'
+    return check
+
+
+def _decimal_check(field):
+    max_digits = field.max_digits
+    decimal_places_limit = field.decimal_places
+
+    def check(value, display_name):
         try:
-            # 先尝试转换为Decimal，保持精度
-            # 如果已经是字符串，直接转换为Decimal
             if isinstance(value, str):
-                # 去除前后空格
                 value_str = value.strip()
-                # 尝试转换为Decimal
                 try:
                     decimal_val = Decimal(value_str)
                 except (InvalidOperation, ValueError):
-                    # 如果直接转换失败，尝试先转换为float再转Decimal（兼容科学计数法等）
+                    # 直接转换失败时先转 float（兼容科学计数法等）
                     try:
                         decimal_val = Decimal(str(float(value_str)))
                     except (ValueError, TypeError):
-                        return False, f'字段"{field_display_name}"值"{value}"无法转换为数字'
-            elif isinstance(value, (int, float)):
-                # 如果是数字类型，转换为字符串再转Decimal，避免精度丢失
-                decimal_val = Decimal(str(value))
+                        return f'字段"{display_name}"值"{value}"无法转换为数字'
             else:
-                # 其他类型，尝试直接转换
+                # 数字先转字符串再转Decimal，避免精度丢失
                 decimal_val = Decimal(str(value))
-            
-            # 使用Decimal的as_tuple()方法获取精确的位数信息
-            # as_tuple()返回 (sign, digits, exponent)
-            # sign: 0表示正数，1表示负数
-            # digits: 数字元组，例如 (1, 0, 0, 2, 3) 表示 10023
-            # exponent: 指数，例如 -4 表示小数点后4位
+
+            # as_tuple() 返回 (sign, digits, exponent)，exponent 为负数时表示小数位数
             sign, digits, exponent = decimal_val.as_tuple()
-            
-            # 计算总位数（不包括小数点）
             total_digits = len(digits)
-            
-            # 计算小数位数
-            # 如果exponent是负数，表示有小数部分
-            if exponent < 0:
-                decimal_places = abs(exponent)
-            else:
-                decimal_places = 0
-            
-            max_digits = field.max_digits
-            decimal_places_limit = field.decimal_places
-            
+            decimal_places = abs(exponent) if exponent < 0 else 0
             if total_digits > max_digits:
-                return False, f'字段"{field_display_name}"值"{value}"总位数{total_digits}超过限制{max_digits}位'
+                return f'字段"{display_name}"值"{value}"总位数{total_digits}超过限制{max_digits}位'
             if decimal_places > decimal_places_limit:
-                return False, f'字段"{field_display_name}"值"{value}"小数位数{decimal_places}超过限制{decimal_places_limit}位'
+                return f'字段"{display_name}"值"{value}"小数位数{decimal_places}超过限制{decimal_places_limit}位'
         except (ValueError, TypeError, InvalidOperation) as e:
-            return False, f'字段"{field_display_name}"值"{value}"无法转换为数字: {str(e)}'
-    
-    # IntegerField: 校验整数
-    elif field_type == 'IntegerField':
+            return f'字段"{display_name}"值"{value}"无法转换为数字: {str(e)}'
+    return check
+
+
+def _integer_check(field):
+    def check(value, display_name):
         try:
             int(value)
         except (ValueError, TypeError):
-            return False, f'字段"{field_display_name}"值"{value}"无法转换为整数'
-    
-    # BooleanField: 校验布尔值
-    elif field_type == 'BooleanField':
-        if value not in [True, False, 1, 0, 'True', 'False', 'true', 'false', '1', '0']:
-            return False, f'字段"{field_display_name}"值"{value}"不是有效的布尔值'
-    
-    # ForeignKey: 校验外键（如果有choices或需要验证存在性）
-    elif field_type == 'ForeignKey':
-        # 这里可以添加外键存在性校验，但通常ForeignKey字段在创建时会自动处理
-        pass
+            return f'字段"{display_name}"值"{value}"无法转换为整数'
+    return check
+
+
+_BOOLEAN_VALUES = (True, False, 1, 0, 'True', 'False', 'true', 'false', '1', '0')
+
+
+def _boolean_check(field):
+    def check(value, display_name):
+        if value not in _BOOLEAN_VALUES:
+            return f'字段"{display_name}"值"{value}"不是有效的布尔值'
+    return check
+
+
+# 字段类型名 -> 校验函数生成器（按类型名精确匹配，未列出的类型只校验可选值）
+_TYPE_CHECKS = {
+    'CharField': _char_check,
+    'TextField': _text_check,
+    'DateField': _date_check,
+    'TimeField': _time_check,
+    'FloatField': _float_check,
+    'NullableFloatField': _float_check,
+    'DecimalField': _decimal_check,
+    'IntegerField': _integer_check,
+    'BooleanField': _boolean_check,
+}
+
+
+class FieldRule:
+    """单个字段编译后的校验规则"""
+
+    def __init__(self, field):
+        self.name = field.name
+        # 允许null/blank，或有默认值（Django会自动使用默认值）的字段允许为空
+        self.allow_empty = field.null or field.blank or field.default is not NOT_PROVIDED
+        make_check = _TYPE_CHECKS.get(type(field).__name__)
+        self.check = make_check(field) if make_check else None
+        if field.choices:
+            self.choices = tuple(choice[0] for choice in field.choices)
+            self.choices_text = ', '.join(str(choice[0]) for choice in field.choices)
+        else:
+            self.choices = None
+
+    def validate(self, value, display_name):
+        """返回错误信息，校验通过返回 None"""
+        if _is_empty(value):
+            return None if self.allow_empty else f'字段"{display_name}"不能为空'
+        if self.check is not None:
+            error = self.check(value, display_name)
+            if error:
+                return error
+        if self.choices is not None and value not in self.choices:
+            return f'字段"{display_name}"值"{value}"无效，必须是以下值之一：{self.choices_text}'
+        return None
+
+
+class ModelValidationSchema:
+    """
+    模型校验表：模型每个字段（按字段名和 attname 索引）一条编译好的规则
+    不存在的字段跳过校验；批量校验返回错误矩阵 {行号: {字段名: 错误信息}}，只包含有错误的行
+    """
+
+    def __init__(self, model_class):
+        self.model_class = model_class
+        self.rules = {}
+        # 字段中文名，可作为 display_names 传入
+        self.verbose_names = {}
+        for field in model_class._meta.get_fields():
+            if field.concrete:
+                rule = FieldRule(field)
+                self.rules[field.name] = rule
+                self.rules[field.attname] = rule
+                self.verbose_names[field.name] = str(field.verbose_name)
+
+    def validate(self, field_name, value, display_name=None):
+        """校验单个值，返回 (is_valid, error_message)"""
+        rule = self.rules.get(field_name)
+        if rule is None:
+            return True, None
+        error = rule.validate(value, display_name or field_name)
+        return error is None, error
+
+    def validate_row(self, row, display_names=None, skip=()):
+        """校验一行数据（字段名 -> 值），返回 {字段名: 错误信息}"""
+        display_names = display_names or {}
+        errors = {}
+        for field_name, value in row.items():
+            rule = self.rules.get(field_name)
+            if rule is None or field_name in skip:
+                continue
+            error = rule.validate(value, display_names.get(field_name, field_name))
+            if error:
+                errors[field_name] = error
+        return errors
+
+    def validate_rows(self, rows, display_names=None, skip=()):
+        """
+        整批校验多行数据，返回错误矩阵 {行号: {字段名: 错误信息}}，只包含有错误的行
+        rows 为 {行号: 行数据}（如Excel行号），或行数据序列（行号为序号）
+        """
+        items = rows.items() if hasattr(rows, 'items') else enumerate(rows)
+        matrix = {}
+        for row_number, row in items:
+            errors = self.validate_row(row, display_names, skip)
+            if errors:
+                matrix[row_number] = errors
+        return matrix
+
+
+_schemas = {}
+
+
+def get_validation_schema(model_class):
+    """获取模型的校验表（每个进程每个模型只编译一次）"""
+    schema = _schemas.get(model_class)
+    if schema is None:
+        schema = _schemas[model_class] = ModelValidationSchema(model_class)
+    return schema
+
+
+def validate_field_by_model(model_class, field_name, value, field_display_name=None):
+    """
+    根据Django模型字段定义校验字段值
     
-    # 校验choices（如果有）
-    if hasattr(field, 'choices') and field.choices:
-        valid_choices = [choice[0] for choice in field.choices]
-        if value not in valid_choices:
-            return False, f'字段"{field_display_name}"值"{value}"无效，必须是以下值之一：{", ".join(map(str, valid_choices))}'
+    Args:
+        model_class: Django模型类
+        field_name: 字段名
+        value: 要校验的值
+        field_display_name: 字段显示名称（用于错误提示）
     
-    return True, None
+    Returns:
+        tuple: (is_valid, error_message)
+    """
+    return get_validation_schema(model_class).validate(field_name, value, field_display_name)
@@ -1,6 +1,6 @@
 from django.shortcuts import render, redirect
 from django.views import View
-from django.http import HttpResponse, JsonResponse, HttpResponseForbidden
+from django.http import HttpResponse, JsonResponse, HttpResponseForbidden, StreamingHttpResponse
 from django.conf import settings
 from django.utils.decorators import method_decorator
 from django.contrib.auth import login
@@ -13,13 +13,11 @@ from django.core.paginator import Paginator
 from django.views.decorators.csrf import csrf_exempt
 import os
 import json
-from wechatpy.enterprise.client import WeChatClient
 from datetime import datetime, date, time, timedelta
 from dateutil.relativedelta import relativedelta
 from django.utils import timezone
 from decimal import Decimal, InvalidOperation
 from dotenv import load_dotenv
-from openpyxl import Workbook
 import logging
 import urllib.parse
 import hashlib
@@ -52,6 +50,19 @@ from home.utils.user_helpers import (
     get_user_info,
     is_admin_user,
 )
+from home.utils.eas_cache import (
+    ensure_eas_cache,
+    find_cached_document,
+    get_configured_targets,
+    invalidate_eas_cache,
+)
+from home.utils.autocomplete import suggest
+from home.utils.production_history import ProductionHistoryQuery, parse_page_params
+from core.middleware import get_client_profile
+from home.utils.raw_soil_query import (
+    MAX_PAGE_LIMIT, STREAM_FORMATS, RawSoilQueryResult, build_raw_soil_queryset,
+    stream_json, stream_ndjson,
+)
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 load_dotenv(os.path.join(BASE_DIR, '.env'))
@@ -169,8 +180,6 @@ class ProductionHistoryView(View):
             }
             return render(request, '403.html', context, status=403)
         
-        import requests
-
         logger = logging.getLogger(__name__)
         logger.info("进入 ProductionHistoryView.get 方法")
 
@@ -199,8 +208,7 @@ class ProductionHistoryView(View):
         logger.info(f"默认API查询日期范围: {biz_date_start} ~ {biz_date_end}")
 
         # 分页参数
-        page_size = int(request.GET.get('page_size', 10))  # 每页显示数量
-        page = int(request.GET.get('page', 1))  # 当前页码
+        page, page_size = parse_page_params(request.GET)  # 当前页码、每页显示数量
         logger.info(f"分页参数 page_size: {page_size}, page: {page}")
         
         # 搜索参数
@@ -233,340 +241,67 @@ class ProductionHistoryView(View):
         logger.info(f"有效搜索日期范围: {effective_start_date} ~ {effective_end_date}")
         logger.info(f"搜索参数 warehouse: {warehouse_filter}, start_date: {start_date_filter}, end_date: {end_date_filter}")
 
-        if is_special_user:
-            # 特殊用户：获取所有库存组织和仓库组合
-            try:
+        # 搜索相关上下文
+        context['warehouses'] = WarehouseMapping.objects.all()
+        context['selected_warehouse'] = warehouse_filter
+        context['start_date'] = start_date_filter
+        context['end_date'] = end_date_filter
+        
+        # 添加默认日期范围
+        context['default_start_date'] = date_prev.strftime("%Y-%m-%d")
+        context['default_end_date'] = next_month_1st.strftime("%Y-%m-%d")
+        
+        try:
+            if is_special_user:
+                # 特殊用户：获取所有库存组织和仓库组合
                 operation_objects = OperationObject.objects.select_related(
                     'inventory_org', 'warehouse'
                 ).all()
-                logger.info(f"特殊用户查询所有操作对象，共{operation_objects.count()}个")
-                
-                all_records = []
-                total_orgs = operation_objects.count()
-                
-                # 特殊用户：获取所有数据，不传递分页参数给外部API
-                for operation_object in operation_objects:
-                    org_code = operation_object.inventory_org.org_code
-                    warehouse_code = operation_object.warehouse.warehouse_code
-                    logger.info(f"查询组织: {org_code}, 仓库: {warehouse_code}")
-                    
-                    # 构造POST数据 - 不传递分页参数，获取所有数据
-                    post_data = {
-                        "orgNumber": org_code,
-                        "WarehouseNumber": warehouse_code,
-                        "pageNum": 1000,  # 设置一个很大的数，获取所有数据
-                        "page": 1,  # 固定为第1页
-                        "bizDateStart": biz_date_start,
-                        "bizDateEnd": biz_date_end
-                    }
-                    api_url = settings.EAS_API_HOST + settings.EAS_API_PATH_GET
-                    logger.info(f"POST到外部API: {api_url}, 数据: {post_data}")
-
-                    try:
-                        resp = requests.post(api_url, json=post_data, timeout=10)
-                        logger.info(f"外部API响应状态码: {resp.status_code}")
-                        resp.raise_for_status()
-                        data = resp.json()
-                        logger.info(f"API返回数据: {data}")
-                        
-                        # 兼容不同API返回结构
-                        records = data.get('data') or data.get('sysnList') or []
-                        
-                        # 转换字段用于模板渲染，兼容多种字段名
-                        # 渲染每条记录下的 entry 明细
-                        for rec in records:
-                            FBizDate = rec.get('FBizDate')
-                            storageOrgUnitName = rec.get('storageOrgUnitName')
-                            entry_list = rec.get('entry') or []
-                            for entry in entry_list:
-                                warehouse_name = entry.get('WarehouseName')
-                                material_name = entry.get('materialName')
-                                quantity = entry.get('FQty')
-                                cost_center = rec.get('costCenterOrgUnitName')
-                                batch_number = entry.get('FLot')
-                                material_number = entry.get('materialNumber')
-                                FNumber = rec.get('FNumber')
-                                logger.debug(
-                                    f"entry调试: WarehouseName={warehouse_name}, materialName={material_name}, FQty={quantity}, costCenterOrgUnitName={cost_center}, FLot={batch_number}, materialNumber={material_number}")
-                                all_records.append({
-                                    'warehouse_name': warehouse_name,
-                                    'FBizDate': FBizDate,
-                                    'storageOrgUnitName': storageOrgUnitName,
-                                    'material_name': material_name,
-                                    'quantity': quantity,
-                                    'cost_center': cost_center,
-                                    'batch_number': batch_number,
-                                    'materialNumber': material_number,
-                                    'FNumber': FNumber,
-                                    'org_code': org_code,  # 添加组织编码
-                                    'warehouse_code': warehouse_code,  # 添加仓库编码
-                                })
-                    except Exception as e:
-                        logger.error(f"特殊用户查询组织 {org_code} 仓库 {warehouse_code} 失败: {str(e)}", exc_info=True)
-                        # 继续查询其他组织，不中断整个流程
-                        continue
-                
-                # 应用搜索过滤
-                filtered_records = []
-                for record in all_records:
-                    # 仓库过滤
-                    if warehouse_filter and record.get('warehouse_code') != warehouse_filter:
-                        continue
-                    
-                    # 日期过滤 - 使用有效日期范围
-                    record_date = record.get('FBizDate', '')
-                    if record_date:
-                        try:
-                            record_date_obj = datetime.strptime(record_date[:10], '%Y-%m-%d').date()
-                            
-                            # 检查记录日期是否在有效范围内
-                            if record_date_obj < effective_start_date or record_date_obj > effective_end_date:
-                                continue
-                        except ValueError:
-                            # 日期格式错误，跳过过滤
-                            pass
-                    
-                    filtered_records.append(record)
-                
-                # 计算物料总重量
-                material_total_weight = {}
-                for record in filtered_records:
-                    material_name = record.get('material_name', '')
-                    quantity = record.get('quantity', 0)
-                    
-                    if material_name and quantity:
-                        try:
-                            quantity_float = float(quantity)
-                            if material_name in material_total_weight:
-                                material_total_weight[material_name] += quantity_float
-                            else:
-                                material_total_weight[material_name] = quantity_float
-                        except (ValueError, TypeError):
-                            # 数量格式错误，跳过
-                            pass
-                
-                # 计算分页信息
-                total_records = len(filtered_records)
-                total_pages = (total_records + page_size - 1) // page_size
-                start_index = (page - 1) * page_size
-                end_index = start_index + page_size
-                
-                # 分页切片
-                paginated_records = filtered_records[start_index:end_index]
-                
-                # 构建分页信息
-                pagination = {
-                    'current_page': page,
-                    'total_pages': total_pages,
-                    'total_records': total_records,
-                    'page_size': page_size,
-                    'has_previous': page > 1,
-                    'has_next': page < total_pages,
-                    'previous_page': page - 1 if page > 1 else None,
-                    'next_page': page + 1 if page < total_pages else None,
-                    'page_range': range(1, total_pages + 1)
-                }
-                
-                context['records'] = paginated_records
-                context['pagination'] = pagination
-                
-                # 添加搜索相关上下文
-                context['warehouses'] = WarehouseMapping.objects.all()
-                context['selected_warehouse'] = warehouse_filter
-                context['start_date'] = start_date_filter
-                context['end_date'] = end_date_filter
-                
-                # 添加默认日期范围
-                context['default_start_date'] = date_prev.strftime("%Y-%m-%d")
-                context['default_end_date'] = next_month_1st.strftime("%Y-%m-%d")
-                
-                # 添加物料总重量信息
-                context['material_total_weight'] = material_total_weight
-                
-                logger.info(f"特殊用户最终记录列表: {len(paginated_records)}条记录，总记录: {total_records}，总页数: {total_pages}")
-            except Exception as e:
-                logger.error(f"历史记录POST请求失败: {str(e)}", exc_info=True)
-                context['records'] = []
-                context['error'] = f'历史记录获取失败: {str(e)}'
-                context['pagination'] = None
-                
-                # 添加搜索相关上下文
-                context['warehouses'] = WarehouseMapping.objects.all()
-                context['selected_warehouse'] = warehouse_filter
-                context['start_date'] = start_date_filter
-                context['end_date'] = end_date_filter
-                
-                # 添加默认日期范围
-                context['default_start_date'] = date_prev.strftime("%Y-%m-%d")
-                context['default_end_date'] = next_month_1st.strftime("%Y-%m-%d")
-                
-                # 添加物料总重量信息（空字典）
-                context['material_total_weight'] = {}
+                targets = [
+                    (operation_object.inventory_org.org_code, operation_object.warehouse.warehouse_code)
+                    for operation_object in operation_objects
+                ]
+                logger.info(f"特殊用户查询所有操作对象，共{len(targets)}个")
+            else:
+                # 普通用户：使用自己的操作对象配置查询
+                operation_object = OperationObject.objects.get(user_id=request.user.username)
+                targets = [(operation_object.inventory_org.org_code, operation_object.warehouse.warehouse_code)]
+                logger.info(f"普通用户 {request.user.username} 查询组织: {targets[0][0]}, 仓库: {targets[0][1]}")
             
-            # 添加菜单数据（函数和常量都在本文件中定义）
-            context['menu_items'] = filter_menu_by_permission(MENU_ITEMS, request.user.username)
+            # 读穿本地缓存：只有过期的日期窗口才并发回源EAS，回源失败的仓库继续使用已有缓存
+            context['failed_warehouses'] = ensure_eas_cache(targets, date_prev, next_month_1st)
             
-            return render(request, 'production/history.html', context)
-        else:
-            # 普通用户：使用自己的操作对象配置查询
-            try:
-                # 获取用户的操作对象配置
-                operation_object = OperationObject.objects.get(user_id=request.user.username)
-                org_code = operation_object.inventory_org.org_code
-                warehouse_code = operation_object.warehouse.warehouse_code
-                logger.info(f"普通用户 {request.user.username} 查询组织: {org_code}, 仓库: {warehouse_code}")
-                
-                # 构造POST数据 - 获取所有数据，然后在本地进行过滤和分页
-                post_data = {
-                    "orgNumber": org_code,
-                    "WarehouseNumber": warehouse_code,
-                    "pageNum": 1000,  # 设置一个很大的数，获取所有数据
-                    "page": 1,  # 固定为第1页，获取所有数据
-                    "bizDateStart": biz_date_start,
-                    "bizDateEnd": biz_date_end
-                }
-                api_url = settings.EAS_API_HOST + settings.EAS_API_PATH_GET
-                logger.info(f"普通用户POST到外部API: {api_url}, 数据: {post_data}")
-                
-                resp = requests.post(api_url, json=post_data, timeout=10)
-                logger.info(f"外部API响应状态码: {resp.status_code}")
-                resp.raise_for_status()
-                data = resp.json()
-                logger.info(f"API返回数据: {data}")
-                
-                # 兼容不同API返回结构
-                records = data.get('data') or data.get('sysnList') or []
-                
-                # 转换字段用于模板渲染
-                all_records = []
-                for rec in records:
-                    FBizDate = rec.get('FBizDate')
-                    storageOrgUnitName = rec.get('storageOrgUnitName')
-                    entry_list = rec.get('entry') or []
-                    for entry in entry_list:
-                        warehouse_name = entry.get('WarehouseName')
-                        material_name = entry.get('materialName')
-                        quantity = entry.get('FQty')
-                        cost_center = rec.get('costCenterOrgUnitName')
-                        batch_number = entry.get('FLot')
-                        material_number = entry.get('materialNumber')
-                        FNumber = rec.get('FNumber')
-                        all_records.append({
-                            'warehouse_name': warehouse_name,
-                            'FBizDate': FBizDate,
-                            'storageOrgUnitName': storageOrgUnitName,
-                            'material_name': material_name,
-                            'quantity': quantity,
-                            'cost_center': cost_center,
-                            'batch_number': batch_number,
-                            'materialNumber': material_number,
-                            'FNumber': FNumber,
-                            'org_code': org_code,
-                            'warehouse_code': warehouse_code,
-                        })
-                
-                # 应用搜索过滤
-                filtered_records = []
-                for record in all_records:
-                    # 仓库过滤
-                    if warehouse_filter and record.get('warehouse_code') != warehouse_filter:
-                        continue
-                    
-                    # 日期过滤
-                    record_date = record.get('FBizDate', '')
-                    if record_date:
-                        try:
-                            record_date_obj = datetime.strptime(record_date[:10], '%Y-%m-%d').date()
-                            if record_date_obj < effective_start_date or record_date_obj > effective_end_date:
-                                continue
-                        except ValueError:
-                            pass
-                    
-                    filtered_records.append(record)
-                
-                # 计算物料总重量
-                material_total_weight = {}
-                for record in filtered_records:
-                    material_name = record.get('material_name', '')
-                    quantity = record.get('quantity', 0)
-                    if material_name and quantity:
-                        try:
-                            quantity_float = float(quantity)
-                            if material_name in material_total_weight:
-                                material_total_weight[material_name] += quantity_float
-                            else:
-                                material_total_weight[material_name] = quantity_float
-                        except (ValueError, TypeError):
-                            pass
-                
-                # 计算分页信息
-                total_records = len(filtered_records)
-                total_pages = (total_records + page_size - 1) // page_size
-                start_index = (page - 1) * page_size
-                end_index = start_index + page_size
-                
-                # 分页切片
-                paginated_records = filtered_records[start_index:end_index]
-                
-                # 构建分页信息
-                pagination = {
-                    'current_page': page,
-                    'total_pages': total_pages,
-                    'total_records': total_records,
-                    'page_size': page_size,
-                    'has_previous': page > 1,
-                    'has_next': page < total_pages,
-                    'previous_page': page - 1 if page > 1 else None,
-                    'next_page': page + 1 if page < total_pages else None,
-                    'page_range': range(1, total_pages + 1)
-                }
-                
-                context['records'] = paginated_records
-                context['pagination'] = pagination
-                
-                # 添加搜索相关上下文
-                context['warehouses'] = WarehouseMapping.objects.all()
-                context['selected_warehouse'] = warehouse_filter
-                context['start_date'] = start_date_filter
-                context['end_date'] = end_date_filter
-                
-                # 添加默认日期范围
-                context['default_start_date'] = date_prev.strftime("%Y-%m-%d")
-                context['default_end_date'] = next_month_1st.strftime("%Y-%m-%d")
-                
-                # 添加物料总重量信息
-                context['material_total_weight'] = material_total_weight
-                
-                logger.info(f"普通用户最终记录列表: {len(paginated_records)}条记录，总记录: {total_records}，总页数: {total_pages}")
-            except OperationObject.DoesNotExist:
-                logger.error(f"普通用户 {request.user.username} 未配置操作对象")
-                context['records'] = []
-                context['error'] = '您尚未配置操作对象，请联系管理员'
-                context['pagination'] = None
-                context['warehouses'] = WarehouseMapping.objects.all()
-                context['selected_warehouse'] = warehouse_filter
-                context['start_date'] = start_date_filter
-                context['end_date'] = end_date_filter
-                context['default_start_date'] = date_prev.strftime("%Y-%m-%d")
-                context['default_end_date'] = next_month_1st.strftime("%Y-%m-%d")
-                context['material_total_weight'] = {}
-            except Exception as e:
-                logger.error(f"普通用户历史记录获取失败: {str(e)}", exc_info=True)
-                context['records'] = []
-                context['error'] = f'历史记录获取失败: {str(e)}'
-                context['pagination'] = None
-                context['warehouses'] = WarehouseMapping.objects.all()
-                context['selected_warehouse'] = warehouse_filter
-                context['start_date'] = start_date_filter
-                context['end_date'] = end_date_filter
-                context['default_start_date'] = date_prev.strftime("%Y-%m-%d")
-                context['default_end_date'] = next_month_1st.strftime("%Y-%m-%d")
-                context['material_total_weight'] = {}
+            # 筛选、物料汇总和分页均在缓存表上通过索引查询完成，只取当前页数据
+            history_query = ProductionHistoryQuery(
+                targets, effective_start_date, effective_end_date, warehouse_code=warehouse_filter
+            )
+            material_total_weight, total_records = history_query.summarize()
+            paginated_records, pagination = history_query.page(page, page_size, total_records)
+            
+            context['records'] = paginated_records
+            context['pagination'] = pagination
             
-            # 添加菜单数据（函数和常量都在本文件中定义）
-            context['menu_items'] = filter_menu_by_permission(MENU_ITEMS, request.user.username)
+            # 添加物料总重量信息
+            context['material_total_weight'] = material_total_weight
             
-            return render(request, 'production/history.html', context)
+            logger.info(f"最终记录列表: {len(paginated_records)}条记录，总记录: {total_records}，总页数: {pagination['total_pages']}")
+        except OperationObject.DoesNotExist:
+            logger.error(f"普通用户 {request.user.username} 未配置操作对象")
+            context['records'] = []
+            context['error'] = '您尚未配置操作对象，请联系管理员'
+            context['pagination'] = None
+            context['material_total_weight'] = {}
+        except Exception as e:
+            logger.error(f"历史记录获取失败: {str(e)}", exc_info=True)
+            context['records'] = []
+            context['error'] = f'历史记录获取失败: {str(e)}'
+            context['pagination'] = None
+            context['material_total_weight'] = {}
+        
+        # 添加菜单数据（函数和常量都在本文件中定义）
+        context['menu_items'] = filter_menu_by_permission(MENU_ITEMS, request.user.username)
+        
+        return render(request, 'production/history.html', context)
 
 
 # 微信认证相关代码已移动到 home/views/wechat_auth.py
@@ -966,7 +701,13 @@ def _get_client_ip(request):
 
 @method_decorator(csrf_exempt, name='dispatch')
 class RawSoilStorageQueryAPI(View):
-    """外部系统查询原土入库数据，仅允许私网地址访问。POST body: {biz_start, biz_end, storage_org_code}"""
+    """
+    外部系统查询原土入库数据，仅允许私网地址访问。
+    POST body: {biz_start, biz_end, storage_org_code, stream, limit, cursor}
+    - stream: ndjson / json，流式输出，适合整年等大范围查询
+    - limit / cursor: 游标分页，响应中的 next_cursor 用于请求下一页，为 null 表示已到最后一页；
+      分页时 quantity_total 等合计只统计当前页
+    """
 
     def post(self, request):
         client_ip = _get_client_ip(request)
@@ -983,57 +724,52 @@ class RawSoilStorageQueryAPI(View):
         biz_start = (data.get('biz_start') or '').strip()
         biz_end = (data.get('biz_end') or '').strip()
         storage_org_code = (data.get('storage_org_code') or '').strip()
+        stream_format = (data.get('stream') or '').strip().lower()
+        cursor = (data.get('cursor') or '').strip()
 
-        from django.db.models import Sum
-
-        qs = RawSoilStorage.objects.all().order_by('-biz_date', '-created_at')
-
+        start_date = end_date = None
         if biz_start:
             try:
                 start_date = datetime.strptime(biz_start, '%Y-%m-%d').date()
-                qs = qs.filter(biz_date__gte=start_date)
             except ValueError:
                 return JsonResponse({'success': False, 'message': 'biz_start 格式错误，应为 YYYY-MM-DD'}, status=400)
         if biz_end:
             try:
                 end_date = datetime.strptime(biz_end, '%Y-%m-%d').date()
-                qs = qs.filter(biz_date__lte=end_date)
             except ValueError:
                 return JsonResponse({'success': False, 'message': 'biz_end 格式错误，应为 YYYY-MM-DD'}, status=400)
-        if storage_org_code:
-            qs = qs.filter(storage_org_code=storage_org_code)
-
-        records = list(qs.values(
-            'fnumber', 'biz_date', 'material_code', 'material_name',
-            'quantity', 'actual_quantity', 'lot', 'remark',
-            'cost_center_code', 'storage_org_code', 'warehouse_code', 'cost_object_code',
-            'rate', 'created_by', 'created_at', 'updated_at'
-        ))
-        for r in records:
-            r['biz_date'] = r['biz_date'].strftime('%Y-%m-%d') if r.get('biz_date') else None
-            r['created_at'] = r['created_at'].isoformat() if r.get('created_at') else None
-            r['updated_at'] = r['updated_at'].isoformat() if r.get('updated_at') else None
-            if r.get('quantity') is not None:
-                r['quantity'] = float(r['quantity'])
-            if r.get('actual_quantity') is not None:
-                r['actual_quantity'] = float(r['actual_quantity'])
-            if r.get('rate') is not None:
-                r['rate'] = float(r['rate'])
-
-        agg = qs.aggregate(
-            quantity_total=Sum('quantity'),
-            actual_quantity_total=Sum('actual_quantity')
-        )
-        quantity_total = float(agg['quantity_total'] or 0)
-        actual_quantity_total = float(agg['actual_quantity_total'] or 0)
+        if stream_format and stream_format not in STREAM_FORMATS:
+            return JsonResponse({'success': False, 'message': 'stream 仅支持 ndjson 或 json'}, status=400)
 
-        return JsonResponse({
-            'success': True,
-            'data': records,
-            'quantity_total': quantity_total,
-            'actual_quantity_total': actual_quantity_total,
-            'count': len(records),
-        })
+        # 传入 limit 或 cursor 时按游标分页
+        limit = None
+        if data.get('limit') not in (None, '') or cursor:
+            try:
+                limit = int(data.get('limit') or MAX_PAGE_LIMIT)
+            except (TypeError, ValueError):
+                return JsonResponse({'success': False, 'message': 'limit 必须为整数'}, status=400)
+            if limit < 1:
+                return JsonResponse({'success': False, 'message': 'limit 必须大于0'}, status=400)
+            limit = min(limit, MAX_PAGE_LIMIT)
+
+        try:
+            qs = build_raw_soil_queryset(start_date, end_date, storage_org_code, cursor=cursor or None)
+        except ValueError as e:
+            return JsonResponse({'success': False, 'message': str(e)}, status=400)
+
+        result = RawSoilQueryResult(qs, limit=limit)
+
+        if stream_format:
+            if stream_format == 'ndjson':
+                response = StreamingHttpResponse(stream_ndjson(result), content_type='application/x-ndjson; charset=utf-8')
+            else:
+                response = StreamingHttpResponse(stream_json(result), content_type='application/json; charset=utf-8')
+            # 关闭 nginx 代理缓冲，数据生成后立即发送
+            response['X-Accel-Buffering'] = 'no'
+            return response
+
+        records = list(result.rows())
+        return JsonResponse({'success': True, 'data': records, **result.summary()})
 
 
 # ==================== QC报表通用基类和工具函数 ====================
@@ -1066,6 +802,7 @@ class RawSoilStorageView(View):
             # 仅当 EAS 返回 code=0 时同步删除本地库
             if code_val in (0, '0') or '删除成功' in msg:
                 if code_val in (0, '0'):
+                    invalidate_eas_cache(fnumber=fnumber)
                     try:
                         deleted, _ = RawSoilStorage.objects.filter(fnumber=str(fnumber)).delete()
                         if deleted:
@@ -1086,17 +823,15 @@ class RawSoilStorageView(View):
         
         # 添加移动端调试日志
         logger = logging.getLogger(__name__)
-        user_agent = request.META.get('HTTP_USER_AGENT', '').lower()
-        is_mobile = 'mobile' in user_agent or 'android' in user_agent or 'iphone' in user_agent
-        is_wechat = 'micromessenger' in user_agent or 'wxwork' in user_agent
+        client_profile = get_client_profile(request)
         
         logger.info(f"=== 原土入库访问调试 ===")
         logger.info(f"用户: {request.user.username}")
         logger.info(f"用户认证状态: {request.user.is_authenticated}")
         logger.info(f"会话ID: {request.session.session_key}")
-        logger.info(f"User-Agent: {user_agent[:100]}...")
-        logger.info(f"是否移动端: {is_mobile}")
-        logger.info(f"是否企业微信: {is_wechat}")
+        logger.info(f"客户端类型: {client_profile.kind}")
+        logger.info(f"是否移动端: {client_profile.is_mobile}")
+        logger.info(f"是否企业微信: {client_profile.is_wechat}")
         
         if not user_has_permission(request.user, 'raw_soil_storage_view'):
             logger.warning(f"用户 {request.user.username} 没有原土入库查看权限")
@@ -1126,7 +861,23 @@ class RawSoilStorageView(View):
             
             record = None
             
-            if is_special_user:
+            # 优先从EAS单据本地缓存查找，未命中时再回源EAS
+            try:
+                if is_special_user:
+                    cache_targets = get_configured_targets()
+                else:
+                    user_object = OperationObject.objects.get(user_id=request.user.username)
+                    cache_targets = [(user_object.inventory_org.org_code, user_object.warehouse.warehouse_code)]
+                cached_item = find_cached_document(fnumber, cache_targets)
+                if cached_item:
+                    logger.info(f"从本地缓存找到单据: {fnumber}")
+                    record = self._process_record_item(cached_item, request)
+            except OperationObject.DoesNotExist:
+                pass
+            
+            if record:
+                pass
+            elif is_special_user:
                 # 特殊用户：遍历所有库存组织+仓库组合查找目标单据
                 
                 logger.info(f"特殊用户 {request.user.username} 查找单据: {fnumber}")
@@ -1363,6 +1114,11 @@ class RawSoilStorageView(View):
                     fnumber = None
 
                 if fnumber:
+                    invalidate_eas_cache(
+                        org_code=operation_object.inventory_org.org_code,
+                        warehouse_code=operation_object.warehouse.warehouse_code,
+                        biz_date=data.get('bizDate'),
+                    )
                     try:
                         material_name = ''
                         try:
@@ -1635,6 +1391,12 @@ class RawSoilStorageView(View):
             # 仅当 EAS 返回 code=0 时同步更新本地库
             code_val = resp_json.get('code')
             if code_val in (0, '0'):
+                invalidate_eas_cache(
+                    fnumber=fnumber,
+                    org_code=data.get('storageOrgUnit', ''),
+                    warehouse_code=data.get('warehouseNumber', ''),
+                    biz_date=actual_date,
+                )
                 try:
                     material_name = ''
                     try:
@@ -1695,8 +1457,7 @@ class IndexView(View):
             return redirect('home')
 
         # 检测是否在企业微信内
-        user_agent = request.META.get('HTTP_USER_AGENT', '').lower()
-        is_wechat_work = 'wxwork' in user_agent or ('micromessenger' in user_agent and 'wxwork' in user_agent)
+        is_wechat_work = get_client_profile(request).is_wxwork
         
         # 如果在企业微信内且未登录，自动跳转到登录（会自动使用OAuth2授权）
         if is_wechat_work:
@@ -1722,10 +1483,7 @@ class HomeView(View):
         logger.info(f'Session key: {request.session.session_key}')
 
         # 检测是否为移动设备
-        is_mobile = False
-        user_agent = request.META.get('HTTP_USER_AGENT', '').lower()
-        if 'mobile' in user_agent or 'android' in user_agent or 'iphone' in user_agent:
-            is_mobile = True
+        is_mobile = get_client_profile(request).is_mobile
 
         # 根据用户权限过滤菜单
         filtered_menu_items = filter_menu_by_permission(MENU_ITEMS, request.user.username)
@@ -4563,15 +4321,8 @@ def product_model_suggest(request):
         if not query:
             return JsonResponse({'status': 'success', 'data': []})
         
-        # 搜索产品型号名称
-        product_models = ProductModel.objects.filter(
-            name__icontains=query
-        ).order_by('name')[:10]  # 限制返回10个结果
-        
-        suggestions = [{
-            'id': model.id,
-            'name': model.name
-        } for model in product_models]
+        # 从内存索引查询（前缀、包含、拼音首字母匹配，按近期QC报表使用次数排序），限制返回10个结果
+        suggestions = suggest('product_model', query, limit=10)
         
         return JsonResponse({'status': 'success', 'data': suggestions})
     except Exception as e:
@@ -4590,15 +4341,8 @@ def packaging_suggest(request):
         if not query:
             return JsonResponse({'status': 'success', 'data': []})
         
-        # 搜索包装类型名称
-        packagings = Packaging.objects.filter(
-            name__icontains=query
-        ).order_by('name')[:10]  # 限制返回10个结果
-        
-        suggestions = [{
-            'id': packaging.id,
-            'name': packaging.name
-        } for packaging in packagings]
+        # 从内存索引查询（前缀、包含、拼音首字母匹配，按近期QC报表使用次数排序），限制返回10个结果
+        suggestions = suggest('packaging', query, limit=10)
         
         return JsonResponse({'status': 'success', 'data': suggestions})
     except Exception as e:
@@ -5717,10 +5461,11 @@ def user_info_api(request):
         }, status=401)
 
 def operation_log_api(request):
-    """操作日志API接口"""
+    """操作日志API接口（热表未覆盖查询日期范围时同时查询归档表）"""
+    from datetime import timezone as dt_timezone
     from django.http import JsonResponse
-    from django.core.paginator import Paginator
-    from .models import UserOperationLog
+    from home.utils.log_archive import OperationLogQuery
+    from home.utils.user_helpers import resolve_usernames
     
     # 检查用户权限
     if not user_has_permission(request.user, "qc_report_edit"):
@@ -5736,39 +5481,36 @@ def operation_log_api(request):
         page = int(request.GET.get("page", 1))
         page_size = int(request.GET.get("page_size", 50))
         
-        # 构建查询
-        queryset = UserOperationLog.objects.all()
+        # 构建查询条件（热表和归档表共用）
+        filters = Q()
         
         if username:
-            queryset = queryset.filter(username__icontains=username)
+            # 先在用户表中按用户名/显示名解析出用户名，再用 username__in 走 (username, created_at) 索引
+            filters &= Q(username__in=resolve_usernames(username))
         
         if operation_type:
-            queryset = queryset.filter(operation_type=operation_type)
+            filters &= Q(operation_type=operation_type)
         
         if report_type:
-            queryset = queryset.filter(report_type=report_type)
+            filters &= Q(report_type=report_type)
         
+        start_datetime = None
         if start_date:
             # 使用UTC时间进行查询，避免时区转换问题
-            from django.utils import timezone
-            import datetime
-            start_datetime = datetime.datetime.strptime(start_date, '%Y-%m-%d').replace(tzinfo=timezone.utc)
-            queryset = queryset.filter(created_at__gte=start_datetime)
+            start_datetime = datetime.strptime(start_date, '%Y-%m-%d').replace(tzinfo=dt_timezone.utc)
+            filters &= Q(created_at__gte=start_datetime)
         
         if end_date:
             # 使用UTC时间进行查询，避免时区转换问题
-            from django.utils import timezone
-            import datetime
-            end_datetime = datetime.datetime.strptime(end_date, '%Y-%m-%d').replace(tzinfo=timezone.utc) + datetime.timedelta(days=1)
-            queryset = queryset.filter(created_at__lt=end_datetime)
+            end_datetime = datetime.strptime(end_date, '%Y-%m-%d').replace(tzinfo=dt_timezone.utc) + timedelta(days=1)
+            filters &= Q(created_at__lt=end_datetime)
         
         # 分页
-        paginator = Paginator(queryset, page_size)
-        logs_page = paginator.page(page)
+        logs_page, pagination = OperationLogQuery(filters, start_datetime).page(page, page_size)
         
         # 序列化数据
         logs_data = []
-        for log in logs_page:
+        for log, archived in logs_page:
             logs_data.append({
                 "id": log.id,
                 "username": log.username,
@@ -5784,19 +5526,14 @@ def operation_log_api(request):
                 "created_at": log.created_at.astimezone(timezone.get_current_timezone()).strftime("%Y-%m-%d %H:%M:%S"),
                 "old_data": log.old_data,
                 "new_data": log.new_data,
+                "archived": archived,
             })
         
         return JsonResponse({
             "status": "success",
             "data": {
                 "logs": logs_data,
-                "pagination": {
-                    "current_page": page,
-                    "total_pages": paginator.num_pages,
-                    "total_count": paginator.count,
-                    "has_previous": logs_page.has_previous(),
-                    "has_next": logs_page.has_next(),
-                }
+                "pagination": pagination
             }
         })
         
@@ -5826,14 +5563,7 @@ def log_view_operation_api(request):
         request_path = data.get('request_path', request.path)
         debug_info = data.get('debug_info', {})
         
-        # 记录详细的调试信息到Django日志
-        logger = logging.getLogger('user_operations')
-        logger.info(f"查看操作日志 - 用户: {request.user.username}, 报表类型: {report_type}, 客户端: {debug_info.get('clientInfo', {}).get('isWxWorkPC', False)}")
-        
-        if debug_info:
-            logger.info(f"调试信息: {json.dumps(debug_info, ensure_ascii=False, indent=2)}")
-        
-        # 记录操作日志
+        # 记录操作日志（缓冲写库，同时输出一条结构化日志）
         log_entry = UserOperationLog.log_operation(
             request=request,
             operation_type=operation_type,
@@ -5841,57 +5571,16 @@ def log_view_operation_api(request):
             operation_detail=operation_detail
         )
         
-        # 如果日志记录成功，记录更多调试信息
-        if log_entry:
-            logger.info(f"操作日志记录成功 - ID: {log_entry.id}")
-            
-            # 记录客户端环境信息
-            client_info = debug_info.get('clientInfo', {})
-            if client_info:
-                logger.info(f"客户端环境: 企业微信={client_info.get('isWxWork', False)}, PC端={client_info.get('isWxWorkPC', False)}, 移动端={client_info.get('isMobile', False)}")
-                logger.info(f"用户代理: {client_info.get('userAgent', '未知')}")
-                logger.info(f"平台: {client_info.get('platform', '未知')}")
-                logger.info(f"屏幕分辨率: {client_info.get('screenWidth', '未知')}x{client_info.get('screenHeight', '未知')}")
-            
-            # 记录页面状态信息
-            page_state = debug_info.get('pageState', {})
-            if page_state:
-                logger.info(f"页面路径: {page_state.get('currentPath', '未知')}")
-                logger.info(f"页面标题: {page_state.get('title', '未知')}")
-                logger.info(f"访问时间: {page_state.get('timestamp', '未知')}")
-            
-            # 记录会话信息
-            session_info = debug_info.get('sessionInfo', {})
-            if session_info:
-                logger.info(f"CSRF令牌: {session_info.get('hasCsrfToken', False)}")
-                logger.info(f"会话Cookie: {session_info.get('hasSessionCookie', False)}")
-                logger.info(f"Cookie长度: {session_info.get('sessionCookieLength', 0)}")
-            
-            # 记录页面元素状态
-            element_state = debug_info.get('elementState', {})
-            if element_state:
-                logger.info(f"过滤表单: {element_state.get('hasFilterForm', False)}")
-                logger.info(f"数据容器: {element_state.get('hasDataContainer', False)}")
-                
-                # 记录过滤表单元素详情
-                filter_elements = element_state.get('filterFormElements', [])
-                if filter_elements:
-                    logger.info(f"过滤表单元素数量: {len(filter_elements)}")
-                    for elem in filter_elements:
-                        logger.info(f"  元素: {elem.get('name', '未知')} ({elem.get('type', '未知')}) = {elem.get('value', '空')}")
-            
-            # 记录错误信息（如果有）
-            if 'error' in debug_info:
-                logger.warning(f"操作过程中出现错误: {debug_info.get('error', '未知错误')}")
-                if 'errorDetail' in debug_info:
-                    logger.warning(f"错误详情: {debug_info.get('errorDetail', '')}")
-                if 'errorStack' in debug_info:
-                    logger.warning(f"错误堆栈: {debug_info.get('errorStack', '')}")
+        # 前端上报的调试信息只在DEBUG级别单行输出
+        if debug_info:
+            logger = logging.getLogger('user_operations')
+            logger.debug(f"查看操作调试信息 用户: {request.user.username}, "
+                         f"{json.dumps(debug_info, ensure_ascii=False, separators=(',', ':'))}")
         
         return JsonResponse({
             "status": "success", 
             "message": "操作日志记录成功",
-            "log_id": log_entry.id if log_entry else None,
+            "log_id": log_entry.id if log_entry else None,  # 缓冲写入时为 None
             "debug_info_received": bool(debug_info)
         })
         
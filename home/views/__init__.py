@@ -77,6 +77,10 @@ export_changfu_today_production = _qc_reports_module.export_changfu_today_produc
 export_xinghui2_report_excel = _qc_reports_module.export_xinghui2_report_excel
 export_xinghui2_yesterday_production = _qc_reports_module.export_xinghui2_yesterday_production
 export_xinghui2_today_production = _qc_reports_module.export_xinghui2_today_production
+qc_search_api = _qc_reports_module.qc_search_api
+batch_trace_api = _qc_reports_module.batch_trace_api
+qc_spc_api = _qc_reports_module.qc_spc_api
+qc_trend_api = _qc_reports_module.qc_trend_api
 
 # 导入微信认证相关的类和函数
 from .wechat_auth import (
@@ -201,6 +205,8 @@ __all__ = [
     'export_xinghui_report_excel', 'export_xinghui_yesterday_production', 'export_xinghui_today_production',
     'export_changfu_report_excel', 'export_changfu_yesterday_production', 'export_changfu_today_production',
     'export_xinghui2_report_excel', 'export_xinghui2_yesterday_production', 'export_xinghui2_today_production',
+    # 跨厂区QC报表查询、批号追溯、SPC、趋势
+    'qc_search_api', 'batch_trace_api', 'qc_spc_api', 'qc_trend_api',
     # 微信认证
     'WeChatUserListAPI',
     'WeChatCallbackView',
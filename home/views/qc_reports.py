@@ -9,7 +9,6 @@ from django.views import View
 from django.http import HttpResponse, JsonResponse, HttpResponseForbidden
 from django.utils.decorators import method_decorator
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
 from django.core.paginator import Paginator
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
@@ -28,6 +27,14 @@ from home.config import (
 )
 
 # 导入工具函数
+from home.utils.qc_profiles import get_profile_for_model, get_profiles
+from home.utils.qc_data_version import conditional_qc_response, qc_data_conditional
+from home.utils.qc_fieldsets import QCFieldset, parse_fields, to_columnar
+from home.utils.production_stats import XINGHUI_GROUP_FIELDS, get_production_groups
+from home.utils.qc_search import DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT, search_qc_reports
+from home.utils.batch_trace import trace_batch
+from home.utils.qc_trend import DEFAULT_POINTS as TREND_DEFAULT_POINTS, TrendError, get_trend
+from home.utils.spc import DEFAULT_SUBGROUP_SIZE as SPC_DEFAULT_SUBGROUP_SIZE, DEFAULT_WINDOW as SPC_DEFAULT_WINDOW, SPCError, get_spc
 from home.utils.excel_export import (
     export_production_excel,
     export_qc_report_excel,
@@ -42,7 +49,7 @@ from home.utils.user_helpers import (
     get_user_info,
 )
 from home.utils.validators import (
-    validate_field_by_model,
+    get_validation_schema,
 )
 
 # 导入模型
@@ -75,8 +82,6 @@ class BaseQCReportAPI(View):
     
     def get(self, request, report_id=None):
         """获取报表数据"""
-        logger = logging.getLogger(__name__)
-        
         # 检查用户是否有QC报表查看权限
         if not user_has_permission(request.user, 'qc_report_view'):
             # 渲染美观的403错误页面
@@ -88,6 +93,16 @@ class BaseQCReportAPI(View):
             }
             return render(request, '403.html', context, status=403)
         
+        # 报表数据未变化时直接返回304，不查询报表表
+        report_type = self._get_report_type()
+        if report_type:
+            return conditional_qc_response(request, report_type, lambda: self._get_response(request, report_id))
+        return self._get_response(request, report_id)
+
+    def _get_response(self, request, report_id=None):
+        """生成报表数据或产量统计响应"""
+        logger = logging.getLogger(__name__)
+        
         try:
             # 检查是否是昨日产量统计请求
             if request.GET.get('action') == 'yesterday_production':
@@ -108,13 +123,31 @@ class BaseQCReportAPI(View):
                 reports_query = self.model_class.objects.all().order_by('-date', '-time')
                 reports_query = self._apply_filters(reports_query, request)
                 
+                # ?fields= 指定字段时只查询和输出这些字段
+                fields = parse_fields(request.GET.get('fields'))
+                fieldset = QCFieldset(self.model_class, fields) if fields else None
+                if fieldset:
+                    reports_query = fieldset.apply(reports_query)
+                
                 # 分页处理
                 page_number = request.GET.get('page', 1)
                 page_size = request.GET.get('page_size', 10)
                 paginator = Paginator(reports_query, page_size)
                 page_obj = paginator.get_page(page_number)
                 
-                data = [self._serialize_report(report, request.user) for report in page_obj.object_list]
+                if fieldset:
+                    permission_getters = {
+                        'can_edit': lambda report: self._check_edit_permission(report, request.user),
+                        'can_delete': lambda report: self._check_delete_permission(report, request.user),
+                        'permission_reason': lambda report: self._get_permission_reason(report, request.user),
+                    }
+                    data = [fieldset.serialize(report, permission_getters) for report in page_obj.object_list]
+                else:
+                    data = [self._serialize_report(report, request.user) for report in page_obj.object_list]
+                
+                # ?format=columnar 时以列式格式返回，不重复每行的字段名
+                if request.GET.get('format') == 'columnar':
+                    data = to_columnar(data, fieldset.columns if fieldset else None)
                 
                 return JsonResponse({
                     'status': 'success',
@@ -145,10 +178,15 @@ class BaseQCReportAPI(View):
         try:
             data = json.loads(request.body)
             data = self._process_input_data(data, request)
+            validation_response = self._validate_input_data(data)
+            if validation_response:
+                return validation_response
             report = self.model_class.objects.create(**data)
             
             # 记录操作日志
             self._log_operation(request, 'CREATE', report, data)
+            # 指标超出规格限或偏离近期均值过大时在响应中标记，并异步发送企业微信告警
+            alerts = self._check_qc_alerts(report)
             return JsonResponse({
                 'status': 'success',
                 'message': '创建成功',
@@ -157,7 +195,8 @@ class BaseQCReportAPI(View):
                     'date': report.date.strftime('%Y-%m-%d'),
                     'time': report.time.strftime('%H:%M'),
                     'username': report.username
-                }
+                },
+                'alerts': alerts
             })
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
@@ -182,6 +221,9 @@ class BaseQCReportAPI(View):
             report = self.model_class.objects.get(id=report_id)
             data = json.loads(request.body)
             data = self._process_input_data(data, request)
+            validation_response = self._validate_input_data(data)
+            if validation_response:
+                return validation_response
             
             # 更新报表
             for key, value in data.items():
@@ -453,6 +495,18 @@ class BaseQCReportAPI(View):
 
         return data
 
+    def _validate_input_data(self, data):
+        """按模型校验表校验提交的数据（与Excel导入规则相同），有错误时返回400响应"""
+        schema = get_validation_schema(self.model_class)
+        errors = schema.validate_row(data, schema.verbose_names, skip=('user', 'username'))
+        if errors:
+            return JsonResponse({
+                'status': 'error',
+                'message': '; '.join(errors.values()),
+                'errors': errors,
+            }, status=400)
+        return None
+
     def calculate_yesterday_production(self, request):
         """统计昨日产量 - 按班组、产品型号、包装类型、批号、备注分组统计吨数"""
         from datetime import date, timedelta
@@ -461,52 +515,9 @@ class BaseQCReportAPI(View):
             # 获取昨天的日期
             yesterday = date.today() - timedelta(days=1)
             
-            # 查询昨日的数据，先获取原始数据，然后进行智能累加
-            raw_reports = self.model_class.objects.filter(
-                date=yesterday,
-                tons__isnull=False  # 确保吨数不为空
-            ).values(
-                'shift',  # 班组
-                'product_name',  # 产品型号
-                'packaging',  # 包装类型
-                'batch_number',  # 批号
-                'remarks',  # 备注
-                'tons'  # 产量
-            ).order_by('shift', 'product_name', 'packaging', 'batch_number', 'remarks')
-            
-            # 按5个字段分组累加产量（与Excel导出逻辑保持一致）
-            grouped_production = {}
-            for report in raw_reports:
-                # 创建分组键
-                group_key = (
-                    report['shift'] or '未设置',
-                    report['product_name'] or '未设置',
-                    report['packaging'] or '未设置',
-                    report['batch_number'] or '未设置',
-                    report['remarks'] or '未设置'
-                )
-                
-                if group_key not in grouped_production:
-                    grouped_production[group_key] = {
-                        'shift': group_key[0],
-                        'product_name': group_key[1],
-                        'packaging': group_key[2],
-                        'batch_number': group_key[3],
-                        'remarks': group_key[4],
-                        'total_tons': 0,
-                        'count': 0
-                    }
-                
-                # 累加产量
-                try:
-                    if report['tons'] is not None:
-                        grouped_production[group_key]['total_tons'] += float(report['tons'])
-                        grouped_production[group_key]['count'] += 1
-                except (ValueError, TypeError):
-                    continue
-            
-            # 转换为列表格式
-            production_stats = list(grouped_production.values())
+            # 分组统计结果按数据版本缓存，与产量统计Excel导出共用；只保留有吨数的分组
+            production = get_production_groups(self.model_class, yesterday)
+            production_stats = [stat for stat in production['groups'] if stat['count']]
             
             # 格式化数据
             result_data = []
@@ -542,52 +553,9 @@ class BaseQCReportAPI(View):
             # 获取今天的日期
             today = date.today()
             
-            # 查询今日的数据，先获取原始数据，然后进行智能累加
-            raw_reports = self.model_class.objects.filter(
-                date=today,
-                tons__isnull=False  # 确保吨数不为空
-            ).values(
-                'shift',  # 班组
-                'product_name',  # 产品型号
-                'packaging',  # 包装类型
-                'batch_number',  # 批号
-                'remarks',  # 备注
-                'tons'  # 产量
-            ).order_by('shift', 'product_name', 'packaging', 'batch_number', 'remarks')
-            
-            # 按5个字段分组累加产量（与Excel导出逻辑保持一致）
-            grouped_production = {}
-            for report in raw_reports:
-                # 创建分组键
-                group_key = (
-                    report['shift'] or '未设置',
-                    report['product_name'] or '未设置',
-                    report['packaging'] or '未设置',
-                    report['batch_number'] or '未设置',
-                    report['remarks'] or '未设置'
-                )
-                
-                if group_key not in grouped_production:
-                    grouped_production[group_key] = {
-                        'shift': group_key[0],
-                        'product_name': group_key[1],
-                        'packaging': group_key[2],
-                        'batch_number': group_key[3],
-                        'remarks': group_key[4],
-                        'total_tons': 0,
-                        'count': 0
-                    }
-                
-                # 累加产量
-                try:
-                    if report['tons'] is not None:
-                        grouped_production[group_key]['total_tons'] += float(report['tons'])
-                        grouped_production[group_key]['count'] += 1
-                except (ValueError, TypeError):
-                    continue
-            
-            # 转换为列表格式
-            production_stats = list(grouped_production.values())
+            # 分组统计结果按数据版本缓存，与产量统计Excel导出共用；只保留有吨数的分组
+            production = get_production_groups(self.model_class, today)
+            production_stats = [stat for stat in production['groups'] if stat['count']]
             
             # 格式化数据
             result_data = []
@@ -640,7 +608,7 @@ class BaseQCReportAPI(View):
                 serialized_data = self._serialize_for_log(report)
             
             # 记录操作日志
-            log_entry = UserOperationLog.log_operation(
+            UserOperationLog.log_operation(
                 request=request,
                 operation_type=operation_type,
                 report_type=report_type,
@@ -648,47 +616,6 @@ class BaseQCReportAPI(View):
                 operation_detail=f'{operation_type} {self.report_name}，日期: {report.date}，班次: {report.shift}',
                 new_data=serialized_data
             )
-            
-            # 如果日志记录成功，记录更多调试信息
-            if log_entry:
-                logger = logging.getLogger('user_operations')
-                logger.info(f"操作日志记录成功 - ID: {log_entry.id}")
-                
-                # 记录客户端环境信息
-                client_info = request.META.get('HTTP_USER_AGENT', '未知')
-                logger.info(f"客户端环境: {client_info}")
-                
-                # 记录页面状态信息
-                page_state = {
-                    'currentPath': request.path,
-                    'title': '未知',
-                    'timestamp': timezone.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
-                logger.info(f"页面状态: {json.dumps(page_state, ensure_ascii=False, indent=2)}")
-                
-                # 记录会话信息
-                session_info = {
-                    'hasCsrfToken': 'csrftoken' in request.COOKIES,
-                    'hasSessionCookie': 'sessionid' in request.COOKIES,
-                    'sessionCookieLength': len(request.COOKIES.get('sessionid', ''))
-                }
-                logger.info(f"会话信息: {json.dumps(session_info, ensure_ascii=False, indent=2)}")
-                
-                # 记录页面元素状态
-                element_state = {
-                    'hasFilterForm': False,
-                    'hasDataContainer': False,
-                    'filterFormElements': []
-                }
-                logger.info(f"页面元素状态: {json.dumps(element_state, ensure_ascii=False, indent=2)}")
-                
-                # 记录错误信息（如果有）
-                if 'error' in request.GET:
-                    logger.warning(f"操作过程中出现错误: {request.GET.get('error', '未知错误')}")
-                    if 'errorDetail' in request.GET:
-                        logger.warning(f"错误详情: {request.GET.get('errorDetail', '')}")
-                    if 'errorStack' in request.GET:
-                        logger.warning(f"错误堆栈: {request.GET.get('errorStack', '')}")
         
         except Exception as e:
             # 如果日志记录失败，记录到Django日志
@@ -697,37 +624,29 @@ class BaseQCReportAPI(View):
 
     def _get_report_type(self):
         """获取报表类型标识"""
-        report_name = getattr(self, 'report_name', '')
-        if '东泰' in report_name: return 'dongtai'
-        elif '远通' in report_name and '二线' not in report_name: return 'yuantong'
-        elif '远通二线' in report_name or '远通2号' in report_name: return 'yuantong2'
-        elif '大塬' in report_name: return 'dayuan'
-        elif '长富' in report_name: return 'changfu'
-        elif '兴辉' in report_name and '二线' not in report_name: return 'xinghui'
-        elif '兴辉二线' in report_name or '兴辉2号' in report_name: return 'xinghui2'
-        else: return None
+        profile = get_profile_for_model(self.model_class) if self.model_class else None
+        return profile.report_type if profile else None
+
+    def _check_qc_alerts(self, report):
+        """
+        返回异常指标列表并异步发送告警；入队失败不影响报表创建
+        滚动统计由 post_save 信号在报表创建时更新，异常指标保存在 report._qc_alerts
+        """
+        logger = logging.getLogger(__name__)
+        report_type = self._get_report_type()
+        alerts = getattr(report, '_qc_alerts', [])
+        if report_type and alerts:
+            try:
+                from tasks.tasks import send_qc_alert
+                send_qc_alert.delay(report_type, report.id, alerts)
+            except Exception as e:
+                logger.error(f'QC告警入队失败 {report_type}#{report.id}: {str(e)}', exc_info=True)
+        return alerts
 
     def _serialize_for_log(self, report):
         """序列化报表数据用于日志记录"""
         try:
-            return {
-                'id': report.id, 'date': str(report.date) if report.date else None,
-                'time': str(report.time) if report.time else None, 'shift': report.shift,
-                'product_name': report.product_name, 'packaging': report.packaging,
-                'batch_number': report.batch_number, 'moisture_after_drying': report.moisture_after_drying,
-                'alkali_content': report.alkali_content, 'flux': report.flux,
-                'permeability': report.permeability, 'permeability_long': report.permeability_long,
-                'wet_cake_density': report.wet_cake_density, 'filter_time': getattr(report, 'filter_time', None),
-                'water_viscosity': getattr(report, 'water_viscosity', None), 'cake_thickness': getattr(report, 'cake_thickness', None),
-                'bulk_density': report.bulk_density, 'brightness': report.brightness,
-                'swirl': report.swirl, 'odor': report.odor, 'conductance': report.conductance,
-                'ph': report.ph, 'moisture': report.moisture, 'bags': report.bags, 'tons': report.tons,
-                'fe_ion': report.fe_ion, 'ca_ion': report.ca_ion, 'al_ion': report.al_ion,
-                'oil_absorption': report.oil_absorption, 'water_absorption': report.water_absorption,
-                'remarks': report.remarks, 'username': report.username,
-                'created_at': str(report.created_at) if report.created_at else None,
-                'updated_at': str(report.updated_at) if report.updated_at else None,
-            }
+            return get_profile_for_model(report).serialize(report)
         except Exception as e:
             return {'error': f'序列化失败: {str(e)}'}
 
@@ -746,8 +665,6 @@ class BaseQCReportAPI(View):
     
     def get(self, request, report_id=None):
         """获取报表数据"""
-        logger = logging.getLogger(__name__)
-        
         # 检查用户是否有QC报表查看权限
         if not user_has_permission(request.user, 'qc_report_view'):
             # 渲染美观的403错误页面
@@ -759,6 +676,16 @@ class BaseQCReportAPI(View):
             }
             return render(request, '403.html', context, status=403)
         
+        # 报表数据未变化时直接返回304，不查询报表表
+        report_type = self._get_report_type()
+        if report_type:
+            return conditional_qc_response(request, report_type, lambda: self._get_response(request, report_id))
+        return self._get_response(request, report_id)
+
+    def _get_response(self, request, report_id=None):
+        """生成报表数据或产量统计响应"""
+        logger = logging.getLogger(__name__)
+        
         try:
             # 检查是否是昨日产量统计请求
             if request.GET.get('action') == 'yesterday_production':
@@ -779,13 +706,31 @@ class BaseQCReportAPI(View):
                 reports_query = self.model_class.objects.all().order_by('-date', '-time')
                 reports_query = self._apply_filters(reports_query, request)
                 
+                # ?fields= 指定字段时只查询和输出这些字段
+                fields = parse_fields(request.GET.get('fields'))
+                fieldset = QCFieldset(self.model_class, fields) if fields else None
+                if fieldset:
+                    reports_query = fieldset.apply(reports_query)
+                
                 # 分页处理
                 page_number = request.GET.get('page', 1)
                 page_size = request.GET.get('page_size', 10)
                 paginator = Paginator(reports_query, page_size)
                 page_obj = paginator.get_page(page_number)
                 
-                data = [self._serialize_report(report, request.user) for report in page_obj.object_list]
+                if fieldset:
+                    permission_getters = {
+                        'can_edit': lambda report: self._check_edit_permission(report, request.user),
+                        'can_delete': lambda report: self._check_delete_permission(report, request.user),
+                        'permission_reason': lambda report: self._get_permission_reason(report, request.user),
+                    }
+                    data = [fieldset.serialize(report, permission_getters) for report in page_obj.object_list]
+                else:
+                    data = [self._serialize_report(report, request.user) for report in page_obj.object_list]
+                
+                # ?format=columnar 时以列式格式返回，不重复每行的字段名
+                if request.GET.get('format') == 'columnar':
+                    data = to_columnar(data, fieldset.columns if fieldset else None)
                 
                 return JsonResponse({
                     'status': 'success',
@@ -816,10 +761,15 @@ class BaseQCReportAPI(View):
         try:
             data = json.loads(request.body)
             data = self._process_input_data(data, request)
+            validation_response = self._validate_input_data(data)
+            if validation_response:
+                return validation_response
             report = self.model_class.objects.create(**data)
             
             # 记录操作日志
             self._log_operation(request, 'CREATE', report, data)
+            # 指标超出规格限或偏离近期均值过大时在响应中标记，并异步发送企业微信告警
+            alerts = self._check_qc_alerts(report)
             return JsonResponse({
                 'status': 'success',
                 'message': '创建成功',
@@ -828,7 +778,8 @@ class BaseQCReportAPI(View):
                     'date': report.date.strftime('%Y-%m-%d'),
                     'time': report.time.strftime('%H:%M'),
                     'username': report.username
-                }
+                },
+                'alerts': alerts
             })
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
@@ -853,6 +804,9 @@ class BaseQCReportAPI(View):
             report = self.model_class.objects.get(id=report_id)
             data = json.loads(request.body)
             data = self._process_input_data(data, request)
+            validation_response = self._validate_input_data(data)
+            if validation_response:
+                return validation_response
             
             # 更新报表
             for key, value in data.items():
@@ -1124,6 +1078,18 @@ class BaseQCReportAPI(View):
 
         return data
 
+    def _validate_input_data(self, data):
+        """按模型校验表校验提交的数据（与Excel导入规则相同），有错误时返回400响应"""
+        schema = get_validation_schema(self.model_class)
+        errors = schema.validate_row(data, schema.verbose_names, skip=('user', 'username'))
+        if errors:
+            return JsonResponse({
+                'status': 'error',
+                'message': '; '.join(errors.values()),
+                'errors': errors,
+            }, status=400)
+        return None
+
     def calculate_yesterday_production(self, request):
         """统计昨日产量 - 按班组、产品型号、包装类型、批号、备注分组统计吨数"""
         from datetime import date, timedelta
@@ -1132,52 +1098,9 @@ class BaseQCReportAPI(View):
             # 获取昨天的日期
             yesterday = date.today() - timedelta(days=1)
             
-            # 查询昨日的数据，先获取原始数据，然后进行智能累加
-            raw_reports = self.model_class.objects.filter(
-                date=yesterday,
-                tons__isnull=False  # 确保吨数不为空
-            ).values(
-                'shift',  # 班组
-                'product_name',  # 产品型号
-                'packaging',  # 包装类型
-                'batch_number',  # 批号
-                'remarks',  # 备注
-                'tons'  # 产量
-            ).order_by('shift', 'product_name', 'packaging', 'batch_number', 'remarks')
-            
-            # 按5个字段分组累加产量（与Excel导出逻辑保持一致）
-            grouped_production = {}
-            for report in raw_reports:
-                # 创建分组键
-                group_key = (
-                    report['shift'] or '未设置',
-                    report['product_name'] or '未设置',
-                    report['packaging'] or '未设置',
-                    report['batch_number'] or '未设置',
-                    report['remarks'] or '未设置'
-                )
-                
-                if group_key not in grouped_production:
-                    grouped_production[group_key] = {
-                        'shift': group_key[0],
-                        'product_name': group_key[1],
-                        'packaging': group_key[2],
-                        'batch_number': group_key[3],
-                        'remarks': group_key[4],
-                        'total_tons': 0,
-                        'count': 0
-                    }
-                
-                # 累加产量
-                try:
-                    if report['tons'] is not None:
-                        grouped_production[group_key]['total_tons'] += float(report['tons'])
-                        grouped_production[group_key]['count'] += 1
-                except (ValueError, TypeError):
-                    continue
-            
-            # 转换为列表格式
-            production_stats = list(grouped_production.values())
+            # 分组统计结果按数据版本缓存，与产量统计Excel导出共用；只保留有吨数的分组
+            production = get_production_groups(self.model_class, yesterday)
+            production_stats = [stat for stat in production['groups'] if stat['count']]
             
             # 格式化数据
             result_data = []
@@ -1213,52 +1136,9 @@ class BaseQCReportAPI(View):
             # 获取今天的日期
             today = date.today()
             
-            # 查询今日的数据，先获取原始数据，然后进行智能累加
-            raw_reports = self.model_class.objects.filter(
-                date=today,
-                tons__isnull=False  # 确保吨数不为空
-            ).values(
-                'shift',  # 班组
-                'product_name',  # 产品型号
-                'packaging',  # 包装类型
-                'batch_number',  # 批号
-                'remarks',  # 备注
-                'tons'  # 产量
-            ).order_by('shift', 'product_name', 'packaging', 'batch_number', 'remarks')
-            
-            # 按5个字段分组累加产量（与Excel导出逻辑保持一致）
-            grouped_production = {}
-            for report in raw_reports:
-                # 创建分组键
-                group_key = (
-                    report['shift'] or '未设置',
-                    report['product_name'] or '未设置',
-                    report['packaging'] or '未设置',
-                    report['batch_number'] or '未设置',
-                    report['remarks'] or '未设置'
-                )
-                
-                if group_key not in grouped_production:
-                    grouped_production[group_key] = {
-                        'shift': group_key[0],
-                        'product_name': group_key[1],
-                        'packaging': group_key[2],
-                        'batch_number': group_key[3],
-                        'remarks': group_key[4],
-                        'total_tons': 0,
-                        'count': 0
-                    }
-                
-                # 累加产量
-                try:
-                    if report['tons'] is not None:
-                        grouped_production[group_key]['total_tons'] += float(report['tons'])
-                        grouped_production[group_key]['count'] += 1
-                except (ValueError, TypeError):
-                    continue
-            
-            # 转换为列表格式
-            production_stats = list(grouped_production.values())
+            # 分组统计结果按数据版本缓存，与产量统计Excel导出共用；只保留有吨数的分组
+            production = get_production_groups(self.model_class, today)
+            production_stats = [stat for stat in production['groups'] if stat['count']]
             
             # 格式化数据
             result_data = []
@@ -1311,7 +1191,7 @@ class BaseQCReportAPI(View):
                 serialized_data = self._serialize_for_log(report)
             
             # 记录操作日志
-            log_entry = UserOperationLog.log_operation(
+            UserOperationLog.log_operation(
                 request=request,
                 operation_type=operation_type,
                 report_type=report_type,
@@ -1319,47 +1199,6 @@ class BaseQCReportAPI(View):
                 operation_detail=f'{operation_type} {self.report_name}，日期: {report.date}，班次: {report.shift}',
                 new_data=serialized_data
             )
-            
-            # 如果日志记录成功，记录更多调试信息
-            if log_entry:
-                logger = logging.getLogger('user_operations')
-                logger.info(f"操作日志记录成功 - ID: {log_entry.id}")
-                
-                # 记录客户端环境信息
-                client_info = request.META.get('HTTP_USER_AGENT', '未知')
-                logger.info(f"客户端环境: {client_info}")
-                
-                # 记录页面状态信息
-                page_state = {
-                    'currentPath': request.path,
-                    'title': '未知',
-                    'timestamp': timezone.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
-                logger.info(f"页面状态: {json.dumps(page_state, ensure_ascii=False, indent=2)}")
-                
-                # 记录会话信息
-                session_info = {
-                    'hasCsrfToken': 'csrftoken' in request.COOKIES,
-                    'hasSessionCookie': 'sessionid' in request.COOKIES,
-                    'sessionCookieLength': len(request.COOKIES.get('sessionid', ''))
-                }
-                logger.info(f"会话信息: {json.dumps(session_info, ensure_ascii=False, indent=2)}")
-                
-                # 记录页面元素状态
-                element_state = {
-                    'hasFilterForm': False,
-                    'hasDataContainer': False,
-                    'filterFormElements': []
-                }
-                logger.info(f"页面元素状态: {json.dumps(element_state, ensure_ascii=False, indent=2)}")
-                
-                # 记录错误信息（如果有）
-                if 'error' in request.GET:
-                    logger.warning(f"操作过程中出现错误: {request.GET.get('error', '未知错误')}")
-                    if 'errorDetail' in request.GET:
-                        logger.warning(f"错误详情: {request.GET.get('errorDetail', '')}")
-                    if 'errorStack' in request.GET:
-                        logger.warning(f"错误堆栈: {request.GET.get('errorStack', '')}")
         
         except Exception as e:
             # 如果日志记录失败，记录到Django日志
@@ -1368,37 +1207,29 @@ class BaseQCReportAPI(View):
 
     def _get_report_type(self):
         """获取报表类型标识"""
-        report_name = getattr(self, 'report_name', '')
-        if '东泰' in report_name: return 'dongtai'
-        elif '远通' in report_name and '二线' not in report_name: return 'yuantong'
-        elif '远通二线' in report_name or '远通2号' in report_name: return 'yuantong2'
-        elif '大塬' in report_name: return 'dayuan'
-        elif '长富' in report_name: return 'changfu'
-        elif '兴辉' in report_name and '二线' not in report_name: return 'xinghui'
-        elif '兴辉二线' in report_name or '兴辉2号' in report_name: return 'xinghui2'
-        else: return None
+        profile = get_profile_for_model(self.model_class) if self.model_class else None
+        return profile.report_type if profile else None
+
+    def _check_qc_alerts(self, report):
+        """
+        返回异常指标列表并异步发送告警；入队失败不影响报表创建
+        滚动统计由 post_save 信号在报表创建时更新，异常指标保存在 report._qc_alerts
+        """
+        logger = logging.getLogger(__name__)
+        report_type = self._get_report_type()
+        alerts = getattr(report, '_qc_alerts', [])
+        if report_type and alerts:
+            try:
+                from tasks.tasks import send_qc_alert
+                send_qc_alert.delay(report_type, report.id, alerts)
+            except Exception as e:
+                logger.error(f'QC告警入队失败 {report_type}#{report.id}: {str(e)}', exc_info=True)
+        return alerts
 
     def _serialize_for_log(self, report):
         """序列化报表数据用于日志记录"""
         try:
-            return {
-                'id': report.id, 'date': str(report.date) if report.date else None,
-                'time': str(report.time) if report.time else None, 'shift': report.shift,
-                'product_name': report.product_name, 'packaging': report.packaging,
-                'batch_number': report.batch_number, 'moisture_after_drying': report.moisture_after_drying,
-                'alkali_content': report.alkali_content, 'flux': report.flux,
-                'permeability': report.permeability, 'permeability_long': report.permeability_long,
-                'wet_cake_density': report.wet_cake_density, 'filter_time': getattr(report, 'filter_time', None),
-                'water_viscosity': getattr(report, 'water_viscosity', None), 'cake_thickness': getattr(report, 'cake_thickness', None),
-                'bulk_density': report.bulk_density, 'brightness': report.brightness,
-                'swirl': report.swirl, 'odor': report.odor, 'conductance': report.conductance,
-                'ph': report.ph, 'moisture': report.moisture, 'bags': report.bags, 'tons': report.tons,
-                'fe_ion': report.fe_ion, 'ca_ion': report.ca_ion, 'al_ion': report.al_ion,
-                'oil_absorption': report.oil_absorption, 'water_absorption': report.water_absorption,
-                'remarks': report.remarks, 'username': report.username,
-                'created_at': str(report.created_at) if report.created_at else None,
-                'updated_at': str(report.updated_at) if report.updated_at else None,
-            }
+            return get_profile_for_model(report).serialize(report)
         except Exception as e:
             return {'error': f'序列化失败: {str(e)}'}
 
@@ -2678,6 +2509,7 @@ def changfu_report_import_excel(request):
         error_count = 0
         error_messages = []
         skipped_count = 0  # 记录跳过的行数
+        parsed_rows = {}  # 转换成功的行 {Excel行号: 数据}
         
         # 统一处理逻辑：先映射列名，再处理数据
         # 如果是pandas DataFrame，先重命名列
@@ -3208,80 +3040,76 @@ def changfu_report_import_excel(request):
                     skipped_count += 1
                     continue
                 
-                # 数据校验：对每个字段进行校验
-                validation_errors = []
-                from home.models import ChangfuQCReport
-                
-                # 定义字段显示名称映射
-                field_display_names = {
-                    'date': '日期',
-                    'time': '时间',
-                    'shift': '班次',
-                    'product_name': '产品名称',
-                    'packaging': '包装类型',
-                    'batch_number': '批号',
-                    'moisture_after_drying': '干燥后原土水分(%)',
-                    'alkali_content': '入窑前碱含量(%)',
-                    'flux': '助溶剂添加比例',
-                    'permeability': '远通渗透率(Darcy)',
-                    'permeability_long': '长富渗透率(Darcy)',
-                    'wet_cake_density': '饼密度(g/cm3)',
-                    'filter_time': '过滤时间(秒)',
-                    'water_viscosity': '水黏度(mPa.s)',
-                    'cake_thickness': '饼厚(mm)',
-                    'bulk_density': '振实密度(g/cm3)',
-                    'brightness': '白度',
-                    'swirl': '涡值(cm)',
-                    'odor': '气味',
-                    'conductance': '电导值(ms/cm)',
-                    'ph': 'pH',
-                    'moisture': '水分(%)',
-                    'bags': '袋数',
-                    'tons': '吨',
-                    'sieving_14m': '+14M (%)',
-                    'sieving_30m': '+30M (%)',
-                    'sieving_40m': '+40M (%)',
-                    'sieving_80m': '+80M (%)',
-                    'sieving_100m': '+100M (%)',
-                    'sieving_150m': '+150M (%)',
-                    'sieving_200m': '+200M (%)',
-                    'sieving_325m': '+325M (%)',
-                    'fe_ion': 'Fe离子',
-                    'ca_ion': 'Ca离子',
-                    'al_ion': 'Al离子',
-                    'oil_absorption': '吸油量',
-                    'water_absorption': '吸水量',
-                    'remarks': '备注',
-                }
-                
-                # 对每个字段进行校验
-                for field_name, field_value in data.items():
-                    # 跳过用户相关字段
-                    if field_name in ['user', 'username']:
-                        continue
-                    
-                    # 获取字段显示名称
-                    field_display_name = field_display_names.get(field_name, field_name)
-                    
-                    # 使用validate_field_by_model进行校验
-                    is_valid, error_msg = validate_field_by_model(
-                        ChangfuQCReport, 
-                        field_name, 
-                        field_value, 
-                        field_display_name
-                    )
-                    
-                    if not is_valid:
-                        validation_errors.append(f'{field_display_name}: {error_msg}')
-                
-                # 如果有校验错误，记录并跳过这一行
-                if validation_errors:
-                    error_count += 1
-                    error_msg = f'第 {index + 2} 行数据校验失败: {"; ".join(validation_errors)}'
-                    error_messages.append(error_msg)
-                    logger.warning(f'导入长富QC报表数据校验失败: {error_msg}')
-                    continue
+                # 整批转换完成后再统一校验（按Excel行号）
+                parsed_rows[index + 2] = data
                 
+            except Exception as e:
+                error_count += 1
+                error_msg = f'第 {index + 2} 行导入失败: {str(e)}'
+                error_messages.append(error_msg)
+                logger.error(f'导入长富QC报表失败: {error_msg}', exc_info=True)
+        
+        # 整批校验（跳过用户相关字段），错误矩阵 {行号: {字段名: 错误信息}} 只包含有错误的行
+        # 字段显示名称映射
+        field_display_names = {
+            'date': '日期',
+            'time': '时间',
+            'shift': '班次',
+            'product_name': '产品名称',
+            'packaging': '包装类型',
+            'batch_number': '批号',
+            'moisture_after_drying': '干燥后原土水分(%)',
+            'alkali_content': '入窑前碱含量(%)',
+            'flux': '助溶剂添加比例',
+            'permeability': '远通渗透率(Darcy)',
+            'permeability_long': '长富渗透率(Darcy)',
+            'wet_cake_density': '饼密度(g/cm3)',
+            'filter_time': '过滤时间(秒)',
+            'water_viscosity': '水黏度(mPa.s)',
+            'cake_thickness': '饼厚(mm)',
+            'bulk_density': '振实密度(g/cm3)',
+            'brightness': '白度',
+            'swirl': '涡值(cm)',
+            'odor': '气味',
+            'conductance': '电导值(ms/cm)',
+            'ph': 'pH',
+            'moisture': '水分(%)',
+            'bags': '袋数',
+            'tons': '吨',
+            'sieving_14m': '+14M (%)',
+            'sieving_30m': '+30M (%)',
+            'sieving_40m': '+40M (%)',
+            'sieving_80m': '+80M (%)',
+            'sieving_100m': '+100M (%)',
+            'sieving_150m': '+150M (%)',
+            'sieving_200m': '+200M (%)',
+            'sieving_325m': '+325M (%)',
+            'fe_ion': 'Fe离子',
+            'ca_ion': 'Ca离子',
+            'al_ion': 'Al离子',
+            'oil_absorption': '吸油量',
+            'water_absorption': '吸水量',
+            'remarks': '备注',
+        }
+        error_matrix = get_validation_schema(ChangfuQCReport).validate_rows(
+            parsed_rows, field_display_names, skip=('user', 'username')
+        )
+        
+        for line, data in parsed_rows.items():
+            row_errors = error_matrix.get(line)
+            if row_errors:
+                # 有校验错误时记录并跳过这一行
+                error_count += 1
+                validation_errors = '; '.join(
+                    f'{field_display_names.get(field_name, field_name)}: {error_msg}'
+                    for field_name, error_msg in row_errors.items()
+                )
+                error_msg = f'第 {line} 行数据校验失败: {validation_errors}'
+                error_messages.append(error_msg)
+                logger.warning(f'导入长富QC报表数据校验失败: {error_msg}')
+                continue
+            
+            try:
                 # 设置用户信息
                 data['user'] = request.user
                 data['username'] = request.user.username
@@ -3289,10 +3117,9 @@ def changfu_report_import_excel(request):
                 # 创建记录 - 使用ChangfuQCReport模型
                 ChangfuQCReport.objects.create(**data)
                 imported_count += 1
-                
             except Exception as e:
                 error_count += 1
-                error_msg = f'第 {index + 2} 行导入失败: {str(e)}'
+                error_msg = f'第 {line} 行导入失败: {str(e)}'
                 error_messages.append(error_msg)
                 logger.error(f'导入长富QC报表失败: {error_msg}', exc_info=True)
         
@@ -5078,6 +4905,9 @@ def dongtai_report_import_excel(request):
         error_count = 0
         error_messages = []
         skipped_count = 0
+        # 转换成功的行 {Excel行号: 数据}，转换阶段的错误 {Excel行号: [错误信息]}
+        parsed_rows = {}
+        conversion_errors = {}
         
         # 重命名DataFrame列名为数据库字段名（严格一对一映射）
         df.rename(columns=header_to_field, inplace=True)
@@ -5323,101 +5153,10 @@ def dongtai_report_import_excel(request):
                 data['user'] = request.user
                 data['username'] = request.user.username
                 
-                # 数据校验：根据数据库字段类型进行校验
-                # 导入模型类
-                from home.models import DongtaiQCReport
-                
-                # 字段中文名称映射（用于错误提示，与历史记录页面一致）
-                field_display_names = {
-                    'date': '日期',
-                    'time': '时间',
-                    'shift': '班组',
-                    'product_name': '产品型号',
-                    'packaging': '包装类型',
-                    'batch_number': 'LOT批号',
-                    'material_type': '物料类型',
-                    'moisture_after_drying': '干燥后原土水分(%)',
-                    'alkali_content': '入窑前碱含量(%)',
-                    'flux': '助溶剂添加比例',
-                    'permeability': '远通渗透率(Darcy)',
-                    'permeability_long': '长富渗透率(Darcy)',
-                    'filter_time': '过滤时间(秒)',
-                    'water_viscosity': '水黏度(mPa.s)',
-                    'cake_thickness': '饼厚(mm)',
-                    'wet_cake_density': '饼密度(g/cm3)',
-                    'yuantong_cake_density': '远通饼密度(g/cm3)',
-                    'changfu_cake_density': '长富饼密度(g/cm3)',
-                    'bulk_density': '振实密度(g/cm3)',
-                    'brightness': '白度',
-                    'swirl': '涡值(cm)',
-                    'odor': '气味',
-                    'conductance': '电导值(ms/cm)',
-                    'ph': 'pH',
-                    'moisture': '水分(%)',
-                    'bags': '袋数',
-                    'tons': '吨数',
-                    'sieving_14m': '+14M',
-                    'sieving_30m': '+30M',
-                    'sieving_40m': '+40M',
-                    'sieving_80m': '+80M',
-                    'sieving_100m': '+100M',
-                    'sieving_150m': '+150M',
-                    'sieving_200m': '+200M',
-                    'sieving_325m': '+325M',
-                    'fe_ion': 'Fe离子',
-                    'ca_ion': 'Ca离子',
-                    'al_ion': 'Al离子',
-                    'oil_absorption': '吸油率(%)',
-                    'water_absorption': '吸水率(%)',
-                    'remarks': '备注',
-                }
-                
-                # 对所有字段进行基于模型定义的校验
-                for field_name, field_value in data.items():
-                    # 跳过user和username字段（这些是系统字段）
-                    if field_name in ['user', 'username']:
-                        continue
-                    
-                    # 获取字段显示名称
-                    field_display_name = field_display_names.get(field_name, field_name)
-                    
-                    # 使用模型字段定义进行校验
-                    is_valid, error_msg = validate_field_by_model(
-                        DongtaiQCReport, 
-                        field_name, 
-                        field_value, 
-                        field_display_name
-                    )
-                    
-                    if not is_valid:
-                        validation_errors.append(error_msg)
-                
-                # 如果有任何校验错误，跳过这条数据，不导入
+                # 整批转换完成后再统一校验（按Excel行号），转换阶段的错误一并记录
+                parsed_rows[index + 2] = data
                 if validation_errors:
-                    error_count += 1
-                    error_msg = f'第 {index + 2} 行数据校验失败，已跳过导入: ' + '; '.join(validation_errors)
-                    error_messages.append(error_msg)
-                    logger.warning(f'导入东泰QC报表数据校验失败: {error_msg}')
-                    continue  # 跳过这条数据，不导入
-                
-                # 创建记录 - 使用DongtaiQCReport模型
-                try:
-                    DongtaiQCReport.objects.create(**data)
-                    imported_count += 1
-                except Exception as db_error:
-                    # 数据库层面的错误（如字段类型不匹配、约束违反等）
-                    error_count += 1
-                    error_detail = str(db_error)
-                    if 'max_length' in error_detail.lower() or 'too long' in error_detail.lower():
-                        error_msg = f'第 {index + 2} 行导入失败: 字段值超过最大长度限制 - {error_detail}'
-                    elif 'decimal' in error_detail.lower() or 'precision' in error_detail.lower():
-                        error_msg = f'第 {index + 2} 行导入失败: 数值精度超出限制 - {error_detail}'
-                    elif 'invalid' in error_detail.lower() or 'choice' in error_detail.lower():
-                        error_msg = f'第 {index + 2} 行导入失败: 字段值无效 - {error_detail}'
-                    else:
-                        error_msg = f'第 {index + 2} 行导入失败: {error_detail}'
-                    error_messages.append(error_msg)
-                    logger.error(f'导入东泰QC报表失败: {error_msg}', exc_info=True)
+                    conversion_errors[index + 2] = validation_errors
                 
             except Exception as e:
                 error_count += 1
@@ -5425,6 +5164,85 @@ def dongtai_report_import_excel(request):
                 error_messages.append(error_msg)
                 logger.error(f'导入东泰QC报表失败: {error_msg}', exc_info=True)
         
+        # 整批进行基于模型定义的校验（跳过user和username系统字段），错误矩阵 {行号: {字段名: 错误信息}} 只包含有错误的行
+        # 字段中文名称映射（用于错误提示，与历史记录页面一致）
+        field_display_names = {
+            'date': '日期',
+            'time': '时间',
+            'shift': '班组',
+            'product_name': '产品型号',
+            'packaging': '包装类型',
+            'batch_number': 'LOT批号',
+            'material_type': '物料类型',
+            'moisture_after_drying': '干燥后原土水分(%)',
+            'alkali_content': '入窑前碱含量(%)',
+            'flux': '助溶剂添加比例',
+            'permeability': '远通渗透率(Darcy)',
+            'permeability_long': '长富渗透率(Darcy)',
+            'filter_time': '过滤时间(秒)',
+            'water_viscosity': '水黏度(mPa.s)',
+            'cake_thickness': '饼厚(mm)',
+            'wet_cake_density': '饼密度(g/cm3)',
+            'yuantong_cake_density': '远通饼密度(g/cm3)',
+            'changfu_cake_density': '长富饼密度(g/cm3)',
+            'bulk_density': '振实密度(g/cm3)',
+            'brightness': '白度',
+            'swirl': '涡值(cm)',
+            'odor': '气味',
+            'conductance': '电导值(ms/cm)',
+            'ph': 'pH',
+            'moisture': '水分(%)',
+            'bags': '袋数',
+            'tons': '吨数',
+            'sieving_14m': '+14M',
+            'sieving_30m': '+30M',
+            'sieving_40m': '+40M',
+            'sieving_80m': '+80M',
+            'sieving_100m': '+100M',
+            'sieving_150m': '+150M',
+            'sieving_200m': '+200M',
+            'sieving_325m': '+325M',
+            'fe_ion': 'Fe离子',
+            'ca_ion': 'Ca离子',
+            'al_ion': 'Al离子',
+            'oil_absorption': '吸油率(%)',
+            'water_absorption': '吸水率(%)',
+            'remarks': '备注',
+        }
+        error_matrix = get_validation_schema(DongtaiQCReport).validate_rows(
+            parsed_rows, field_display_names, skip=('user', 'username')
+        )
+        
+        for line, data in parsed_rows.items():
+            validation_errors = conversion_errors.get(line, []) + list(error_matrix.get(line, {}).values())
+            
+            # 如果有任何校验错误，跳过这条数据，不导入
+            if validation_errors:
+                error_count += 1
+                error_msg = f'第 {line} 行数据校验失败，已跳过导入: ' + '; '.join(validation_errors)
+                error_messages.append(error_msg)
+                logger.warning(f'导入东泰QC报表数据校验失败: {error_msg}')
+                continue
+            
+            # 创建记录 - 使用DongtaiQCReport模型
+            try:
+                DongtaiQCReport.objects.create(**data)
+                imported_count += 1
+            except Exception as db_error:
+                # 数据库层面的错误（如字段类型不匹配、约束违反等）
+                error_count += 1
+                error_detail = str(db_error)
+                if 'max_length' in error_detail.lower() or 'too long' in error_detail.lower():
+                    error_msg = f'第 {line} 行导入失败: 字段值超过最大长度限制 - {error_detail}'
+                elif 'decimal' in error_detail.lower() or 'precision' in error_detail.lower():
+                    error_msg = f'第 {line} 行导入失败: 数值精度超出限制 - {error_detail}'
+                elif 'invalid' in error_detail.lower() or 'choice' in error_detail.lower():
+                    error_msg = f'第 {line} 行导入失败: 字段值无效 - {error_detail}'
+                else:
+                    error_msg = f'第 {line} 行导入失败: {error_detail}'
+                error_messages.append(error_msg)
+                logger.error(f'导入东泰QC报表失败: {error_msg}', exc_info=True)
+        
         # 记录操作日志
         from home.models import UserOperationLog
         UserOperationLog.log_operation(
@@ -6512,12 +6330,14 @@ class DongtaiQCReportAPI(BaseQCReportAPI):
 
 @login_required
 @permission_required('qc_report_view')
+@qc_data_conditional(DongtaiQCReport)
 def export_dongtai_report_excel(request):
     """导出东泰QC报表Excel - 使用大塬格式"""
     return export_qc_report_excel_universal(request, DongtaiQCReport, "东泰", QC_REPORT_FIELD_MAPPING, use_formatted_style=True)
 
 
 @login_required
+@qc_data_conditional(DongtaiQCReport)
 def export_dongtai_yesterday_production(request):
     """导出东泰昨日产量统计Excel - 使用与大塬相同的通用函数"""
     return export_production_excel(request, DongtaiQCReport, "东泰", "昨日")
@@ -6525,6 +6345,7 @@ def export_dongtai_yesterday_production(request):
 
 
 @login_required
+@qc_data_conditional(DongtaiQCReport)
 def export_dongtai_today_production(request):
     """导出东泰今日产量统计Excel - 使用与大塬相同的通用函数"""
     return export_production_excel(request, DongtaiQCReport, "东泰", "今日")
@@ -6764,16 +6585,19 @@ class Yuantong2QCReportAPI(BaseQCReportAPI):
 
 @login_required
 @permission_required('qc_report_view')
+@qc_data_conditional(YuantongQCReport)
 def export_yuantong_report_excel(request):
     """导出远通QC报表Excel - 使用大塬格式"""
     return export_qc_report_excel_universal(request, YuantongQCReport, "远通", QC_REPORT_FIELD_MAPPING, use_formatted_style=True)
 
 @login_required
+@qc_data_conditional(YuantongQCReport)
 def export_yuantong_yesterday_production(request):
     """导出远通昨日产量统计Excel"""
     return export_production_excel(request, YuantongQCReport, "远通", "昨日")
 
 @login_required
+@qc_data_conditional(YuantongQCReport)
 def export_yuantong_today_production(request):
     """导出远通今日产量统计Excel"""
     return export_production_excel(request, YuantongQCReport, "远通", "今日")   
@@ -6782,16 +6606,19 @@ def export_yuantong_today_production(request):
 
 @login_required
 @permission_required('qc_report_view')
+@qc_data_conditional(Yuantong2QCReport)
 def export_yuantong2_report_excel(request):
     """导出远通二线QC报表Excel - 使用大塬格式"""
     return export_qc_report_excel_universal(request, Yuantong2QCReport, "远通二线", QC_REPORT_FIELD_MAPPING, use_formatted_style=True)
 
 @login_required
+@qc_data_conditional(Yuantong2QCReport)
 def export_yuantong2_yesterday_production(request):
     """导出远通二线昨日产量统计Excel"""
     return export_production_excel(request, Yuantong2QCReport, "远通二线", "昨日")
 
 @login_required
+@qc_data_conditional(Yuantong2QCReport)
 def export_yuantong2_today_production(request):
     """导出远通二线今日产量统计Excel"""
     return export_production_excel(request, Yuantong2QCReport, "远通二线", "今日")
@@ -6799,16 +6626,19 @@ def export_yuantong2_today_production(request):
 
 @login_required
 @permission_required('qc_report_view')
+@qc_data_conditional(DayuanQCReport)
 def export_dayuan_report_excel(request):
     """导出大塬QC报表Excel - 使用通用函数"""
     return export_qc_report_excel_universal(request, DayuanQCReport, "大塬", QC_REPORT_FIELD_MAPPING, use_formatted_style=True)
 
 @login_required
+@qc_data_conditional(DayuanQCReport)
 def export_dayuan_yesterday_production(request):
     """导出大塬昨日产量统计Excel"""
     return export_production_excel(request, DayuanQCReport, "大塬", "昨日")
 
 @login_required
+@qc_data_conditional(DayuanQCReport)
 def export_dayuan_today_production(request):
     """导出大塬今日产量统计Excel"""
     return export_production_excel(request, DayuanQCReport, "大塬", "今日")
@@ -6841,49 +6671,9 @@ class XinghuiQCReportAPI(BaseQCReportAPI):
             # 获取昨天的日期
             yesterday = date.today() - timedelta(days=1)
             
-            # 查询昨日的数据，先获取原始数据，然后进行智能累加
-            raw_reports = self.model_class.objects.filter(
-                date=yesterday,
-                tons__isnull=False  # 确保吨数不为空
-            ).values(
-                'shift',  # 班组
-                'product_name',  # 产品型号
-                'packaging',  # 包装类型
-                'batch_number',  # 批号
-                'tons'  # 产量
-            ).order_by('shift', 'product_name', 'packaging', 'batch_number')
-            
-            # 按4个字段分组累加产量（兴辉版本不包含备注）
-            grouped_production = {}
-            for report in raw_reports:
-                # 创建分组键 - 兴辉版本不包含备注
-                group_key = (
-                    report['shift'] or '未设置',
-                    report['product_name'] or '未设置',
-                    report['packaging'] or '未设置',
-                    report['batch_number'] or '未设置'
-                )
-                
-                if group_key not in grouped_production:
-                    grouped_production[group_key] = {
-                        'shift': group_key[0],
-                        'product_name': group_key[1],
-                        'packaging': group_key[2],
-                        'batch_number': group_key[3],
-                        'total_tons': 0,
-                        'count': 0
-                    }
-                
-                # 累加产量
-                try:
-                    if report['tons'] is not None:
-                        grouped_production[group_key]['total_tons'] += float(report['tons'])
-                        grouped_production[group_key]['count'] += 1
-                except (ValueError, TypeError):
-                    continue
-            
-            # 转换为列表格式
-            production_stats = list(grouped_production.values())
+            # 分组统计结果按数据版本缓存，与产量统计Excel导出共用；只保留有吨数的分组
+            production = get_production_groups(self.model_class, yesterday, XINGHUI_GROUP_FIELDS)
+            production_stats = [stat for stat in production['groups'] if stat['count']]
             
             # 格式化数据
             result_data = []
@@ -6918,49 +6708,9 @@ class XinghuiQCReportAPI(BaseQCReportAPI):
             # 获取今天的日期
             today = date.today()
             
-            # 查询今日的数据，先获取原始数据，然后进行智能累加
-            raw_reports = self.model_class.objects.filter(
-                date=today,
-                tons__isnull=False  # 确保吨数不为空
-            ).values(
-                'shift',  # 班组
-                'product_name',  # 产品型号
-                'packaging',  # 包装类型
-                'batch_number',  # 批号
-                'tons'  # 产量
-            ).order_by('shift', 'product_name', 'packaging', 'batch_number')
-            
-            # 按4个字段分组累加产量（兴辉版本不包含备注）
-            grouped_production = {}
-            for report in raw_reports:
-                # 创建分组键 - 兴辉版本不包含备注
-                group_key = (
-                    report['shift'] or '未设置',
-                    report['product_name'] or '未设置',
-                    report['packaging'] or '未设置',
-                    report['batch_number'] or '未设置'
-                )
-                
-                if group_key not in grouped_production:
-                    grouped_production[group_key] = {
-                        'shift': group_key[0],
-                        'product_name': group_key[1],
-                        'packaging': group_key[2],
-                        'batch_number': group_key[3],
-                        'total_tons': 0,
-                        'count': 0
-                    }
-                
-                # 累加产量
-                try:
-                    if report['tons'] is not None:
-                        grouped_production[group_key]['total_tons'] += float(report['tons'])
-                        grouped_production[group_key]['count'] += 1
-                except (ValueError, TypeError):
-                    continue
-            
-            # 转换为列表格式
-            production_stats = list(grouped_production.values())
+            # 分组统计结果按数据版本缓存，与产量统计Excel导出共用；只保留有吨数的分组
+            production = get_production_groups(self.model_class, today, XINGHUI_GROUP_FIELDS)
+            production_stats = [stat for stat in production['groups'] if stat['count']]
             
             # 格式化数据
             result_data = []
@@ -7072,18 +6822,21 @@ class XinghuiQCReportAPI(BaseQCReportAPI):
 
 @login_required
 @permission_required('qc_report_view')
+@qc_data_conditional(XinghuiQCReport)
 def export_xinghui_report_excel(request):
     """导出兴辉QC报表Excel - 使用大塬格式"""
     return export_qc_report_excel_universal(request, XinghuiQCReport, "兴辉", QC_REPORT_FIELD_MAPPING, use_formatted_style=True)
 
 @login_required
 @permission_required('qc_report_view')
+@qc_data_conditional(XinghuiQCReport)
 def export_xinghui_yesterday_production(request):
     """导出兴辉昨日产量统计Excel - 使用与大塬相同的通用函数，但不包含备注字段"""
     return export_xinghui_production_excel(request, XinghuiQCReport, "兴辉", "昨日")
 
 @login_required
 @permission_required('qc_report_view')
+@qc_data_conditional(XinghuiQCReport)
 def export_xinghui_today_production(request):
     """导出兴辉今日产量统计Excel - 使用与大塬相同的通用函数，但不包含备注字段"""
     return export_xinghui_production_excel(request, XinghuiQCReport, "兴辉", "今日")
@@ -7121,54 +6874,19 @@ def export_xinghui_production_excel(request, model_class, report_name, period):
         logger.info(f"📅 查询开始日期: {start_date}")
         logger.info(f"📅 查询结束日期: {end_date}")
         
-        # 构建查询 - 兴辉版本不包含备注字段
-        query = Q(date__gte=start_date) & Q(date__lte=end_date)
-        logger.info(f"🔍 构建查询条件: {query}")
-        
-        # 执行查询 - 兴辉版本按4个字段排序
-        reports = model_class.objects.filter(query).order_by('shift', 'product_name', 'packaging', 'batch_number')
-        logger.info(f"📊 查询到{reports.count()}条记录")
+        # 分组统计结果按数据版本缓存，与页面产量统计共用（兴辉按4个字段分组，不包含备注）
+        production = get_production_groups(model_class, target_date, XINGHUI_GROUP_FIELDS)
+        logger.info(f"📊 查询到{production['row_count']}条记录")
         
-        if not reports.exists():
+        if not production['row_count']:
             logger.warning(f"⚠️ {report_name}{period}没有找到产量数据")
             return HttpResponse(f"{report_name}{period}没有找到产量数据", content_type='text/plain')
         
-        # 按4个字段分组累加产量（兴辉版本不包含备注）
-        logger.info("📊 开始按4个字段分组累加产量（兴辉版本）...")
-        grouped_production = {}
-        for report in reports:
-            # 创建分组键 - 兴辉版本不包含备注
-            group_key = (
-                report.shift or '未设置',
-                report.product_name or '未设置',
-                report.packaging or '未设置',
-                report.batch_number or '未设置'
-            )
-            
-            if group_key not in grouped_production:
-                grouped_production[group_key] = {
-                    'shift': group_key[0],
-                    'product_name': group_key[1],
-                    'packaging': group_key[2],
-                    'batch_number': group_key[3],
-                    'total_tons': 0,
-                    'count': 0
-                }
-            
-            # 累加产量
-            try:
-                if report.tons is not None:
-                    grouped_production[group_key]['total_tons'] += float(report.tons)
-                    grouped_production[group_key]['count'] += 1
-            except (ValueError, TypeError):
-                logger.warning(f"    ⚠️ 产量值转换失败: {report.tons}")
-                continue
-        
-        logger.info(f"📊 分组累加完成，共{len(grouped_production)}个唯一组合")
+        logger.info(f"📊 分组累加完成，共{len(production['groups'])}个唯一组合")
         
         # 按班组分组数据（用于Excel显示）
         grouped_data = {}
-        for group_key, production_data in grouped_production.items():
+        for production_data in production['groups']:
             shift = production_data['shift']
             if shift not in grouped_data:
                 grouped_data[shift] = []
@@ -7426,16 +7144,19 @@ class ChangfuQCReportAPI(BaseQCReportAPI):
         return processed
 @login_required
 @permission_required('qc_report_view')
+@qc_data_conditional(ChangfuQCReport)
 def export_changfu_report_excel(request):
     """导出长富QC报表Excel - 使用大塬格式"""
     return export_qc_report_excel_universal(request, ChangfuQCReport, "长富", QC_REPORT_FIELD_MAPPING, use_formatted_style=True)
 
 @login_required
+@qc_data_conditional(ChangfuQCReport)
 def export_changfu_yesterday_production(request):
     """导出长富昨日产量统计Excel"""
     return export_production_excel(request, ChangfuQCReport, "长富", "昨日")
 
 @login_required
+@qc_data_conditional(ChangfuQCReport)
 def export_changfu_today_production(request):
     """导出长富今日产量统计Excel"""
     return export_production_excel(request, ChangfuQCReport, "长富", "今日")
@@ -7545,18 +7266,21 @@ class Xinghui2QCReportAPI(BaseQCReportAPI):
 
 @login_required
 @permission_required('qc_report_view')
+@qc_data_conditional(Xinghui2QCReport)
 def export_xinghui2_report_excel(request):
     """导出兴辉二线QC报表Excel - 使用大塬格式"""
     return export_qc_report_excel_universal(request, Xinghui2QCReport, "兴辉二线", QC_REPORT_FIELD_MAPPING, use_formatted_style=True)
 
 @login_required
 @permission_required('qc_report_view')
+@qc_data_conditional(Xinghui2QCReport)
 def export_xinghui2_yesterday_production(request):
     """导出兴辉二线昨日产量统计Excel - 使用与兴辉相同的通用函数，但不包含备注字段"""
     return export_xinghui2_production_excel(request, Xinghui2QCReport, "兴辉二线", "昨日")
 
 @login_required
 @permission_required('qc_report_view')
+@qc_data_conditional(Xinghui2QCReport)
 def export_xinghui2_today_production(request):
     """导出兴辉二线今日产量统计Excel - 使用与兴辉相同的通用函数，但不包含备注字段"""
     return export_xinghui2_production_excel(request, Xinghui2QCReport, "兴辉二线", "今日")
@@ -7594,54 +7318,19 @@ def export_xinghui2_production_excel(request, model_class, report_name, period):
         logger.info(f"📅 查询开始日期: {start_date}")
         logger.info(f"📅 查询结束日期: {end_date}")
         
-        # 构建查询 - 兴辉二线版本不包含备注字段
-        query = Q(date__gte=start_date) & Q(date__lte=end_date)
-        logger.info(f"🔍 构建查询条件: {query}")
+        # 分组统计结果按数据版本缓存，与页面产量统计共用（兴辉按4个字段分组，不包含备注）
+        production = get_production_groups(model_class, target_date, XINGHUI_GROUP_FIELDS)
+        logger.info(f"📊 查询到{production['row_count']}条记录")
         
-        # 执行查询 - 兴辉二线版本按4个字段排序
-        reports = model_class.objects.filter(query).order_by('shift', 'product_name', 'packaging', 'batch_number')
-        logger.info(f"📊 查询到{reports.count()}条记录")
-        
-        if not reports.exists():
+        if not production['row_count']:
             logger.warning(f"⚠️ {report_name}{period}没有找到产量数据")
             return HttpResponse(f"{report_name}{period}没有找到产量数据", content_type='text/plain')
         
-        # 按4个字段分组累加产量（兴辉二线版本不包含备注）
-        logger.info("📊 开始按4个字段分组累加产量（兴辉二线版本）...")
-        grouped_production = {}
-        for report in reports:
-            # 创建分组键 - 兴辉二线版本不包含备注
-            group_key = (
-                report.shift or '未设置',
-                report.product_name or '未设置',
-                report.packaging or '未设置',
-                report.batch_number or '未设置'
-            )
-            
-            if group_key not in grouped_production:
-                grouped_production[group_key] = {
-                    'shift': group_key[0],
-                    'product_name': group_key[1],
-                    'packaging': group_key[2],
-                    'batch_number': group_key[3],
-                    'total_tons': 0,
-                    'count': 0
-                }
-            
-            # 累加产量
-            try:
-                if report.tons is not None:
-                    grouped_production[group_key]['total_tons'] += float(report.tons)
-                    grouped_production[group_key]['count'] += 1
-            except (ValueError, TypeError):
-                logger.warning(f"    ⚠️ 产量值转换失败: {report.tons}")
-                continue
-        
-        logger.info(f"📊 分组累加完成，共{len(grouped_production)}个唯一组合")
+        logger.info(f"📊 分组累加完成，共{len(production['groups'])}个唯一组合")
         
         # 按班组分组数据（用于Excel显示）
         grouped_data = {}
-        for group_key, production_data in grouped_production.items():
+        for production_data in production['groups']:
             shift = production_data['shift']
             if shift not in grouped_data:
                 grouped_data[shift] = []
@@ -7800,3 +7489,196 @@ def export_xinghui2_production_excel(request, model_class, report_name, period):
         logger.error(f"详细错误信息: {traceback.format_exc()}")
         
         return HttpResponse(error_msg, content_type='text/plain', status=500)
+
+
+@login_required
+@permission_required('qc_report_view')
+def qc_search_api(request):
+    """
+    跨厂区QC报表查询接口
+    参数: keyword（批号或产品型号）、batch_number、product_name、shift、start_date、end_date，
+    report_type（可重复指定，默认全部厂区）、limit（默认100，最大500）
+    在跨厂区统一存储中一次查询，返回按日期、时间倒序的记录，每条带 report_type、report_label
+    """
+    logger = logging.getLogger(__name__)
+
+    report_types = request.GET.getlist('report_type') or None
+    if report_types:
+        unknown = [report_type for report_type in report_types if report_type not in get_profiles()]
+        if unknown:
+            return JsonResponse({'status': 'error', 'message': f"未知的报表类型: {', '.join(unknown)}"}, status=400)
+    try:
+        limit = min(max(int(request.GET.get('limit', DEFAULT_SEARCH_LIMIT)), 1), MAX_SEARCH_LIMIT)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'limit 必须是整数'}, status=400)
+
+    filters = {
+        name: request.GET.get(name, '').strip()
+        for name in ('keyword', 'batch_number', 'product_name', 'shift', 'start_date', 'end_date')
+    }
+    # 日期格式错误时直接返回400
+    try:
+        for name in ('start_date', 'end_date'):
+            filters[name] = datetime.strptime(filters[name], '%Y-%m-%d').date() if filters[name] else None
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': '日期格式应为YYYY-MM-DD'}, status=400)
+    try:
+        rows = search_qc_reports(request.user, filters, report_types, limit)
+    except Exception as e:
+        logger.error(f'跨厂区QC查询失败: {str(e)}', exc_info=True)
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+
+    display_names = {}
+    data = []
+    for row in rows:
+        username = row['username']
+        if username not in display_names:
+            display_names[username] = get_user_info(username).get('name', username)
+        data.append(dict(
+            row,
+            date=row['date'].strftime('%Y-%m-%d') if row['date'] else '',
+            time=row['time'].strftime('%H:%M') if row['time'] else '',
+            username=display_names[username],
+            original_username=username,
+        ))
+
+    return JsonResponse({
+        'status': 'success',
+        'data': data,
+        'total_count': len(data),
+        'limit': limit,
+    })
+
+
+@login_required
+@permission_required('qc_report_view')
+def batch_trace_api(request):
+    """
+    批号追溯接口
+    参数: batch（批号，按规范化批号匹配：忽略大小写、全半角、空白和连接符），prefix=1 时按前缀匹配
+    返回该批号对应的各厂区QC报表和原土入库记录
+    """
+    logger = logging.getLogger(__name__)
+
+    batch_number = request.GET.get('batch', '')
+    prefix = request.GET.get('prefix') in ('1', 'true')
+    try:
+        result = trace_batch(batch_number, request.user, prefix=prefix)
+    except Exception as e:
+        logger.error(f'批号追溯失败 {batch_number}: {str(e)}', exc_info=True)
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+    if result is None:
+        return JsonResponse({'status': 'error', 'message': '请输入批号'}, status=400)
+
+    display_names = {}
+    qc_reports = []
+    for row in result['qc_reports']:
+        username = row['username']
+        if username not in display_names:
+            display_names[username] = get_user_info(username).get('name', username)
+        qc_reports.append(dict(
+            row,
+            date=row['date'].strftime('%Y-%m-%d') if row['date'] else '',
+            time=row['time'].strftime('%H:%M') if row['time'] else '',
+            username=display_names[username],
+            original_username=username,
+        ))
+    raw_soil = [dict(row, biz_date=row['biz_date'].strftime('%Y-%m-%d')) for row in result['raw_soil']]
+
+    return JsonResponse({
+        'status': 'success',
+        'batch_key': result['batch_key'],
+        'qc_reports': qc_reports,
+        'raw_soil': raw_soil,
+    })
+
+
+@login_required
+@permission_required('qc_report_view')
+def qc_spc_api(request):
+    """
+    QC指标SPC接口（单值-移动极差、均值-极差控制图和 Cp/Cpk）
+    参数: report_type、field（数值指标字段）、product_name 必填；window（最近检测值个数，默认100）、
+    subgroup_size（子组大小2~10，默认5）、start_date、end_date、lsl、usl（未指定时使用规格限配置）
+    统计的是厂区整体的过程数据，需要有该厂区报表的查看权限
+    """
+    from home.utils import get_user_data_filter_by_company_department
+    logger = logging.getLogger(__name__)
+
+    report_type = request.GET.get('report_type', '')
+    field_name = request.GET.get('field', '')
+    product_name = request.GET.get('product_name', '').strip()
+    profile = get_profiles().get(report_type)
+    if profile is None:
+        return JsonResponse({'status': 'error', 'message': f'未知的报表类型: {report_type}'}, status=400)
+    if not field_name or not product_name:
+        return JsonResponse({'status': 'error', 'message': '请指定指标字段和产品型号'}, status=400)
+    data_filter = get_user_data_filter_by_company_department(request.user, profile.permission_code, 'username')
+    if 'id' in data_filter and data_filter['id'] is None:
+        return JsonResponse({'status': 'error', 'message': f'没有{profile.label}的查看权限'}, status=403)
+
+    try:
+        window = int(request.GET.get('window', SPC_DEFAULT_WINDOW))
+        subgroup_size = int(request.GET.get('subgroup_size', SPC_DEFAULT_SUBGROUP_SIZE))
+        lsl = float(request.GET['lsl']) if request.GET.get('lsl') else None
+        usl = float(request.GET['usl']) if request.GET.get('usl') else None
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'window、subgroup_size、lsl、usl 必须是数字'}, status=400)
+
+    def build_response():
+        try:
+            data = get_spc(report_type, field_name, product_name, window, subgroup_size,
+                           request.GET.get('start_date') or None, request.GET.get('end_date') or None, lsl, usl)
+        except SPCError as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+        except Exception as e:
+            logger.error(f'SPC计算失败 {report_type}.{field_name} {product_name}: {str(e)}', exc_info=True)
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+        return JsonResponse({'status': 'success', 'data': data})
+
+    # 数据未变化时直接返回304
+    return conditional_qc_response(request, report_type, build_response)
+
+
+@login_required
+@permission_required('qc_report_view')
+def qc_trend_api(request):
+    """
+    QC指标趋势接口（服务端降采样）
+    参数: report_type、field 必填；product_name（为空时全部产品）、start_date、end_date（默认最近一年）、
+    points（返回点数，默认500）、method（lttb 选取原始检测值，bucket 按日/周/月汇总最小、最大、平均值）
+    按用户在该厂区的数据权限过滤
+    """
+    from home.utils import get_user_data_filter_by_company_department
+    logger = logging.getLogger(__name__)
+
+    report_type = request.GET.get('report_type', '')
+    profile = get_profiles().get(report_type)
+    if profile is None:
+        return JsonResponse({'status': 'error', 'message': f'未知的报表类型: {report_type}'}, status=400)
+    data_filter = get_user_data_filter_by_company_department(request.user, profile.permission_code, 'username')
+    if 'id' in data_filter and data_filter['id'] is None:
+        return JsonResponse({'status': 'error', 'message': f'没有{profile.label}的查看权限'}, status=403)
+
+    try:
+        end_date = datetime.strptime(request.GET['end_date'], '%Y-%m-%d').date() if request.GET.get('end_date') else date.today()
+        start_date = (datetime.strptime(request.GET['start_date'], '%Y-%m-%d').date() if request.GET.get('start_date')
+                      else end_date - timedelta(days=364))
+        points = int(request.GET.get('points', TREND_DEFAULT_POINTS))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': '日期格式应为YYYY-MM-DD，points 必须是整数'}, status=400)
+
+    def build_response():
+        try:
+            data = get_trend(report_type, request.GET.get('field', ''), start_date, end_date,
+                             request.GET.get('product_name', '').strip(), points,
+                             request.GET.get('method', 'lttb'), data_filter)
+        except TrendError as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+        except Exception as e:
+            logger.error(f'QC趋势查询失败 {report_type}: {str(e)}', exc_info=True)
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+        return JsonResponse({'status': 'success', 'data': data})
+
+    # 数据未变化时直接返回304
+    return conditional_qc_response(request, report_type, build_response)
@@ -18,6 +18,10 @@ import logging
 import urllib.parse
 import hashlib
 import requests
+from datetime import datetime
+
+from home.utils.wechat_approval import parse_approval_event
+from core.middleware import get_client_profile
 
 logger = logging.getLogger(__name__)
 
@@ -115,9 +119,9 @@ def wechat_login(request):
     logger.info(f'wechat_login called, next_url: {next_url}')
 
     # 检测是否来自企业微信
-    user_agent = request.META.get('HTTP_USER_AGENT', '').lower()
-    is_wechat = 'micromessenger' in user_agent or 'wxwork' in user_agent
-    logger.info(f'User-Agent: {user_agent[:100]}..., is_wechat: {is_wechat}')
+    client_profile = get_client_profile(request)
+    is_wechat = client_profile.is_wechat
+    logger.info(f'Client: {client_profile.kind}, is_wechat: {is_wechat}')
 
     # 获取配置
     corp_id = os.environ.get('WECHAT_CORP_ID')
@@ -578,17 +582,18 @@ class WeChatMessageReceiveView(View):
                         logger.error(f'使用解析类型: {parse_event_type}')
                         
                         # 审批状态变化事件
+                        # 获取审批详情、发送通知耗时较长，企业微信5秒内未收到响应会重试推送，
+                        # 因此这里只解析事件并交给Celery异步处理，立即返回success
+                        approval_info = parse_approval_event(root, event_type=parse_event_type)
+                        logger.error(f'审批状态变化事件解析结果: {approval_info}')
                         try:
-                            approval_info = self._parse_approval_event(root, event_type=parse_event_type)
-                            logger.error(f'审批状态变化事件解析结果: {approval_info}')
-                            
-                            # 处理审批事件并发送消息通知
-                            logger.error('开始处理审批事件并发送通知...')
-                            self._process_approval_event_and_notify(approval_info, logger)
-                            logger.error('审批事件处理完成')
+                            from tasks.tasks import process_wechat_approval_event
+                            process_wechat_approval_event.delay(approval_info)
+                            logger.error('审批事件已加入异步处理队列')
                         except Exception as e:
-                            logger.error(f'处理审批事件失败: {str(e)}', exc_info=True)
-                            # 即使通知失败，也返回success，避免企业微信重复推送
+                            # 入队失败时返回错误，由企业微信重试推送（任务端按审批单号+状态去重）
+                            logger.error(f'审批事件入队失败: {str(e)}', exc_info=True)
+                            return HttpResponse('审批事件入队失败', status=500)
                     else:
                         logger.error(f'非审批事件，事件类型: {event_text}，跳过处理')
                             
@@ -630,557 +635,3 @@ def custom_logout(request):
     response.delete_cookie('csrftoken')
 
     return response
-    
-    def _parse_approval_event(self, root, event_type='sys_approval_change'):
-        """
-        解析审批事件XML数据
-        支持两种事件类型：
-        - sys_approval_change: 系统审批变化（实际使用）
-        - open_approval_change: 开放平台审批变化
-        返回结构化的审批信息字典
-        """
-        import xml.etree.ElementTree as ET
-        
-        approval_info = {
-            'agent_id': None,
-            'approval_info': {},
-            'event_type': event_type
-        }
-        
-        # 提取基本信息
-        for child in root:
-            if child.tag == 'AgentID':
-                approval_info['agent_id'] = child.text
-            elif child.tag == 'ApprovalInfo':
-                # 审批信息
-                approval_detail = {}
-                
-                # 根据事件类型解析不同的XML结构
-                if event_type == 'sys_approval_change':
-                    # sys_approval_change 事件结构
-                    for info_child in child:
-                        if info_child.tag == 'SpNo':
-                            approval_detail['ThirdNo'] = info_child.text  # 审批单号
-                        elif info_child.tag == 'SpName':
-                            approval_detail['OpenSpName'] = info_child.text  # 审批模板名称
-                        elif info_child.tag == 'SpStatus':
-                            approval_detail['OpenSpStatus'] = info_child.text  # 审批状态
-                        elif info_child.tag == 'ApplyTime':
-                            approval_detail['ApplyTime'] = info_child.text  # 申请时间
-                        elif info_child.tag == 'Applyer':
-                            # 申请人信息
-                            for applyer_child in info_child:
-                                if applyer_child.tag == 'UserId':
-                                    approval_detail['ApplyUserId'] = applyer_child.text
-                                    approval_detail['ApplyUserName'] = applyer_child.text  # 暂时用UserID，后续可以从企业微信API获取姓名
-                        elif info_child.tag == 'SpRecord':
-                            # 审批记录（审批人信息）
-                            if 'approval_nodes' not in approval_detail:
-                                approval_detail['approval_nodes'] = []
-                            
-                            node_info = {}
-                            item_info = {}  # 初始化item_info
-                            for record_child in info_child:
-                                if record_child.tag == 'SpStatus':
-                                    node_info['NodeStatus'] = record_child.text
-                                elif record_child.tag == 'Details':
-                                    # 审批人详情
-                                    items = []
-                                    for detail_child in record_child:
-                                        if detail_child.tag == 'Approver':
-                                            # 处理审批人信息
-                                            for approver_child in detail_child:
-                                                if approver_child.tag == 'UserId':
-                                                    item_info = {
-                                                        'ItemUserId': approver_child.text,
-                                                        'ItemName': approver_child.text  # 暂时用UserID
-                                                    }
-                                        elif detail_child.tag == 'Speech':
-                                            # 审批意见
-                                            if item_info:
-                                                item_info['ItemSpeech'] = detail_child.text
-                                        elif detail_child.tag == 'SpStatus':
-                                            # 审批状态
-                                            if item_info:
-                                                item_info['ItemStatus'] = detail_child.text
-                                    
-                                    # 如果收集到了审批人信息，添加到列表
-                                    if item_info and item_info.get('ItemUserId'):
-                                        items.append(item_info)
-                                    node_info['items'] = items
-                            
-                            if node_info:
-                                approval_detail['approval_nodes'].append(node_info)
-                        else:
-                            approval_detail[info_child.tag] = info_child.text
-                
-                elif event_type == 'open_approval_change':
-                    # open_approval_change 事件结构（原有逻辑）
-                    for info_child in child:
-                        if info_child.tag == 'ApprovalNode':
-                            # 审批节点信息
-                            nodes = []
-                            for node in info_child:
-                                node_info = {}
-                                for node_child in node:
-                                    if node_child.tag == 'Items':
-                                        # 审批人列表
-                                        items = []
-                                        for item in node_child:
-                                            item_info = {}
-                                            for item_child in item:
-                                                item_info[item_child.tag] = item_child.text
-                                            items.append(item_info)
-                                        node_info['items'] = items
-                                    else:
-                                        node_info[node_child.tag] = node_child.text
-                                nodes.append(node_info)
-                            approval_detail['approval_nodes'] = nodes
-                        else:
-                            approval_detail[info_child.tag] = info_child.text
-                
-                approval_info['approval_info'] = approval_detail
-        
-        return approval_info
-    
-    def _get_wechat_access_token(self, logger):
-        """
-        获取企业微信access_token
-        返回access_token，失败返回None
-        """
-        try:
-            import requests
-            
-            # 获取企业微信配置
-            corp_id = os.environ.get('WECHAT_CORP_ID')
-            corp_secret = os.environ.get('WECHAT_APP_SECRET')
-            
-            if not corp_id or not corp_secret:
-                logger.error('缺少企业微信配置')
-                return None
-            
-            # 获取access_token
-            token_url = f'https://qyapi.weixin.qq.com/cgi-bin/gettoken?corpid={corp_id}&corpsecret={corp_secret}'
-            token_resp = requests.get(token_url, timeout=10)
-            token_data = token_resp.json()
-            
-            if token_data.get('errcode') != 0:
-                logger.error(f'获取access_token失败: {token_data}')
-                return None
-            
-            return token_data.get('access_token')
-            
-        except Exception as e:
-            logger.error(f'获取access_token失败: {str(e)}', exc_info=True)
-            return None
-    
-    def _get_approval_detail(self, sp_no, logger):
-        """
-        通过审批单号获取审批详情（包含具体审批内容）
-        返回审批详情字典，失败返回None
-        """
-        try:
-            import requests
-            
-            access_token = self._get_wechat_access_token(logger)
-            if not access_token:
-                return None
-            
-            # 调用企业微信API获取审批详情
-            detail_url = f'https://qyapi.weixin.qq.com/cgi-bin/oa/getapprovaldetail?access_token={access_token}'
-            detail_data = {
-                "sp_no": sp_no
-            }
-            
-            response = requests.post(detail_url, json=detail_data, timeout=10)
-            result = response.json()
-            
-            if result.get('errcode') != 0:
-                logger.error(f'获取审批详情失败: {result}')
-                return None
-            
-            logger.info(f'成功获取审批详情: {sp_no}')
-            return result
-            
-        except Exception as e:
-            logger.error(f'获取审批详情失败: {str(e)}', exc_info=True)
-            return None
-    
-    def _extract_title_text(self, title):
-        """
-        从标题字段中提取中文文本
-        title可能是字符串或多语言数组
-        """
-        if isinstance(title, str):
-            return title
-        elif isinstance(title, list):
-            # 多语言数组，优先提取中文
-            for item in title:
-                if isinstance(item, dict):
-                    lang = item.get('lang', '')
-                    text = item.get('text', '')
-                    if lang == 'zh_CN' and text:
-                        return text
-                    elif text and not lang:  # 如果没有lang字段，也使用
-                        return text
-            # 如果没找到中文，返回第一个有text的
-            for item in title:
-                if isinstance(item, dict):
-                    text = item.get('text', '')
-                    if text:
-                        return text
-        return str(title) if title else ''
-    
-    def _extract_field_value(self, control, value):
-        """
-        根据控件类型提取字段的实际值
-        返回格式化后的字符串，如果为空或不需要显示则返回None
-        """
-        from datetime import datetime
-        
-        # 不显示的控件类型（附件、图片等）
-        skip_controls = ['File', 'Image', 'Attach', 'Attachment']
-        if control in skip_controls:
-            return None
-        
-        # 如果value为空或None
-        if not value:
-            return None
-        
-        # 如果value直接是字符串，且不是附件类型，直接返回
-        if isinstance(value, str) and control not in skip_controls:
-            return value.strip() if value.strip() else None
-        
-        # 文本类型控件
-        if control in ['Text', 'Textarea', 'TextArea', '']:
-            # 如果是字典，提取text字段
-            if isinstance(value, dict):
-                text = value.get('text', '')
-                # 如果text为空，检查是否是空字典（只有空数组字段）
-                if not text:
-                    # 检查是否有非空的有效字段
-                    has_content = any(
-                        v for k, v in value.items() 
-                        if k not in ['tips', 'members', 'departments', 'files', 'children', 
-                                    'stat_field', 'sum_field', 'related_approval', 'students', 
-                                    'classes', 'docs', 'wedrive_files'] and v
-                    )
-                    if not has_content:
-                        return None
-                return text.strip() if text else None
-            return None
-        
-        # 日期时间类型控件
-        if control in ['Date', 'DateTime', 'DateRange']:
-            if isinstance(value, dict):
-                date_info = value.get('date', {})
-                if isinstance(date_info, dict):
-                    s_timestamp = date_info.get('s_timestamp', '')
-                    if s_timestamp:
-                        try:
-                            dt = datetime.fromtimestamp(int(s_timestamp))
-                            return dt.strftime('%Y-%m-%d %H:%M:%S')
-                        except:
-                            pass
-                # 尝试直接获取text字段
-                text = value.get('text', '')
-                if text:
-                    return text
-            elif isinstance(value, (str, int)):
-                try:
-                    dt = datetime.fromtimestamp(int(value))
-                    return dt.strftime('%Y-%m-%d %H:%M:%S')
-                except:
-                    return str(value) if value else None
-            return None
-        
-        # 数字类型控件
-        if control in ['Number', 'Money']:
-            if isinstance(value, dict):
-                num = value.get('number', '') or value.get('value', '')
-                return str(num) if num else None
-            return str(value) if value else None
-        
-        # 选择类型控件（单选、多选）
-        if control in ['Selector', 'MultiSelector', 'Contact', 'Table']:
-            if isinstance(value, list):
-                text_values = []
-                for v in value:
-                    if isinstance(v, dict):
-                        text = v.get('text', '') or v.get('title', '') or v.get('name', '')
-                        if text:
-                            text_values.append(str(text))
-                    elif isinstance(v, (str, int, float)):
-                        text_values.append(str(v))
-                return '、'.join(text_values) if text_values else None
-            elif isinstance(value, dict):
-                text = value.get('text', '') or value.get('title', '') or value.get('name', '')
-                return text if text else None
-            return str(value) if value else None
-        
-        # 默认处理：尝试提取文本值
-        if isinstance(value, dict):
-            # 检查是否是空字典（只有空数组字段）
-            # 排除这些常见的空字段
-            empty_keys = ['tips', 'members', 'departments', 'files', 'children', 
-                         'stat_field', 'sum_field', 'related_approval', 'students', 
-                         'classes', 'docs', 'wedrive_files']
-            
-            has_content = False
-            for k, v in value.items():
-                if k in empty_keys:
-                    continue
-                if k in ['text', 'title', 'value', 'number'] and v:
-                    has_content = True
-                    break
-                elif isinstance(v, dict) and v:
-                    # 检查嵌套字典是否有内容
-                    nested_has_content = any(
-                        nv for nk, nv in v.items() 
-                        if nk not in empty_keys and nv
-                    )
-                    if nested_has_content:
-                        has_content = True
-                        break
-                elif isinstance(v, list) and v:
-                    has_content = True
-                    break
-                elif v and k not in empty_keys:
-                    has_content = True
-                    break
-            
-            if not has_content:
-                return None
-            
-            # 尝试提取文本
-            text = value.get('text', '') or value.get('title', '') or value.get('value', '')
-            if text:
-                return str(text)
-            return None
-        elif isinstance(value, list):
-            # 列表类型，提取文本值
-            text_values = []
-            for v in value:
-                if isinstance(v, dict):
-                    text = v.get('text', '') or v.get('title', '')
-                    if text:
-                        text_values.append(str(text))
-                elif isinstance(v, (str, int, float)) and v:
-                    text_values.append(str(v))
-            return '、'.join(text_values) if text_values else None
-        elif isinstance(value, (str, int, float)):
-            return str(value) if value else None
-        
-        return None
-    
-    def _format_approval_content(self, approval_detail, logger):
-        """
-        格式化审批内容，从审批详情中提取具体内容字段
-        返回格式化的审批内容字符串
-        """
-        try:
-            if not approval_detail:
-                return ""
-            
-            info = approval_detail.get('info', {})
-            apply_data = info.get('apply_data', {})
-            
-            if not apply_data:
-                return ""
-            
-            content_lines = []
-            
-            # 遍历apply_data中的字段
-            contents = apply_data.get('contents', [])
-            for content_item in contents:
-                control = content_item.get('control', '')
-                title_raw = content_item.get('title', '')
-                value = content_item.get('value', [])
-                
-                # 提取标题文本（中文）
-                title_text = self._extract_title_text(title_raw)
-                
-                # 提取字段值
-                value_str = self._extract_field_value(control, value)
-                
-                # 只显示有值的字段
-                if value_str and value_str.strip():
-                    content_lines.append(f"  • {title_text}：{value_str}")
-            
-            # 如果没有有效内容，返回空字符串
-            if not content_lines:
-                return ""
-            
-            # 构建完整内容
-            result = "📋 审批内容：\n" + "\n".join(content_lines) + "\n"
-            return result
-            
-        except Exception as e:
-            logger.error(f'格式化审批内容失败: {str(e)}', exc_info=True)
-            return ""
-    
-    def _send_approval_notification(self, userid, message_content, logger):
-        """
-        发送审批通知消息给指定用户
-        """
-        try:
-            import requests
-            
-            # 获取企业微信配置
-            corp_id = os.environ.get('WECHAT_CORP_ID')
-            corp_secret = os.environ.get('WECHAT_APP_SECRET')
-            agent_id = os.environ.get('WECHAT_AGENT_ID', '1000016')
-            
-            if not corp_id or not corp_secret:
-                logger.error('缺少企业微信配置，无法发送消息')
-                return False
-            
-            # 获取access_token
-            access_token = self._get_wechat_access_token(logger)
-            if not access_token:
-                return False
-            
-            # 发送消息给指定用户
-            message_url = f'https://qyapi.weixin.qq.com/cgi-bin/message/send?access_token={access_token}'
-            
-            message_data = {
-                "touser": userid,
-                "msgtype": "text",
-                "agentid": agent_id,
-                "text": {
-                    "content": message_content
-                }
-            }
-            
-            response = requests.post(message_url, json=message_data, timeout=10)
-            result = response.json()
-            
-            if result.get('errcode') != 0:
-                logger.error(f'发送消息给{userid}失败: {result}')
-                return False
-            
-            logger.info(f'成功发送审批通知消息给{userid}')
-            return True
-            
-        except Exception as e:
-            logger.error(f'发送审批通知消息给{userid}失败: {str(e)}', exc_info=True)
-            return False
-    
-    def _process_approval_event_and_notify(self, approval_info, logger):
-        """
-        处理审批事件并发送通知消息给相关用户
-        """
-        approval_detail = approval_info.get('approval_info', {})
-        
-        # 提取审批信息
-        third_no = approval_detail.get('ThirdNo', '')  # 审批单号
-        open_sp_name = approval_detail.get('OpenSpName', '')  # 审批模板名称
-        open_sp_status = approval_detail.get('OpenSpStatus', '')  # 审批状态
-        apply_user_name = approval_detail.get('ApplyUserName', '')  # 申请人姓名
-        apply_user_id = approval_detail.get('ApplyUserId', '')  # 申请人UserID
-        apply_time = approval_detail.get('ApplyTime', '')  # 申请时间
-        
-        # 审批状态映射
-        status_map = {
-            '1': '审批中',
-            '2': '已通过',
-            '3': '已驳回',
-            '4': '已撤销',
-            '6': '已转审'
-        }
-        status_text = status_map.get(open_sp_status, f'未知状态({open_sp_status})')
-        
-        # 格式化申请时间
-        try:
-            from datetime import datetime
-            if apply_time:
-                apply_time_int = int(apply_time)
-                apply_time_str = datetime.fromtimestamp(apply_time_int).strftime('%Y-%m-%d %H:%M:%S')
-            else:
-                apply_time_str = '未知时间'
-        except:
-            apply_time_str = apply_time or '未知时间'
-        
-        # 获取审批详情（包含具体审批内容）
-        approval_detail_data = None
-        approval_content_text = ""
-        if third_no:
-            logger.info(f'开始获取审批详情: {third_no}')
-            approval_detail_data = self._get_approval_detail(third_no, logger)
-            if approval_detail_data:
-                approval_content_text = self._format_approval_content(approval_detail_data, logger)
-                if approval_content_text:
-                    logger.info(f'成功获取并格式化审批内容')
-                else:
-                    logger.info(f'审批详情中未找到具体内容字段')
-            else:
-                logger.warning(f'获取审批详情失败，将只发送基本信息')
-        
-        # 构建消息内容
-        message_content = f"""📋 审批状态通知
-
-📝 审批单号：{third_no}
-📄 审批模板：{open_sp_name}
-👤 申请人：{apply_user_name}
-⏰ 申请时间：{apply_time_str}
-✅ 审批状态：{status_text}
-
-"""
-        
-        # 添加审批内容（如果有）
-        if approval_content_text:
-            message_content += approval_content_text
-        
-        # 提取审批节点信息，获取审批人
-        approval_nodes = approval_detail.get('approval_nodes', [])
-        notified_users = set()  # 用于去重
-        
-        # 通知申请人
-        if apply_user_id and apply_user_id not in notified_users:
-            logger.info(f'准备通知申请人: {apply_user_id} ({apply_user_name})')
-            user_message = message_content + "💡 这是您提交的审批申请。"
-            success = self._send_approval_notification(apply_user_id, user_message, logger)
-            if success:
-                logger.info(f'成功通知申请人: {apply_user_id}')
-            else:
-                logger.error(f'通知申请人失败: {apply_user_id}')
-            notified_users.add(apply_user_id)
-        else:
-            logger.warning(f'跳过通知申请人，原因: apply_user_id={apply_user_id}, 已在通知列表={apply_user_id in notified_users if apply_user_id else "N/A"}')
-        
-        # 通知审批人
-        for node in approval_nodes:
-            node_status = node.get('NodeStatus', '')
-            items = node.get('items', [])
-            
-            for item in items:
-                item_user_id = item.get('ItemUserId', '')
-                item_user_name = item.get('ItemName', '')
-                item_status = item.get('ItemStatus', '')
-                item_speech = item.get('ItemSpeech', '')  # 审批意见
-                
-                if item_user_id and item_user_id not in notified_users:
-                    logger.info(f'准备通知审批人: {item_user_id} ({item_user_name}), 节点状态: {node_status}, 审批状态: {item_status}')
-                    # 构建审批人专属消息
-                    approver_message = message_content
-                    
-                    # 添加审批意见（如果有）
-                    if item_speech:
-                        approver_message += f"💬 审批意见：{item_speech}\n\n"
-                    
-                    # 根据节点状态添加提示
-                    if node_status == '1':
-                        approver_message += "⏳ 该审批正在等待您的处理。"
-                    elif node_status == '2':
-                        approver_message += "✅ 您已同意该审批。"
-                    elif node_status == '3':
-                        approver_message += "❌ 您已驳回该审批。"
-                    
-                    success = self._send_approval_notification(item_user_id, approver_message, logger)
-                    if success:
-                        logger.info(f'成功通知审批人: {item_user_id}')
-                    else:
-                        logger.error(f'通知审批人失败: {item_user_id}')
-                    notified_users.add(item_user_id)
-        
-        logger.info(f'审批事件处理完成，已通知 {len(notified_users)} 位用户')
\ No newline at end of file
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+负载测试脚本：在上游接口（EAS）有延迟时对比 gunicorn 各工作模式的吞吐量和延迟
+
+启动一个延迟可控的模拟EAS服务，按工作模式依次启动 gunicorn（EAS_API_HOST 指向模拟服务，
+EAS 缓存有效期设为0，每个请求都回源），用多个并发客户端持续请求目标页面，输出吞吐量和延迟分位数。
+
+用法（在项目根目录执行，需要能连接 settings 中配置的数据库）:
+  python scripts/load_test.py --user GaoBieKeLe
+  python scripts/load_test.py --user GaoBieKeLe --profiles sync,gthread --latency 0.5 --concurrency 32 --duration 20
+  python scripts/load_test.py --url http://127.0.0.1:8000 --cookie "sessionid=xxx"   # 压测已运行的服务
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 工作模式 -> gunicorn worker_class
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+}
+
+
+def make_upstream_handler(latency):
+    class FakeEASHandler(BaseHTTPRequestHandler):
+        """模拟EAS查询接口：等待 latency 秒后返回空单据列表"""
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            self.rfile.read(length)
+            time.sleep(latency)
+            body = json.dumps({'data': []}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeEASHandler
+
+
+def start_upstream(latency):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_upstream_handler(latency))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def create_session_cookie(username):
+    """直接在会话存储中为用户创建登录会话，返回 Cookie 请求头的值"""
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yuantong.settings')
+    import django
+    django.setup()
+
+    from importlib import import_module
+
+    from django.conf import settings
+    from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+    from django.contrib.auth.models import User
+
+    user = User.objects.get(username=username)
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+
+
+def start_gunicorn(profile, port, workers, threads, upstream_url):
+    env = dict(
+        os.environ,
+        EAS_API_HOST=upstream_url,
+        EAS_CACHE_TODAY_TTL='0',
+        EAS_CACHE_HISTORY_TTL='0',
+    )
+    pidfile = os.path.join(tempfile.gettempdir(), f'yuantong_load_test_{port}.pid')
+    cmd = [
+        sys.executable, '-m', 'gunicorn', 'yuantong.wsgi:application',
+        '-c', 'gunicorn.conf.py',
+        '--bind', f'127.0.0.1:{port}',
+        '--worker-class', WORKER_CLASSES[profile],
+        '--workers', str(workers),
+        '--threads', str(threads),
+        '--pid', pidfile,
+        '--access-logfile', os.devnull,
+        '--error-logfile', '-',
+    ]
+    return subprocess.Popen(cmd, cwd=PROJECT_DIR, env=env)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """不跟随重定向：未登录时的登录页跳转记为失败"""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def run_load(url, cookie, concurrency, duration, timeout):
+    """并发请求 url 持续 duration 秒，返回 (成功请求延迟列表, 失败数, 失败原因计数)"""
+    opener = urllib.request.build_opener(_NoRedirect)
+    headers = {
+        # 生产配置开启了 SECURE_SSL_REDIRECT，模拟 nginx 转发的 HTTPS 请求
+        'X-Forwarded-Proto': 'https',
+    }
+    if cookie:
+        headers['Cookie'] = cookie
+
+    latencies = []
+    errors = {}
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def worker():
+        while time.time() < deadline:
+            started = time.perf_counter()
+            try:
+                with opener.open(urllib.request.Request(url, headers=headers), timeout=timeout) as resp:
+                    resp.read()
+                    status = resp.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            with lock:
+                if status == 200:
+                    latencies.append(elapsed)
+                else:
+                    errors[status] = errors.get(status, 0) + 1
+
+    clients = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    return latencies, sum(errors.values()), errors
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    index = min(int(len(values) * pct / 100), len(values) - 1)
+    return values[index]
+
+
+def summarize(name, latencies, error_count, errors, duration):
+    latencies = sorted(latencies)
+    return {
+        'name': name,
+        'ok': len(latencies),
+        'errors': error_count,
+        'error_detail': errors,
+        'rps': len(latencies) / duration,
+        'p50': percentile(latencies, 50) * 1000,
+        'p95': percentile(latencies, 95) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+    }
+
+
+def print_report(results):
+    print()
+    print(f"{'模式':<24}{'成功':>8}{'失败':>8}{'吞吐(req/s)':>14}{'P50(ms)':>10}{'P95(ms)':>10}{'P99(ms)':>10}")
+    for r in results:
+        print(f"{r['name']:<24}{r['ok']:>8}{r['errors']:>8}{r['rps']:>14.1f}"
+              f"{r['p50']:>10.0f}{r['p95']:>10.0f}{r['p99']:>10.0f}")
+        if r['error_detail']:
+            print(f"  失败原因: {r['error_detail']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='gunicorn 工作模式负载测试')
+    parser.add_argument('--path', default='/production/history/', help='压测路径（默认 /production/history/）')
+    parser.add_argument('--user', help='用于创建登录会话的用户名')
+    parser.add_argument('--cookie', help='直接指定 Cookie 请求头，如 "sessionid=xxx"')
+    parser.add_argument('--url', help='压测已运行的服务（如 http://127.0.0.1:8000），不启动 gunicorn 和模拟EAS')
+    parser.add_argument('--profiles', default='sync,gthread', help='依次测试的工作模式，逗号分隔')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn 进程数（默认2）')
+    parser.add_argument('--threads', type=int, default=4, help='gthread 模式每个进程的线程数（默认4）')
+    parser.add_argument('--latency', type=float, default=0.5, help='模拟EAS响应延迟秒数（默认0.5）')
+    parser.add_argument('--concurrency', type=int, default=16, help='并发客户端数（默认16）')
+    parser.add_argument('--duration', type=float, default=15, help='每个模式的压测秒数（默认15）')
+    parser.add_argument('--timeout', type=float, default=60, help='单个请求超时秒数（默认60）')
+    args = parser.parse_args()
+
+    cookie = args.cookie
+    if not cookie and args.user:
+        cookie = create_session_cookie(args.user)
+    if not cookie:
+        print('提示: 未指定 --user 或 --cookie，需要登录的页面会全部记为失败（302）')
+
+    if args.url:
+        latencies, error_count, errors = run_load(
+            args.url.rstrip('/') + args.path, cookie, args.concurrency, args.duration, args.timeout
+        )
+        print_report([summarize(args.url, latencies, error_count, errors, args.duration)])
+        return
+
+    profiles = [p.strip() for p in args.profiles.split(',') if p.strip()]
+    unknown = [p for p in profiles if p not in WORKER_CLASSES]
+    if unknown:
+        parser.error(f"未知的工作模式: {', '.join(unknown)}（可选: {', '.join(WORKER_CLASSES)}）")
+
+    upstream = start_upstream(args.latency)
+    upstream_url = f'http://127.0.0.1:{upstream.server_address[1]}'
+    print(f'模拟EAS服务: {upstream_url}，延迟 {args.latency}s')
+
+    results = []
+    try:
+        for profile in profiles:
+            port = free_port()
+            process = start_gunicorn(profile, port, args.workers, args.threads, upstream_url)
+            try:
+                if not wait_for_port(port):
+                    print(f'{profile}: gunicorn 启动超时')
+                    continue
+                threads = args.threads if profile == 'gthread' else 1
+                name = f'{profile} ({args.workers}x{threads})'
+                print(f'压测 {name}: 并发 {args.concurrency}，持续 {args.duration}s ...')
+                latencies, error_count, errors = run_load(
+                    f'http://127.0.0.1:{port}{args.path}', cookie, args.concurrency, args.duration, args.timeout
+                )
+                results.append(summarize(name, latencies, error_count, errors, args.duration))
+            finally:
+                process.terminate()
+                try:
+                    process.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+    finally:
+        upstream.shutdown()
+
+    print_report(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -120,6 +120,18 @@ document.addEventListener('DOMContentLoaded', function() {
 // 历史数据加载和渲染（大塬专用）
 let currentPageSize = 10;
 
+// 历史记录表格的列（按显示顺序）
+const dayuanHistoryFields = [
+    'username', 'date', 'time', 'moisture_after_drying', 'alkali_content', 'flux', 'product_name',
+    'permeability', 'permeability_long', 'wet_cake_density', 'bulk_density',
+    'sieving_14m', 'sieving_30m', 'sieving_40m', 'sieving_80m', 'sieving_100m', 'sieving_150m',
+    'sieving_200m', 'sieving_325m', 'fe_ion', 'ca_ion', 'al_ion', 'brightness',
+    'swirl', 'odor', 'conductance', 'ph', 'oil_absorption', 'water_absorption',
+    'moisture', 'bags', 'packaging', 'tons', 'batch_number', 'remarks', 'shift'
+];
+// 列表接口 ?fields=：只查询表格显示的列和操作列需要的权限字段
+const dayuanHistoryQueryFields = [...dayuanHistoryFields, 'can_edit', 'can_delete', 'permission_reason'].join(',');
+
 
 async function loadDayuanHistoryData(page = 1, pageSize = 10) {
     const filterForm = document.getElementById('filterForm');
@@ -149,6 +161,7 @@ async function loadDayuanHistoryData(page = 1, pageSize = 10) {
         }
     }
     
+    params.set('fields', dayuanHistoryQueryFields);
     const apiUrl = `/api/dayuan-report/?${params.toString()}`;
     console.log('🌐 API请求URL:', apiUrl);
     
@@ -204,19 +217,10 @@ function displayDayuanHistoryData(data) {
         tbody.innerHTML = '<tr><td colspan="37" style="text-align: center; padding: 40px; color: #666;">暂无数据</td></tr>';
         return;
     }
-    // 大塬字段顺序
-    const dayuanFields = [
-        'username', 'date', 'time', 'moisture_after_drying', 'alkali_content', 'flux', 'product_name',
-        'permeability', 'permeability_long', 'wet_cake_density', 'bulk_density',
-        'sieving_14m', 'sieving_30m', 'sieving_40m', 'sieving_80m', 'sieving_100m', 'sieving_150m',
-        'sieving_200m', 'sieving_325m', 'fe_ion', 'ca_ion', 'al_ion', 'brightness',
-        'swirl', 'odor', 'conductance', 'ph', 'oil_absorption', 'water_absorption',
-        'moisture', 'bags', 'packaging', 'tons', 'batch_number', 'remarks', 'shift'
-    ];
     data.forEach(item => {
         const row = document.createElement('tr');
         let tds = '';
-        dayuanFields.forEach(field => {
+        dayuanHistoryFields.forEach(field => {
             tds += `<td>${item[field] !== undefined && item[field] !== null && item[field] !== '' ? item[field] : '-'}</td>`;
         });
         // 操作列
@@ -93,6 +93,18 @@ document.addEventListener('DOMContentLoaded', function() {
 
 // 历史数据加载和渲染（xinghui专用）
 let currentPageSize = 10;
+
+// 历史记录表格的列（按显示顺序）
+const xinghuiHistoryFields = [
+    'username', 'date', 'time', 'moisture_after_drying', 'alkali_content', 'flux', 'product_name',
+    'permeability', 'permeability_long','xinghui_permeability', 'wet_cake_density', 'bulk_density',
+    'sieving_14m', 'sieving_30m', 'sieving_40m', 'sieving_80m', 'sieving_100m', 'sieving_150m',
+    'sieving_200m', 'sieving_325m', 'fe_ion', 'ca_ion', 'al_ion', 'brightness',
+    'swirl', 'odor', 'conductance', 'ph', 'oil_absorption', 'water_absorption',
+    'moisture', 'bags', 'packaging', 'tons', 'batch_number', 'remarks', 'shift'
+];
+// 列表接口 ?fields=：只查询表格显示的列和操作列需要的权限字段
+const xinghuiHistoryQueryFields = [...xinghuiHistoryFields, 'can_edit', 'can_delete', 'permission_reason'].join(',');
 async function loadXinghuiHistoryData(page = 1, pageSize = 10) {
     currentPage = page;
     pageSize = pageSize;
@@ -115,6 +127,7 @@ async function loadXinghuiHistoryData(page = 1, pageSize = 10) {
             }
         }
     }
+    params.set('fields', xinghuiHistoryQueryFields);
     const apiUrl = `/api/xinghui-report/?${params.toString()}`;
     try {
         const response = await fetch(apiUrl, {
@@ -164,19 +177,10 @@ function displayXinghuiHistoryData(data) {
         tbody.innerHTML = '<tr><td colspan="36" style="text-align: center; padding: 40px; color: #666;">暂无数据</td></tr>';
         return;
     }
-    // 大塬字段顺序
-    const xinghuiFields = [
-        'username', 'date', 'time', 'moisture_after_drying', 'alkali_content', 'flux', 'product_name',
-        'permeability', 'permeability_long','xinghui_permeability', 'wet_cake_density', 'bulk_density',
-        'sieving_14m', 'sieving_30m', 'sieving_40m', 'sieving_80m', 'sieving_100m', 'sieving_150m',
-        'sieving_200m', 'sieving_325m', 'fe_ion', 'ca_ion', 'al_ion', 'brightness',
-        'swirl', 'odor', 'conductance', 'ph', 'oil_absorption', 'water_absorption',
-        'moisture', 'bags', 'packaging', 'tons', 'batch_number', 'remarks', 'shift'
-    ];
     data.forEach(item => {
         const row = document.createElement('tr');
         let tds = '';
-        xinghuiFields.forEach(field => {
+        xinghuiHistoryFields.forEach(field => {
             tds += `<td>${item[field] !== undefined && item[field] !== null && item[field] !== '' ? item[field] : '-'}</td>`;
         });
         // 操作列
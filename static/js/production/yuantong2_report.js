@@ -252,6 +252,7 @@ function initCalculationLogic() {
             }
             params.set('page', 1); // 强制重置页码为1
             params.set('page_size', currentPageSize); // 使用当前每页大小
+            params.set('fields', yuantong2HistoryQueryFields);
             const apiUrl = `/api/yuantong2-report/?${params.toString()}`;
             try {
                 const response = await fetch(apiUrl, {
@@ -623,6 +624,18 @@ function calculateForCalcined(skipAutoFill = false) {
 
 let currentPageSize = 10;
 
+// 历史记录表格的列（按显示顺序）
+const yuantong2HistoryFields = [
+    'username', 'date', 'time', 'moisture_after_drying', 'alkali_content', 'flux', 'product_name',
+    'permeability', 'permeability_long',  'filter_time','water_viscosity','cake_thickness','wet_cake_density','yuantong_cake_density','changfu_cake_density','bulk_density',
+    'sieving_14m', 'sieving_30m', 'sieving_40m', 'sieving_80m', 'sieving_100m', 'sieving_150m',
+    'sieving_200m', 'sieving_325m', 'fe_ion', 'ca_ion', 'al_ion', 'brightness',
+    'swirl', 'odor', 'conductance', 'ph', 'oil_absorption', 'water_absorption',
+    'moisture', 'bags', 'packaging', 'tons', 'batch_number', 'remarks', 'shift'
+];
+// 列表接口 ?fields=：只查询表格显示的列和操作列需要的权限字段
+const yuantong2HistoryQueryFields = [...yuantong2HistoryFields, 'can_edit', 'can_delete', 'permission_reason'].join(',');
+
 async function loadYuantong2HistoryData(page = 1, pageSize = currentPageSize) {
     const filterForm = document.getElementById('filterForm');
     const params = new URLSearchParams();
@@ -645,6 +658,7 @@ async function loadYuantong2HistoryData(page = 1, pageSize = currentPageSize) {
     }
     params.set('page', page);
     params.set('page_size', pageSize);
+    params.set('fields', yuantong2HistoryQueryFields);
     const apiUrl = `/api/yuantong2-report/?${params.toString()}`;
     try {
         const response = await fetch(apiUrl, {
@@ -686,19 +700,10 @@ function displayYuantong2HistoryData(data) {
         tbody.innerHTML = '<tr><td colspan="38" style="text-align: center; padding: 40px; color: #666;">暂无数据</td></tr>';
         return;
     }
-    // yuangtong字段顺序
-    const yuantong2Fields = [
-        'username', 'date', 'time', 'moisture_after_drying', 'alkali_content', 'flux', 'product_name',
-        'permeability', 'permeability_long',  'filter_time','water_viscosity','cake_thickness','wet_cake_density','yuantong_cake_density','changfu_cake_density','bulk_density',
-        'sieving_14m', 'sieving_30m', 'sieving_40m', 'sieving_80m', 'sieving_100m', 'sieving_150m',
-        'sieving_200m', 'sieving_325m', 'fe_ion', 'ca_ion', 'al_ion', 'brightness',
-        'swirl', 'odor', 'conductance', 'ph', 'oil_absorption', 'water_absorption',
-        'moisture', 'bags', 'packaging', 'tons', 'batch_number', 'remarks', 'shift'
-    ];
     data.forEach(item => {
         const row = document.createElement('tr');
         let tds = '';
-        yuantong2Fields.forEach(field => {
+        yuantong2HistoryFields.forEach(field => {
             tds += `<td>${item[field] !== undefined && item[field] !== null && item[field] !== '' ? item[field] : '-'}</td>`;
         });
         // 操作列
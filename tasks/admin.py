@@ -3,7 +3,7 @@ from django.db.models import Count, Avg, Sum, Q
 from django.db.models.functions import TruncDate, TruncHour
 from django.utils import timezone
 from datetime import timedelta
-from .models import TaskLog, QCReportSchedule
+from .models import TaskLog, QCReportSchedule, WeChatEventReceipt
 
 
 @admin.register(TaskLog)
@@ -61,3 +61,12 @@ class QCReportScheduleAdmin(admin.ModelAdmin):
             level='success'
         )
 
+
+
+@admin.register(WeChatEventReceipt)
+class WeChatEventReceiptAdmin(admin.ModelAdmin):
+    list_display = ['sp_no', 'sp_status', 'status', 'notified_count', 'created_at', 'processed_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['sp_no', 'idempotency_key']
+    readonly_fields = ['created_at', 'processed_at']
+    ordering = ['-created_at']
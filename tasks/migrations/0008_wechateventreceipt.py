@@ -0,0 +1,31 @@
+# Generated by Django 4.2.10 on 2026-10-19 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_qianlimamessageschedule_qianlimamessagetemplate_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeChatEventReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=200, unique=True, verbose_name='幂等键')),
+                ('sp_no', models.CharField(db_index=True, max_length=100, verbose_name='审批单号')),
+                ('sp_status', models.CharField(blank=True, max_length=20, verbose_name='审批状态')),
+                ('status', models.CharField(choices=[('processing', '处理中'), ('done', '已完成')], default='processing', max_length=20, verbose_name='处理状态')),
+                ('notified_count', models.IntegerField(default=0, verbose_name='通知人数')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='接收时间')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='处理完成时间')),
+            ],
+            options={
+                'verbose_name': '企业微信事件幂等记录',
+                'verbose_name_plural': '企业微信事件幂等记录',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-19 18:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_wechateventreceipt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wechateventreceipt',
+            name='notified_users',
+            field=models.JSONField(blank=True, default=list, verbose_name='已通知用户'),
+        ),
+    ]
@@ -67,3 +67,28 @@ class QCReportSchedule(models.Model):
     def is_active(self):
         """检查是否激活"""
         return self.is_enabled and self.recipient_userid
+
+
+class WeChatEventReceipt(models.Model):
+    """企业微信回调事件幂等记录（按审批单号+审批状态去重，notified_users 记录已成功通知的用户，重试时不重复发送）"""
+    STATUS_CHOICES = [
+        ('processing', '处理中'),
+        ('done', '已完成'),
+    ]
+
+    idempotency_key = models.CharField('幂等键', max_length=200, unique=True)
+    sp_no = models.CharField('审批单号', max_length=100, db_index=True)
+    sp_status = models.CharField('审批状态', max_length=20, blank=True)
+    status = models.CharField('处理状态', max_length=20, choices=STATUS_CHOICES, default='processing')
+    notified_count = models.IntegerField('通知人数', default=0)
+    notified_users = models.JSONField('已通知用户', default=list, blank=True)
+    created_at = models.DateTimeField('接收时间', auto_now_add=True)
+    processed_at = models.DateTimeField('处理完成时间', null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = '企业微信事件幂等记录'
+        verbose_name_plural = '企业微信事件幂等记录'
+
+    def __str__(self):
+        return f"{self.sp_no} - {self.sp_status} - {self.get_status_display()}"
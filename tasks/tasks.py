@@ -12,13 +12,10 @@ from django.conf import settings
 from django.utils import timezone
 from django.http import HttpResponse
 from home.models import DayuanQCReport, DongtaiQCReport, ChangfuQCReport, XinghuiQCReport, Xinghui2QCReport, YuantongQCReport, Yuantong2QCReport
-from tasks.models import TaskLog, QCReportSchedule
+from tasks.models import TaskLog, QCReportSchedule, WeChatEventReceipt
 from home.utils.user_helpers import get_user_info
 from home.utils.excel_export import export_qc_report_excel_universal
 from home.config import QC_REPORT_FIELD_MAPPING
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
 
 logger = logging.getLogger(__name__)
 
@@ -208,6 +205,222 @@ def send_qc_report_by_schedule(self, report_type):
         raise self.retry(exc=e, countdown=300, max_retries=3)
 
 
+@shared_task(bind=True)
+def send_qc_alert(self, report_type, report_id, alerts):
+    """
+    QC检测值超限告警
+    BaseQCReportAPI.post 新建报表发现指标超出规格限或偏离均值过大时入队，
+    发送给该厂区QC报表定时发送配置中启用的接收人
+    """
+    task_name = f"{report_type}QC指标超限告警"
+    try:
+        model_mapping = {
+            'dayuan': DayuanQCReport,
+            'dongtai': DongtaiQCReport,
+            'changfu': ChangfuQCReport,
+            'xinghui': XinghuiQCReport,
+            'xinghui2': Xinghui2QCReport,
+            'yuantong': YuantongQCReport,
+            'yuantong2': Yuantong2QCReport,
+        }
+        report = model_mapping[report_type].objects.filter(id=report_id).first()
+        if report is None:
+            logger.warning(f"告警报表 {report_type}#{report_id} 已删除，跳过发送")
+            return "报表已删除"
+
+        recipients = dict(
+            QCReportSchedule.objects.filter(report_type=report_type, is_enabled=True)
+            .values_list('recipient_userid', 'recipient_name')
+        )
+        if not recipients:
+            logger.warning(f"未找到{report_type}的启用接收人，QC告警未发送")
+            return f"未找到{report_type}的启用接收人"
+
+        lines = [
+            f"⚠️ {dict(QCReportSchedule.REPORT_TYPES).get(report_type, report_type)} 指标异常",
+            f"时间: {report.date.strftime('%Y-%m-%d')} {report.time.strftime('%H:%M')}  班次: {report.shift or ''}",
+            f"产品: {report.product_name}  批号: {report.batch_number or ''}  填报人: {report.username or ''}",
+            "",
+        ]
+        for alert in alerts:
+            detail = f"{alert['field_label']}: {alert['value']:g}（{'，'.join(alert['reasons'])}"
+            if alert['lsl'] is not None or alert['usl'] is not None:
+                detail += f"，规格 {'' if alert['lsl'] is None else alert['lsl']}~{'' if alert['usl'] is None else alert['usl']}"
+            if alert['mean'] is not None and alert['sigma']:
+                detail += f"，近{alert['sample_count']}次均值 {alert['mean']:.4g}±{alert['sigma']:.3g}"
+            lines.append(detail + "）")
+        message = '\n'.join(lines)
+
+        failed = []
+        for recipient_userid, recipient_name in recipients.items():
+            try:
+                send_wechat_message_to_user(message, report.date, recipient_userid)
+            except Exception as e:
+                failed.append(f"{recipient_name}: {str(e)}")
+
+        result_message = f"{report_type}#{report_id} {len(alerts)}项指标异常，成功发送给{len(recipients) - len(failed)}人，失败{len(failed)}人"
+        TaskLog.objects.create(
+            task_name=task_name,
+            status='success' if not failed else 'failed',
+            message=result_message + (f"\n详情: {'; '.join(failed)}" if failed else ''),
+        )
+        logger.info(f"[{timezone.now()}] {result_message}")
+        return result_message
+
+    except Exception as e:
+        logger.error(f"任务 '{task_name}' 执行失败: {str(e)}", exc_info=True)
+        TaskLog.objects.create(
+            task_name=task_name,
+            status='failed',
+            message=f"任务执行失败: {str(e)}"
+        )
+        raise self.retry(exc=e, countdown=60, max_retries=3)
+
+
+# 处理中的幂等记录超过该时长仍未完成，视为上次处理中断，允许重新处理
+WECHAT_EVENT_STALE_SECONDS = 600
+
+
+@shared_task(bind=True)
+def process_wechat_approval_event(self, approval_info):
+    """
+    异步处理企业微信审批状态通知事件
+    由 WeChatMessageReceiveView.post 在解密解析后入队，回调视图立即返回success，
+    避免企业微信因5秒内未响应而重复推送；同一审批单号+状态只处理一次。
+    每条通知发送成功后记入幂等记录，处理失败重试时只补发尚未成功的通知
+    """
+    from django.db import IntegrityError, transaction
+    from home.utils.wechat_approval import (
+        get_approval_idempotency_key,
+        process_approval_event_and_notify,
+    )
+
+    approval_detail = approval_info.get('approval_info', {}) or {}
+    sp_no = approval_detail.get('ThirdNo') or ''
+    sp_status = approval_detail.get('OpenSpStatus') or ''
+    idempotency_key = get_approval_idempotency_key(approval_info)
+
+    receipt = None
+    if idempotency_key:
+        try:
+            with transaction.atomic():
+                receipt = WeChatEventReceipt.objects.create(
+                    idempotency_key=idempotency_key,
+                    sp_no=sp_no,
+                    sp_status=sp_status,
+                )
+        except IntegrityError:
+            receipt = WeChatEventReceipt.objects.filter(idempotency_key=idempotency_key).first()
+            stale_before = timezone.now() - timedelta(seconds=WECHAT_EVENT_STALE_SECONDS)
+            # 本任务的重试继续处理同一条记录
+            is_retry = self.request.retries > 0
+            if receipt and (receipt.status == 'done' or (receipt.created_at > stale_before and not is_retry)):
+                logger.info(f"审批事件重复推送，跳过处理: {idempotency_key}")
+                return f"重复事件已跳过: {idempotency_key}"
+            # 重试或上次处理中断，继续处理（已通知的用户会跳过）
+            WeChatEventReceipt.objects.filter(idempotency_key=idempotency_key).update(created_at=timezone.now())
+    else:
+        logger.warning(f"审批事件缺少审批单号，无法去重: {approval_info}")
+
+    notified_users = set(receipt.notified_users) if receipt else set()
+
+    def record_notified(user_id):
+        notified_users.add(user_id)
+        if idempotency_key:
+            WeChatEventReceipt.objects.filter(idempotency_key=idempotency_key).update(
+                notified_users=sorted(notified_users)
+            )
+
+    try:
+        notified_count = process_approval_event_and_notify(
+            approval_info, already_notified=frozenset(notified_users), on_notified=record_notified,
+        )
+    except Exception as e:
+        logger.error(f"处理审批事件 {sp_no} 失败: {str(e)}", exc_info=True)
+        # 保留幂等记录和已通知的用户，重试时只补发尚未成功的通知
+        raise self.retry(exc=e, countdown=30, max_retries=3)
+
+    if idempotency_key:
+        WeChatEventReceipt.objects.filter(idempotency_key=idempotency_key).update(
+            status='done',
+            notified_count=notified_count or 0,
+            processed_at=timezone.now(),
+        )
+
+    return f"审批事件 {sp_no} 处理完成，已通知{notified_count or 0}位用户"
+
+
+@shared_task(bind=True)
+def refresh_eas_storage_cache(self, days=None):
+    """
+    增量刷新EAS入库单据本地缓存
+    每10分钟强制刷新所有操作对象仓库最近几天的数据，页面读取时只需回源当天的短期窗口
+    """
+    from home.utils.eas_cache import refresh_recent_eas_cache
+
+    task_name = "刷新EAS入库单据缓存"
+    start_time = timezone.now()
+    try:
+        target_count, failed = refresh_recent_eas_cache(days)
+    except Exception as e:
+        logger.error(f"任务 '{task_name}' 执行失败: {str(e)}", exc_info=True)
+        TaskLog.objects.create(
+            task_name=task_name,
+            status='failed',
+            message=f"任务执行失败: {str(e)}"
+        )
+        raise
+
+    execution_time = (timezone.now() - start_time).total_seconds()
+    result_message = f"刷新{target_count}个仓库，失败{len(failed)}个"
+    if failed:
+        # 仅在有失败时记录任务日志，避免每10分钟产生一条日志
+        TaskLog.objects.create(
+            task_name=task_name,
+            status='failed',
+            message=f"{result_message}\n详情: " + '; '.join(f"{item['warehouse_code']}: {item['error']}" for item in failed),
+            execution_time=execution_time,
+        )
+    logger.info(f"[{timezone.now()}] {task_name}: {result_message}")
+    return result_message
+
+
+@shared_task(bind=True)
+def archive_expired_logs(self):
+    """
+    每月归档超过保留期的日志
+    用户操作日志移入归档表，审计日志和任务日志写入 JSONL.gz 文件
+    """
+    from home.utils.log_archive import archive_logs
+
+    task_name = "归档过期日志"
+    start_time = timezone.now()
+    try:
+        results = archive_logs()
+    except Exception as e:
+        logger.error(f"任务 '{task_name}' 执行失败: {str(e)}", exc_info=True)
+        TaskLog.objects.create(
+            task_name=task_name,
+            status='failed',
+            message=f"任务执行失败: {str(e)}"
+        )
+        raise
+
+    execution_time = (timezone.now() - start_time).total_seconds()
+    result_message = ', '.join(
+        f"{log_type}: {'跳过' if result['skipped'] else str(result['count']) + '条'}"
+        for log_type, result in results.items()
+    )
+    TaskLog.objects.create(
+        task_name=task_name,
+        status='success',
+        message=result_message,
+        execution_time=execution_time,
+    )
+    logger.info(f"[{timezone.now()}] {task_name}: {result_message}")
+    return result_message
+
+
 def generate_qc_excel_report(reports, report_date, report_name):
     """
     生成QC报表Excel文件 - 通用版本
@@ -215,6 +428,10 @@ def generate_qc_excel_report(reports, report_date, report_name):
     try:
         from django.contrib.auth.models import User
         from django.db.models import Q
+        # openpyxl（及其依赖的numpy）只在生成Excel时加载，不拖慢worker启动
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+        from openpyxl.utils import get_column_letter
         
         # 创建临时文件
         temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx')
@@ -390,6 +607,10 @@ def generate_dayuan_excel_report(reports, report_date):
     try:
         from django.contrib.auth.models import User
         from django.db.models import Q
+        # openpyxl（及其依赖的numpy）只在生成Excel时加载，不拖慢worker启动
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+        from openpyxl.utils import get_column_letter
         
         # 创建临时文件
         temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx')
@@ -10,6 +10,7 @@ import os
 import requests
 import logging
 import urllib.parse
+from core.middleware import get_client_profile
 logger = logging.getLogger(__name__)
 
 
@@ -34,10 +35,10 @@ def wechat_login(request):
             return render(request, 'login.html', {'error': '企业微信配置缺失，请联系管理员'})
         
         # 检测是否来自企业微信（企业微信的User-Agent包含 wxwork 或 micromessenger）
-        user_agent = request.META.get('HTTP_USER_AGENT', '').lower()
-        is_wechat_work = 'wxwork' in user_agent or ('micromessenger' in user_agent and 'wxwork' in user_agent)
+        client_profile = get_client_profile(request)
+        is_wechat_work = client_profile.is_wxwork
         
-        logger.info(f'User-Agent: {user_agent[:100]}..., is_wechat_work: {is_wechat_work}')
+        logger.info(f'Client: {client_profile.kind}, is_wechat_work: {is_wechat_work}')
         
         # 构建回调URL
         protocol = 'https' if request.is_secure() else 'http'
@@ -2,6 +2,7 @@ from __future__ import absolute_import
 import os
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import task_postrun, task_prerun, worker_process_shutdown
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yuantong.settings')
 
@@ -22,6 +23,24 @@ app.conf.beat_schedule = {
             'routing_key': 'default',
         }
     },
+    # 增量刷新EAS入库单据本地缓存（最近几天）
+    'refresh-eas-storage-cache': {
+        'task': 'tasks.tasks.refresh_eas_storage_cache',
+        'schedule': crontab(minute='*/10'),  # 每10分钟执行
+        'options': {
+            'queue': 'default',
+            'routing_key': 'default',
+        }
+    },
+    # 按月归档超过保留期的操作日志、审计日志和任务日志
+    'archive-expired-logs': {
+        'task': 'tasks.tasks.archive_expired_logs',
+        'schedule': crontab(day_of_month=1, hour=3, minute=30),  # 每月1日凌晨3:30执行
+        'options': {
+            'queue': 'default',
+            'routing_key': 'default',
+        }
+    },
 }
 
 # 时区设置
@@ -39,3 +58,28 @@ app.conf.result_serializer = 'json'
 app.conf.task_routes = {
     'tasks.tasks.*': {'queue': 'default'},
 }
+
+
+@worker_process_shutdown.connect
+def flush_operation_logs_on_shutdown(**kwargs):
+    """Celery 子进程关闭前写出缓冲中的操作日志，并输出连接复用统计"""
+    from home.utils.db_metrics import connection_stats
+    from home.utils.operation_log import flush_operation_logs
+    flush_operation_logs()
+    connection_stats.log()
+
+
+@task_prerun.connect
+def close_stale_connections_before_task(**kwargs):
+    """任务开始前关闭超过 CONN_MAX_AGE 或已不可用的数据库连接，并重新启用连接健康检查"""
+    from django.db import close_old_connections
+    close_old_connections()
+
+
+@task_postrun.connect
+def close_stale_connections_after_task(**kwargs):
+    """任务结束后同样清理连接（任务中途出错时事务状态异常的连接会被关闭），并计入连接复用统计"""
+    from django.db import close_old_connections
+    from home.utils.db_metrics import connection_stats
+    close_old_connections()
+    connection_stats.record_unit()
@@ -78,10 +78,12 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    'core.middleware.DBConnectionMetricsMiddleware',
     'audit.middleware.AuditMiddleware',
     'core.middleware.MobileDetectionMiddleware',
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    'core.middleware.SessionRefreshThrottleMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -127,9 +129,16 @@ DATABASES = {
             'charset': 'utf8mb4',
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
         },
+        # 持久连接（秒）：每个线程复用自己的连接，0 表示每个请求结束后关闭
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        # 复用持久连接前先检查连接是否可用（MySQL 重启、wait_timeout 断开后自动重连）
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', 'True').lower() == 'true',
     }
 }
 
+# 每个进程处理多少个请求/任务输出一次数据库连接复用统计，0 表示不输出
+DB_CONN_METRICS_LOG_EVERY = int(os.environ.get('DB_CONN_METRICS_LOG_EVERY', '1000'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -189,6 +198,37 @@ EAS_API_PATH_ADD = os.environ.get('EAS_API_PATH_ADD', '/geteasdata/addManufactur
 EAS_API_PATH_UPDATE = os.environ.get('EAS_API_PATH_UPDATE', '/geteasdata/upManufactureRec')
 EAS_API_PATH_DELETE = os.environ.get('EAS_API_PATH_DELETE', '/geteasdata/delManufactureRec')
 EAS_API_PATH_GET = os.environ.get('EAS_API_PATH_GET', '/geteasdata/getManufactureRec')
+# EAS单次请求超时（秒）；多仓库并发查询的线程数上限和整体截止时间（秒）
+EAS_API_TIMEOUT = int(os.environ.get('EAS_API_TIMEOUT', '10'))
+EAS_FANOUT_MAX_WORKERS = int(os.environ.get('EAS_FANOUT_MAX_WORKERS', '8'))
+EAS_FANOUT_DEADLINE = int(os.environ.get('EAS_FANOUT_DEADLINE', '15'))
+# EAS入库单据本地缓存：当天及以后数据的有效期、历史数据的有效期（秒），定时任务每次刷新最近几天
+EAS_CACHE_TODAY_TTL = int(os.environ.get('EAS_CACHE_TODAY_TTL', '300'))
+EAS_CACHE_HISTORY_TTL = int(os.environ.get('EAS_CACHE_HISTORY_TTL', '21600'))
+EAS_CACHE_REFRESH_DAYS = int(os.environ.get('EAS_CACHE_REFRESH_DAYS', '3'))
+
+# 用户操作日志缓冲写入：关闭时每次操作同步写库；后台线程按批量大小或间隔（秒）写库，缓冲上限防止数据库不可用时内存增长
+OPERATION_LOG_BUFFERED = os.environ.get('OPERATION_LOG_BUFFERED', 'True').lower() == 'true'
+OPERATION_LOG_BATCH_SIZE = int(os.environ.get('OPERATION_LOG_BATCH_SIZE', '100'))
+OPERATION_LOG_FLUSH_INTERVAL = float(os.environ.get('OPERATION_LOG_FLUSH_INTERVAL', '2'))
+OPERATION_LOG_MAX_BUFFER = int(os.environ.get('OPERATION_LOG_MAX_BUFFER', '10000'))
+
+# 审计中间件：写入目标 audit（audit_operationlog）/ user_operation_log（并入用户操作日志，每次写操作只记一条）/ off
+AUDIT_LOG_SINK = os.environ.get('AUDIT_LOG_SINK', 'audit')
+AUDIT_METHODS = [m.strip() for m in os.environ.get('AUDIT_METHODS', 'POST,DELETE').split(',') if m.strip()]
+# 路径正则，逗号分隔；包含规则为空时审计所有路径，排除规则优先
+AUDIT_INCLUDE_PATHS = [p.strip() for p in os.environ.get('AUDIT_INCLUDE_PATHS', '').split(',') if p.strip()]
+AUDIT_EXCLUDE_PATHS = [p.strip() for p in os.environ.get(
+    'AUDIT_EXCLUDE_PATHS',
+    r'^/api/product-models/suggest/,^/api/packagings/suggest/,^/api/user-favorite/,^/api/log-view-operation/,^/wechat/'
+).split(',') if p.strip()]
+
+# 日志保留天数（0 表示不归档）：超过保留期的日志由每月的归档任务整月移出热表
+# 用户操作日志移入归档表，审计日志和任务日志写入 LOG_ARCHIVE_DIR 下的 JSONL.gz
+OPERATION_LOG_RETENTION_DAYS = int(os.environ.get('OPERATION_LOG_RETENTION_DAYS', '180'))
+AUDIT_LOG_RETENTION_DAYS = int(os.environ.get('AUDIT_LOG_RETENTION_DAYS', '90'))
+TASK_LOG_RETENTION_DAYS = int(os.environ.get('TASK_LOG_RETENTION_DAYS', '90'))
+LOG_ARCHIVE_DIR = os.environ.get('LOG_ARCHIVE_DIR') or str(BASE_DIR / 'logs' / 'archive')
 
 # WeChat Configuration - 仅从环境变量读取，不写默认值
 # WECHAT_CORP_SECRET 兼容 WECHAT_APP_SECRET（应用密钥，多数场景下可通用）
@@ -205,28 +245,49 @@ if not DEBUG and not all([WECHAT_CORP_ID, WECHAT_CORP_SECRET, WECHAT_AGENT_ID]):
 REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
 CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/1')
 
-# 缓存配置 - 临时使用本地内存缓存避免Redis问题
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-        'TIMEOUT': 300,  # 5分钟默认缓存时间
-        'KEY_PREFIX': 'yuantong_cache',
-        'VERSION': 1,
+# 缓存配置：redis 为多个 gunicorn worker 共享的缓存，会话使用 cached_db（读缓存、写库）；
+# locmem 为进程内缓存 + 数据库会话，用于开发环境；不会自动回退，Redis 长时间不可用时需手动设置 CACHE_PROFILE=locmem 并重启
+CACHE_PROFILE = os.environ.get('CACHE_PROFILE', 'locmem' if DEBUG else 'redis')
+
+if CACHE_PROFILE == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+            'TIMEOUT': 300,  # 5分钟默认缓存时间
+            'KEY_PREFIX': 'yuantong_cache',
+            'VERSION': 1,
+        }
     }
-}
-
-# 生产环境暂时使用数据库session而不是Redis session
-if not DEBUG:
-    # 明确设置使用数据库session，避免Redis配置问题
-    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
-    # 暂时禁用Redis session，使用数据库session避免跨进程问题
-    # SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
-    # SESSION_CACHE_ALIAS = 'default'
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    SESSION_CACHE_ALIAS = 'default'
 else:
-    # 开发环境也使用数据库session
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+            'TIMEOUT': 300,  # 5分钟默认缓存时间
+            'KEY_PREFIX': 'yuantong_cache',
+            'VERSION': 1,
+        }
+    }
     SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 
+# QC产量统计缓存有效期（秒）；缓存键包含数据版本，报表修改后自动失效，有效期只用于回收不再使用的旧版本结果
+PRODUCTION_STATS_CACHE_TTL = int(os.environ.get('PRODUCTION_STATS_CACHE_TTL', '86400'))
+# QC指标SPC（控制图、过程能力）结果缓存有效期（秒），同样按数据版本自动失效
+SPC_CACHE_TTL = int(os.environ.get('SPC_CACHE_TTL', '86400'))
+
+# QC指标滚动统计：按最近N个检测值统计均值和标准差，新检测值偏离均值超过N倍标准差时告警
+QC_ROLLING_WINDOW = int(os.environ.get('QC_ROLLING_WINDOW', '100'))
+QC_ALERT_SIGMA = float(os.environ.get('QC_ALERT_SIGMA', '3'))
+# 样本数少于该值时只按规格限判断，不按标准差判断
+QC_ALERT_MIN_SAMPLES = int(os.environ.get('QC_ALERT_MIN_SAMPLES', '20'))
+
+# 产品型号、包装物自动完成索引：按最近N天QC报表中的使用次数排序，每个进程的索引最长使用该秒数后重建
+QC_SUGGEST_USAGE_DAYS = int(os.environ.get('QC_SUGGEST_USAGE_DAYS', '90'))
+QC_SUGGEST_REFRESH_SECONDS = int(os.environ.get('QC_SUGGEST_REFRESH_SECONDS', '600'))
+
 # 邮件配置 (用于错误通知)
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
@@ -254,7 +315,8 @@ SESSION_COOKIE_AGE = 86400  # 24 hours in seconds (增加到24小时)
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False  # 不要在浏览器关闭时立即过期
 SESSION_COOKIE_HTTPONLY = True  # Prevent JavaScript access to session cookie
 SESSION_COOKIE_SAMESITE = 'Lax'  # 设置为Lax兼容性更好
-SESSION_SAVE_EVERY_REQUEST = True  # Update session on every request
+SESSION_SAVE_EVERY_REQUEST = False  # 不在每个请求写会话，由 SessionRefreshThrottleMiddleware 节流续期
+SESSION_REFRESH_INTERVAL = int(os.environ.get('SESSION_REFRESH_INTERVAL', '300'))  # 滑动过期续期间隔（秒）
 SESSION_COOKIE_SECURE = not DEBUG  # HTTPS环境下设为True，开发环境设为False
 SESSION_COOKIE_DOMAIN = None  # 让Django自动处理域名
 